@@ -7,21 +7,20 @@
 import logging
 import os
 from copy import deepcopy
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional
 
 import boto3
 import botocore
-import yaml
 from deepmerge import always_merger
 
+from utils.versions import load_versions
+
 _logger: logging.Logger = logging.getLogger(__name__)
 
 project_dir = os.path.dirname(os.path.abspath(__file__))
 
 data_dir = os.getenv("VERSIONS_DIR", "data/eks_dockerimage-replication/versions/")
 
-workload_versions: Dict[Union[Any, Dict], Union[Any, Dict]] = {}
-
 
 def _get_ami_version_from_file(eks_version: str) -> str:
     """Get AMI version
@@ -32,8 +31,7 @@ def _get_ami_version_from_file(eks_version: str) -> str:
     Returns:
         str: AMI version
     """
-    _parse_versions_file(eks_version)
-    return workload_versions[eks_version]["ami"]["version"]
+    return load_versions(data_dir, eks_version).ami["version"]
 
 
 def _get_chart_release_from_file(eks_version: str, workload_name: str) -> str:
@@ -46,15 +44,7 @@ def _get_chart_release_from_file(eks_version: str, workload_name: str) -> str:
     Returns:
         str: Chart name
     """
-    _parse_versions_file(eks_version)
-    _parse_versions_file("default")
-    if (
-        workload_name in workload_versions[eks_version]["charts"]
-        and "name" in workload_versions[eks_version]["charts"][workload_name]
-    ):
-        return workload_versions[eks_version]["charts"][workload_name]["name"]
-
-    return workload_versions["default"]["charts"][workload_name]["name"]
+    return load_versions(data_dir, eks_version).chart(workload_name)["name"]
 
 
 def _get_chart_repo_from_file(eks_version: str, workload_name: str) -> str:
@@ -67,15 +57,7 @@ def _get_chart_repo_from_file(eks_version: str, workload_name: str) -> str:
     Returns:
         str: Chart repository URL
     """
-    _parse_versions_file(eks_version)
-    _parse_versions_file("default")
-    if (
-        workload_name in workload_versions[eks_version]["charts"]
-        and "repository" in workload_versions[eks_version]["charts"][workload_name]
-    ):
-        return workload_versions[eks_version]["charts"][workload_name]["repository"]
-
-    return workload_versions["default"]["charts"][workload_name]["repository"]
+    return load_versions(data_dir, eks_version).chart(workload_name)["repository"]
 
 
 def _get_chart_version_from_file(eks_version: str, workload_name: str) -> str:
@@ -88,33 +70,7 @@ def _get_chart_version_from_file(eks_version: str, workload_name: str) -> str:
     Returns:
         str: Chart version
     """
-    _parse_versions_file(eks_version)
-    _parse_versions_file("default")
-    if (
-        workload_name in workload_versions[eks_version]["charts"]
-        and "version" in workload_versions[eks_version]["charts"][workload_name]
-    ):
-        return workload_versions[eks_version]["charts"][workload_name]["version"]
-
-    return workload_versions["default"]["charts"][workload_name]["version"]
-
-
-def _parse_versions_file(eks_version: str) -> None:
-    """Parse versions file
-
-    Args:
-        eks_version (str): EKS version
-
-    Returns:
-        Dict: Parsed file
-    """
-
-    # we do not want to load and parse yaml file for every workload
-    if eks_version not in workload_versions:
-        yaml_path = os.path.join(data_dir, f"{eks_version}.yaml")
-
-        with open(yaml_path, encoding="utf-8") as yaml_file:
-            workload_versions[eks_version] = yaml.safe_load(yaml_file)
+    return load_versions(data_dir, eks_version).chart(workload_name)["version"]
 
 
 def deep_merge(*dicts: Dict) -> Dict:
@@ -259,12 +215,4 @@ def get_image(eks_version: str, data: Dict, workload_name: str) -> str:
     if "additional_images" in data and workload_name in data["additional_images"]:
         return data["additional_images"][workload_name]
 
-    _parse_versions_file(eks_version)
-    _parse_versions_file("default")
-    if (
-        "additional_images" in workload_versions[eks_version]
-        and workload_name in workload_versions[eks_version]["additional_images"]
-    ):
-        return workload_versions[eks_version]["additional_images"][workload_name]
-
-    return workload_versions["default"]["additional_images"][workload_name]
+    return load_versions(data_dir, eks_version).additional_images[workload_name]
@@ -5,19 +5,19 @@
 
 import json
 import os
-from string import Template
+import shutil
 from typing import Any, Dict, List, Optional, cast
 
 import cdk_nag
 import requests
-import yaml
-from aws_cdk import Aspects, Aws, CfnJson, Duration, RemovalPolicy, Stack, Tags
+from aws_cdk import Aspects, Aws, CfnJson, Duration, RemovalPolicy, Stack, Stage, Tags
 from aws_cdk import aws_aps as aps
 from aws_cdk import aws_autoscaling as asg
 from aws_cdk import aws_ec2 as ec2
 from aws_cdk import aws_eks as eks
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_kms as kms
+from aws_cdk import aws_s3_assets as s3_assets
 from aws_cdk import aws_ssm as ssm
 from aws_cdk.lambda_layer_kubectl_v29 import KubectlV29Layer
 from cdk_nag import NagSuppressions
@@ -33,8 +33,17 @@ from helpers import (
     get_chart_version,
     get_image,
 )
+from utils.addons import AddonGraph
+from utils.assets import load_json, load_text, load_yaml_documents
 from utils.iam import fetch_global_ecr_account
-from utils.k8s import convert_node_labels_to_k8sargs, convert_taints_to_k8sargs
+from utils.k8s import (
+    bundle_config_maps,
+    chunk_manifests,
+    convert_node_labels_to_k8sargs,
+    convert_taints_to_k8sargs,
+    write_manifest_chart,
+)
+from utils.profiling import SynthProfiler
 
 project_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -66,6 +75,22 @@ SECRETS_MANAGER_CSI_DRIVER = "secrets_manager_csi_driver"
 SECRETS_STORE_CSI_DRIVER_PROVIDER_AWS = "secrets_store_csi_driver_provider_aws"
 NVIDIA_DEVICE_PLUGIN = "nvidia_device_plugin"
 
+# Addons that must be installed before another addon, all the others are installed in parallel.
+# The load balancer controller webhook has to serve before charts creating Service resources are installed.
+ADDON_DEPENDENCIES = {
+    NGINX_CONTROLLER: [ALB_CONTROLLER],
+    KYVERNO: [ALB_CONTROLLER],
+    KYVERNO_POLICY_REPORTER: [KYVERNO, ALB_CONTROLLER],
+    GRAFANA: [PROMETHEUS_STACK, ALB_CONTROLLER],
+}
+
+# Serialized size of a bundled kyverno policy manifest: well under the payload limits of the kubectl
+# handler, and small enough that the full policy set is split into a few manifests applied in parallel
+KYVERNO_BUNDLE_MAX_BYTES = 16 * 1024
+
+# Data of a bundled grafana dashboards ConfigMap, a quarter of the 1 MiB limit of kubernetes objects
+GRAFANA_DASHBOARDS_MAX_BYTES = 256 * 1024
+
 
 class Eks(Stack):  # type: ignore
     def __init__(
@@ -104,6 +129,8 @@ class Eks(Stack):  # type: ignore
         Tags.of(scope=cast(IConstruct, self)).add(key="Deployment", value=full_dep_mod)
 
         self._partition = partition
+        profiler = SynthProfiler(self)
+        self._addons = AddonGraph(ADDON_DEPENDENCIES)
         # Importing the VPC
         self.vpc = ec2.Vpc.from_lookup(
             self,
@@ -195,15 +222,16 @@ class Eks(Stack):  # type: ignore
         # we are unable to influence pod cidrs without recreating the nodes after the cluster creation.
         # To mitigate this and support out-of-the-box custom cidr for pods, we install
         # VPC CNI as a helm chart instead of vpc addon.
-        vpc_cni_chart = self._create_vpc_cni_chart(
-            eks_cluster,
-            eks_version,
-            replicated_ecr_images_metadata,
-            sg_pods_service_account,
-            custom_subnet_values,
-            cm_patch,
-            patches,
-        )
+        with profiler.step("vpc_cni_chart"):
+            vpc_cni_chart = self._create_vpc_cni_chart(
+                eks_cluster,
+                eks_version,
+                replicated_ecr_images_metadata,
+                sg_pods_service_account,
+                custom_subnet_values,
+                cm_patch,
+                patches,
+            )
 
         # Add Managed Node Group(s)
         if eks_compute_config.get("eks_nodegroup_config"):
@@ -226,131 +254,151 @@ class Eks(Stack):  # type: ignore
                     self._create_managed_node_group(eks_cluster, eks_version, ng, node_capacity_type, vpc_cni_chart)
 
                 if ng.get("install_nvidia_device_plugin"):
-                    self._install_nvidia_device_plugin(eks_cluster, eks_version, replicated_ecr_images_metadata)
+                    with profiler.step("nvidia_device_plugin"):
+                        self._install_nvidia_device_plugin(eks_cluster, eks_version, replicated_ecr_images_metadata)
 
         # AWS Load Balancer Controller
-        awslbcontroller_chart = None
         if eks_addons_config.get("deploy_aws_lb_controller"):
-            awslbcontroller_chart = self._create_aws_lb_controller(
-                eks_cluster, eks_version, vpc_id, replicated_ecr_images_metadata, eks_addons_config
-            )
+            with profiler.step("aws_lb_controller"):
+                self._create_aws_lb_controller(
+                    eks_cluster, eks_version, vpc_id, replicated_ecr_images_metadata, eks_addons_config
+                )
 
         if eks_addons_config.get("deploy_nginx_controller"):
-            self._create_nginx_controller(
-                eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config, awslbcontroller_chart
-            )
+            with profiler.step("nginx_controller"):
+                self._create_nginx_controller(
+                    eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config
+                )
 
         # AWS S3 CSI Driver
         if eks_addons_config.get("deploy_aws_s3_csi"):
-            self._create_s3_csi_addon(eks_cluster, project_name, mountpoint_buckets)
+            with profiler.step("s3_csi_addon"):
+                self._create_s3_csi_addon(eks_cluster, project_name, mountpoint_buckets)
 
         # AWS Cloudwatch Observability Driver
         if eks_addons_config.get("deploy_cloudwatch_observability_addon"):
             # https://docs.aws.amazon.com/AmazonCloudWatch/latest/monitoring/Container-Insights-setup-EKS-addon.html
-            self._create_cloudwatch_observability_addon(eks_cluster)
+            with profiler.step("cloudwatch_observability_addon"):
+                self._create_cloudwatch_observability_addon(eks_cluster)
 
         # AWS EBS CSI Driver
         if eks_addons_config.get("deploy_aws_ebs_csi"):
-            self._deploy_ebs_csi_driver(
-                eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
-            )
+            with profiler.step("ebs_csi_driver"):
+                self._deploy_ebs_csi_driver(
+                    eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
+                )
 
         # AWS EFS CSI Driver
         if eks_addons_config.get("deploy_aws_efs_csi"):
-            self._deploy_efs_csi_driver(
-                eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
-            )
+            with profiler.step("efs_csi_driver"):
+                self._deploy_efs_csi_driver(
+                    eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
+                )
 
         # AWS FSx CSI Driver does not work in isolated subnets at the time of developing the module
         if eks_addons_config.get("deploy_aws_fsx_csi"):
-            self._deploy_fsx_csi_driver(
-                eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
-            )
+            with profiler.step("fsx_csi_driver"):
+                self._deploy_fsx_csi_driver(
+                    eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
+                )
 
         # Cluster Autoscaler
         if eks_addons_config.get("deploy_cluster_autoscaler"):
-            self._deploy_cluster_autoscaler(
-                eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
-            )
+            with profiler.step("cluster_autoscaler"):
+                self._deploy_cluster_autoscaler(
+                    eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
+                )
 
         # Metrics Server (required for the Horizontal Pod Autoscaler (HPA))
         if eks_addons_config.get("deploy_metrics_server"):
-            self._deploy_metrics_server(eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config)
+            with profiler.step("metrics_server"):
+                self._deploy_metrics_server(eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config)
 
         if eks_addons_config.get("deploy_external_dns"):
-            self._deploy_external_dns(eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config)
+            with profiler.step("external_dns"):
+                self._deploy_external_dns(eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config)
 
         # Secrets Manager CSI Driver
         if eks_addons_config.get("deploy_secretsmanager_csi"):
-            self._deploy_secrets_store_csi_driver(
-                eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
-            )
+            with profiler.step("secrets_store_csi_driver"):
+                self._deploy_secrets_store_csi_driver(
+                    eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
+                )
 
         # Kubernetes External Secrets
         if eks_addons_config.get("deploy_external_secrets"):
-            self._deploy_external_secrets_controller(
-                eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config
-            )
+            with profiler.step("external_secrets_controller"):
+                self._deploy_external_secrets_controller(
+                    eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config
+                )
 
         # CloudWatch Container Insights - Metrics
         if eks_addons_config.get("deploy_cloudwatch_container_insights_metrics"):
-            self._deploy_cloudwatch_container_insights_metrics(
-                eks_cluster, eks_version, project_dir, replicated_ecr_images_metadata, eks_addons_config
-            )
+            with profiler.step("cloudwatch_container_insights_metrics"):
+                self._deploy_cloudwatch_container_insights_metrics(
+                    eks_cluster, eks_version, project_dir, replicated_ecr_images_metadata, eks_addons_config
+                )
         # AWS Distro for Opentelemetry
         if eks_addons_config.get("deploy_adot"):
-            self._deploy_adot_and_cert_manager(
-                eks_cluster, eks_version, eks_addons_config, replicated_ecr_images_metadata
-            )
+            with profiler.step("adot_and_cert_manager"):
+                self._deploy_adot_and_cert_manager(
+                    eks_cluster, eks_version, eks_addons_config, replicated_ecr_images_metadata
+                )
 
         # CloudWatch Container Insights - Logs
         if eks_addons_config.get("deploy_cloudwatch_container_insights_logs"):
-            self._deploy_fluent_bit_cloudwatch(
-                eks_cluster,
-                eks_version,
-                replicated_ecr_images_metadata,
-                eks_addons_config,
-            )
+            with profiler.step("fluent_bit_cloudwatch"):
+                self._deploy_fluent_bit_cloudwatch(
+                    eks_cluster,
+                    eks_version,
+                    replicated_ecr_images_metadata,
+                    eks_addons_config,
+                )
 
         # Amazon Managed Prometheus (AMP)
         if eks_addons_config.get("deploy_amp"):
-            amp_sa, amp_workspace, amp_prometheus_chart = self._deploy_amazon_managed_prometheus(
-                eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config
-            )
+            with profiler.step("amazon_managed_prometheus"):
+                amp_sa, amp_workspace = self._deploy_amazon_managed_prometheus(
+                    eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config
+                )
 
         # Self-Managed Grafana for AMP
         if eks_addons_config.get("deploy_grafana_for_amp"):
-            self._deploy_grafana_for_amp(
-                eks_cluster,
-                project_dir,
-                eks_version,
-                amp_sa,
-                amp_workspace,
-                replicated_ecr_images_metadata,
-                eks_addons_config,
-                amp_prometheus_chart,
-                awslbcontroller_chart,
-            )
+            with profiler.step("grafana_for_amp"):
+                self._deploy_grafana_for_amp(
+                    eks_cluster,
+                    project_dir,
+                    eks_version,
+                    amp_sa,
+                    amp_workspace,
+                    replicated_ecr_images_metadata,
+                    eks_addons_config,
+                )
 
         if eks_addons_config.get("deploy_kured"):
             # https://kubereboot.github.io/charts/
-            self._deploy_kured(eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config)
+            with profiler.step("kured"):
+                self._deploy_kured(eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config)
 
         if eks_addons_config.get("deploy_calico"):
-            self._deploy_calico(
-                eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
-            )
+            with profiler.step("calico"):
+                self._deploy_calico(
+                    eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
+                )
 
         # Kyverno policies
         if eks_addons_config.get("deploy_kyverno"):
-            self._deploy_kyverno(
-                eks_cluster,
-                project_dir,
-                eks_version,
-                replicated_ecr_images_metadata,
-                eks_addons_config,
-                awslbcontroller_chart,
-            )
+            with profiler.step("kyverno"):
+                self._deploy_kyverno(
+                    eks_cluster,
+                    project_dir,
+                    eks_version,
+                    replicated_ecr_images_metadata,
+                    eks_addons_config,
+                )
+
+        # Only the minimal dependencies between the deployed addons, the critical path is logged
+        self._addons.apply()
 
         # Configure EKS/K8s RBAC with ready to assume roles based on org reqs
         self._configure_rbac(eks_cluster)
@@ -366,6 +414,9 @@ class Eks(Stack):  # type: ignore
         # Add suppressions
         self._add_suppressions()
 
+        if profiler.enabled:
+            profiler.write()
+
     def _create_self_managed_node_group(self, dep_mod, eks_cluster, ng_config, vpc_cni_chart):
         """
         Creates a Self Managed Node Group with the specified configuration.
@@ -798,6 +849,7 @@ class Eks(Stack):  # type: ignore
         for patch in patches:
             vpc_cni_chart.node.add_dependency(patch)
 
+        self._addons.register(AWS_VPC_CNI, vpc_cni_chart)
         return vpc_cni_chart
 
     def _create_service_account(self, eks_cluster):
@@ -827,8 +879,7 @@ class Eks(Stack):  # type: ignore
         awslbcontroller_policy_document_path = os.path.join(
             project_dir, "addons-iam-policies", "ingress-controller.json"
         )
-        with open(awslbcontroller_policy_document_path) as json_file:
-            awslbcontroller_policy_document_json = json.load(json_file)
+        awslbcontroller_policy_document_json = load_json(awslbcontroller_policy_document_path)
 
         awslbcontroller_policy = iam.Policy(
             self,
@@ -862,11 +913,9 @@ class Eks(Stack):  # type: ignore
             ),
         )
         awslbcontroller_chart.node.add_dependency(awslbcontroller_service_account)
-        return awslbcontroller_chart
+        self._addons.register(ALB_CONTROLLER, awslbcontroller_chart)
 
-    def _create_nginx_controller(
-        self, eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config, awslbcontroller_chart=None
-    ):
+    def _create_nginx_controller(self, eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config):
         """
         Creates the NGINX Ingress Controller.
         """
@@ -883,8 +932,7 @@ class Eks(Stack):  # type: ignore
             nginx_controller_policy_document_path = os.path.join(
                 project_dir, "addons-iam-policies", "ingress-controller.json"
             )
-            with open(nginx_controller_policy_document_path) as json_file:
-                nginx_controller_policy_document_json = json.load(json_file)
+            nginx_controller_policy_document_json = load_json(nginx_controller_policy_document_path)
 
             nginx_controller_policy = iam.Policy(
                 self,
@@ -915,9 +963,7 @@ class Eks(Stack):  # type: ignore
                 ),
             )
             nginx_controller_chart.node.add_dependency(nginx_controller_service_account)
-            # Ensure ALB Controller webhook is ready before installing NGINX (creates Service resources)
-            if awslbcontroller_chart:
-                nginx_controller_chart.node.add_dependency(awslbcontroller_chart)
+            self._addons.register(NGINX_CONTROLLER, nginx_controller_chart)
 
     def _create_s3_csi_addon(self, eks_cluster, project_name, mountpoint_buckets):
         """
@@ -1030,8 +1076,7 @@ class Eks(Stack):  # type: ignore
 
         # Reference: https://github.com/kubernetes-sigs/aws-ebs-csi-driver/blob/master/docs/example-iam-policy.json
         awsebscsidriver_policy_document_json_path = os.path.join(project_dir, "addons-iam-policies", "ebs-csi-iam.json")
-        with open(awsebscsidriver_policy_document_json_path) as json_file:
-            awsebscsidriver_policy_document_json = json.load(json_file)
+        awsebscsidriver_policy_document_json = load_json(awsebscsidriver_policy_document_json_path)
 
         # Attach the necessary permissions
         awsebscsidriver_policy = iam.Policy(
@@ -1100,6 +1145,7 @@ class Eks(Stack):  # type: ignore
             },
         )
         ebs_csi_storageclass_gp3.node.add_dependency(awsebscsi_chart)
+        self._addons.register(EBS_CSI_DRIVER, awsebscsi_chart)
 
     def _deploy_efs_csi_driver(
         self,
@@ -1119,8 +1165,7 @@ class Eks(Stack):  # type: ignore
         awsefscsidriver_policy_statement_json_path = os.path.join(
             project_dir, "addons-iam-policies", "efs-csi-iam.json"
         )
-        with open(awsefscsidriver_policy_statement_json_path) as json_file:
-            awsefscsidriver_policy_statement_json = json.load(json_file)
+        awsefscsidriver_policy_statement_json = load_json(awsefscsidriver_policy_statement_json_path)
 
         # Attach the necessary permissions
         awsefscsidriver_policy = iam.Policy(
@@ -1158,6 +1203,7 @@ class Eks(Stack):  # type: ignore
         )
 
         awsefscsi_chart.node.add_dependency(awsefscsidriver_service_account)
+        self._addons.register(EFS_CSI_DRIVER, awsefscsi_chart)
 
     def _deploy_fsx_csi_driver(
         self, eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
@@ -1172,8 +1218,7 @@ class Eks(Stack):  # type: ignore
         awsfsxcsidriver_policy_statement_json_path = os.path.join(
             project_dir, "addons-iam-policies", "fsx-csi-iam.json"
         )
-        with open(awsfsxcsidriver_policy_statement_json_path) as json_file:
-            awsfsxcsidriver_policy_statement_json = json.load(json_file)
+        awsfsxcsidriver_policy_statement_json = load_json(awsfsxcsidriver_policy_statement_json_path)
 
         # Attach the necessary permissions
         awsfsxcsidriver_policy = iam.Policy(
@@ -1211,6 +1256,7 @@ class Eks(Stack):  # type: ignore
             ),
         )
         awsfsxcsi_chart.node.add_dependency(awsfsxcsidriver_service_account)
+        self._addons.register(FSX_DRIVER, awsfsxcsi_chart)
 
     def _deploy_cluster_autoscaler(
         self,
@@ -1230,8 +1276,7 @@ class Eks(Stack):  # type: ignore
         clusterautoscaler_policy_statement_json_path = os.path.join(
             project_dir, "addons-iam-policies", "cluster-autoscaler-iam.json"
         )
-        with open(clusterautoscaler_policy_statement_json_path) as json_file:
-            clusterautoscaler_policy_statement_json = json.load(json_file)
+        clusterautoscaler_policy_statement_json = load_json(clusterautoscaler_policy_statement_json_path)
 
         # Attach the necessary permissions
         clusterautoscaler_policy = iam.Policy(
@@ -1270,13 +1315,14 @@ class Eks(Stack):  # type: ignore
             ),
         )
         clusterautoscaler_chart.node.add_dependency(clusterautoscaler_service_account)
+        self._addons.register(CLUSTER_AUTOSCALER, clusterautoscaler_chart)
 
     def _deploy_kured(self, eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config):
         """
         Deploys the Kured (Kubernetes Reboot Daemon) addon for the EKS cluster.
         """
         # Install the Kured addon
-        eks_cluster.add_helm_chart(
+        kured_chart = eks_cluster.add_helm_chart(
             "kured",
             chart=get_chart_release(str(eks_version), KURED, replicated_ecr_images_metadata),
             version=get_chart_version(str(eks_version), KURED, replicated_ecr_images_metadata),
@@ -1290,6 +1336,7 @@ class Eks(Stack):  # type: ignore
                 get_chart_values(replicated_ecr_images_metadata, KURED),
             ),
         )
+        self._addons.register(KURED, kured_chart)
 
     def _deploy_calico(self, eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config):
         """
@@ -1313,29 +1360,31 @@ class Eks(Stack):  # type: ignore
             release="calico",
             namespace="tigera-operator",
         )
+        self._addons.register(CALICO, calico_chart)
 
-        with open(os.path.join(project_dir, "network-policies/default-allow-kube-system.json"), "r") as f:
-            default_allow_kube_system_policy_file = f.read()
+        default_allow_kube_system_policy_json = load_json(
+            os.path.join(project_dir, "network-policies/default-allow-kube-system.json")
+        )
 
         allow_kube_system_policy = eks_cluster.add_manifest(
-            "default-allow-kube-system", json.loads(default_allow_kube_system_policy_file)
+            "default-allow-kube-system", default_allow_kube_system_policy_json
         )
 
         allow_kube_system_policy.node.add_dependency(calico_chart)
 
-        with open(os.path.join(project_dir, "network-policies/default-allow-tigera-operator.json"), "r") as f:
-            default_allow_tigera_operator_policy_file = f.read()
+        default_allow_tigera_operator_policy_json = load_json(
+            os.path.join(project_dir, "network-policies/default-allow-tigera-operator.json")
+        )
 
         allow_tigera_operator_policy = eks_cluster.add_manifest(
-            "default-allow-tigera-operator", json.loads(default_allow_tigera_operator_policy_file)
+            "default-allow-tigera-operator", default_allow_tigera_operator_policy_json
         )
 
         allow_tigera_operator_policy.node.add_dependency(allow_kube_system_policy)
 
-        with open(os.path.join(project_dir, "network-policies/default-deny.json"), "r") as f:
-            default_deny_policy_file = f.read()
+        default_deny_policy_json = load_json(os.path.join(project_dir, "network-policies/default-deny.json"))
 
-        default_deny_policy = eks_cluster.add_manifest("default-deny-policy", json.loads(default_deny_policy_file))
+        default_deny_policy = eks_cluster.add_manifest("default-deny-policy", default_deny_policy_json)
 
         default_deny_policy.node.add_dependency(allow_tigera_operator_policy)
 
@@ -1346,7 +1395,6 @@ class Eks(Stack):  # type: ignore
         eks_version,
         replicated_ecr_images_metadata,
         eks_addons_config,
-        awslbcontroller_chart=None,
     ):
         """
         Deploys the Kyverno policy engine plugin for the EKS cluster.
@@ -1370,38 +1418,49 @@ class Eks(Stack):  # type: ignore
                 release="kyverno",
                 namespace="kyverno",
             )
-            # Ensure ALB Controller webhook is ready before installing Kyverno (creates Service resources)
-            if awslbcontroller_chart:
-                kyverno_chart.node.add_dependency(awslbcontroller_chart)
+            self._addons.register(KYVERNO, kyverno_chart)
 
             if eks_addons_config.get("deploy_calico"):
-                with open(os.path.join(project_dir, "network-policies/default-allow-kyverno.json"), "r") as f:
-                    default_allow_kyverno_policy_file = f.read()
+                default_allow_kyverno_policy_json = load_json(
+                    os.path.join(project_dir, "network-policies/default-allow-kyverno.json")
+                )
 
                 allow_kyverno_policy = eks_cluster.add_manifest(
-                    "default-allow-kyverno", json.loads(default_allow_kyverno_policy_file)
+                    "default-allow-kyverno", default_allow_kyverno_policy_json
                 )
 
                 allow_kyverno_policy.node.add_dependency(kyverno_chart)
 
             if "kyverno_policies" in eks_addons_config.get("deploy_kyverno"):
                 all_policies = eks_addons_config.get("deploy_kyverno")["kyverno_policies"]
-                for policy_type, policies in all_policies.items():
-                    for policy in policies:
-                        f = open(
-                            os.path.join(project_dir, "kyverno-policies", policy_type, f"{policy}.yaml"),
-                            "r",
-                        ).read()
-                        manifest_yaml = list(yaml.load_all(f, Loader=yaml.FullLoader))
-                        previous_manifest = None
-                        for value in manifest_yaml:
-                            manifest_name = value["metadata"]["name"]
-                            manifest = eks_cluster.add_manifest(manifest_name, value)
-                            if previous_manifest is None:
-                                manifest.node.add_dependency(kyverno_chart)
-                            else:
-                                manifest.node.add_dependency(previous_manifest)
-                            previous_manifest = manifest
+                if eks_addons_config.get("deploy_kyverno").get("kyverno_bundle_policies"):
+                    # All selected policies in a few multi-document manifests, applied in parallel
+                    documents = [
+                        document
+                        for policy_type, policies in all_policies.items()
+                        for policy in policies
+                        for document in load_yaml_documents(
+                            os.path.join(project_dir, "kyverno-policies", policy_type, f"{policy}.yaml")
+                        )
+                    ]
+                    for index, chunk in enumerate(chunk_manifests(documents, KYVERNO_BUNDLE_MAX_BYTES)):
+                        bundle = eks_cluster.add_manifest(f"kyverno-policies-{index}", *chunk)
+                        bundle.node.add_dependency(kyverno_chart)
+                else:
+                    for policy_type, policies in all_policies.items():
+                        for policy in policies:
+                            manifest_yaml = load_yaml_documents(
+                                os.path.join(project_dir, "kyverno-policies", policy_type, f"{policy}.yaml")
+                            )
+                            previous_manifest = None
+                            for value in manifest_yaml:
+                                manifest_name = value["metadata"]["name"]
+                                manifest = eks_cluster.add_manifest(manifest_name, value)
+                                if previous_manifest is None:
+                                    manifest.node.add_dependency(kyverno_chart)
+                                else:
+                                    manifest.node.add_dependency(previous_manifest)
+                                previous_manifest = manifest
 
             kyverno_policy_reporter_chart = eks_cluster.add_helm_chart(
                 "kyverno-policy-reporter",
@@ -1425,17 +1484,14 @@ class Eks(Stack):  # type: ignore
                 ),
             )
 
-            kyverno_policy_reporter_chart.node.add_dependency(kyverno_chart)
-            # Ensure ALB Controller webhook is ready before installing policy reporter (creates Service resources)
-            if awslbcontroller_chart:
-                kyverno_policy_reporter_chart.node.add_dependency(awslbcontroller_chart)
+            self._addons.register(KYVERNO_POLICY_REPORTER, kyverno_policy_reporter_chart)
 
     def _deploy_metrics_server(self, eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config):
         """
         Deploys the Metrics Server helm chart for application level autoscaling.
         """
         # Install the Metrics Server addon
-        eks_cluster.add_helm_chart(
+        metrics_server_chart = eks_cluster.add_helm_chart(
             "metrics-server",
             chart=get_chart_release(str(eks_version), METRICS_SERVER, replicated_ecr_images_metadata),
             version=get_chart_version(str(eks_version), METRICS_SERVER, replicated_ecr_images_metadata),
@@ -1447,6 +1503,7 @@ class Eks(Stack):  # type: ignore
                 get_chart_values(replicated_ecr_images_metadata, METRICS_SERVER),
             ),
         )
+        self._addons.register(METRICS_SERVER, metrics_server_chart)
 
     def _deploy_external_dns(self, eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config):
         """
@@ -1498,6 +1555,7 @@ class Eks(Stack):  # type: ignore
             ),
         )
         externaldns_chart.node.add_dependency(externaldns_service_account)
+        self._addons.register(EXTERNAL_DNS, externaldns_chart)
 
     def _deploy_secrets_store_csi_driver(
         self, eks_cluster, project_dir, eks_version, replicated_ecr_images_metadata, eks_addons_config
@@ -1509,7 +1567,7 @@ class Eks(Stack):  # type: ignore
 
         # First we install the Secrets Store CSI Driver Helm Chart
         # https://github.com/kubernetes-sigs/secrets-store-csi-driver/tree/main/charts/secrets-store-csi-driver
-        eks_cluster.add_helm_chart(
+        secrets_store_csi_chart = eks_cluster.add_helm_chart(
             "csi-secrets-store",
             chart=get_chart_release(str(eks_version), SECRETS_MANAGER_CSI_DRIVER, replicated_ecr_images_metadata),
             version=get_chart_version(str(eks_version), SECRETS_MANAGER_CSI_DRIVER, replicated_ecr_images_metadata),
@@ -1526,6 +1584,7 @@ class Eks(Stack):  # type: ignore
                 ),
             ),
         )
+        self._addons.register(SECRETS_MANAGER_CSI_DRIVER, secrets_store_csi_chart)
         # Install the AWS Provider
         # See https://github.com/aws/secrets-store-csi-driver-provider-aws for more info
 
@@ -1550,13 +1609,11 @@ class Eks(Stack):  # type: ignore
         secrets_store_csi_driver_image = get_image(
             str(eks_version), replicated_ecr_images_metadata, SECRETS_STORE_CSI_DRIVER_PROVIDER_AWS
         )
-        t = Template(
-            open(os.path.join(project_dir, "secrets-config/secrets-store-csi-driver-provider-aws.yaml"), "r").read()
-        )
-
         # Substitute the image name in the secrets-store-csi-driver-provider-aws.yaml file
-        secrets_csi_provider_yaml_file = t.substitute(image=str(secrets_store_csi_driver_image))
-        secrets_csi_provider_yaml = list(yaml.load_all(secrets_csi_provider_yaml_file, Loader=yaml.FullLoader))
+        secrets_csi_provider_yaml = load_yaml_documents(
+            os.path.join(project_dir, "secrets-config/secrets-store-csi-driver-provider-aws.yaml"),
+            {"image": str(secrets_store_csi_driver_image)},
+        )
         loop_iteration = 0
         for value in secrets_csi_provider_yaml:
             loop_iteration = loop_iteration + 1
@@ -1598,7 +1655,7 @@ class Eks(Stack):  # type: ignore
 
         # Deploy the Helm Chart
         # https://github.com/external-secrets/external-secrets/tree/main/deploy/charts/external-secrets
-        eks_cluster.add_helm_chart(
+        external_secrets_chart = eks_cluster.add_helm_chart(
             "external-secrets",
             chart=get_chart_release(str(eks_version), EXTERNAL_SECRETS, replicated_ecr_images_metadata),
             version=get_chart_version(str(eks_version), EXTERNAL_SECRETS, replicated_ecr_images_metadata),
@@ -1618,6 +1675,7 @@ class Eks(Stack):  # type: ignore
                 get_chart_values(replicated_ecr_images_metadata, EXTERNAL_SECRETS),
             ),
         )
+        self._addons.register(EXTERNAL_SECRETS, external_secrets_chart)
 
     def _deploy_cloudwatch_container_insights_metrics(
         self, eks_cluster, eks_version, project_dir, replicated_ecr_images_metadata, eks_addons_config
@@ -1635,8 +1693,7 @@ class Eks(Stack):  # type: ignore
             iam.ManagedPolicy.from_aws_managed_policy_name("CloudWatchAgentServerPolicy")
         )
 
-        with open(os.path.join(project_dir, "monitoring-config/cwagentconfig.json"), "r", encoding="utf-8") as f:
-            cwagentconfig_content = f.read()
+        cwagentconfig_content = load_text(os.path.join(project_dir, "monitoring-config/cwagentconfig.json"))
 
         # Set up the settings ConfigMap
         eks_cluster.add_manifest(
@@ -1653,10 +1710,10 @@ class Eks(Stack):  # type: ignore
 
         # Import cloudwatch-agent.yaml to a list of dictionaries and submit them as a manifest to EKS
         cloudwatch_agent_image = get_image(str(eks_version), replicated_ecr_images_metadata, CLOUDWATCH_AGENT)
-        t = Template(open(os.path.join(project_dir, "monitoring-config/cloudwatch-agent.yaml"), "r").read())
-        # Substitute the image name in the cwagentconfig.json file
-        cw_agent_yaml_file = t.substitute(image=str(cloudwatch_agent_image))
-        cw_agent_yaml = list(yaml.load_all(cw_agent_yaml_file, Loader=yaml.FullLoader))
+        # Substitute the image name in the cloudwatch-agent.yaml file
+        cw_agent_yaml = load_yaml_documents(
+            os.path.join(project_dir, "monitoring-config/cloudwatch-agent.yaml"), {"image": str(cloudwatch_agent_image)}
+        )
         loop_iteration = 0
         for value in cw_agent_yaml:
             loop_iteration = loop_iteration + 1
@@ -1740,6 +1797,7 @@ class Eks(Stack):  # type: ignore
             ),
         )
         cert_manager_chart.node.add_dependency(cert_manager_service_account)
+        self._addons.register(CERT_MANAGER, cert_manager_chart)
 
     def _deploy_fluent_bit_cloudwatch(
         self, eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config
@@ -1807,6 +1865,7 @@ class Eks(Stack):  # type: ignore
             ),
         )
         fluentbit_chart_cw.node.add_dependency(fluentbit_cw_service_account)
+        self._addons.register(FLUENTBIT, fluentbit_chart_cw)
 
     def _deploy_amazon_managed_prometheus(
         self, eks_cluster, eks_version, replicated_ecr_images_metadata, eks_addons_config
@@ -1890,7 +1949,8 @@ class Eks(Stack):  # type: ignore
             ),
         )
         amp_prometheus_chart.node.add_dependency(amp_sa)
-        return amp_sa, amp_workspace, amp_prometheus_chart
+        self._addons.register(PROMETHEUS_STACK, amp_prometheus_chart)
+        return amp_sa, amp_workspace
 
     def _install_nvidia_device_plugin(self, eks_cluster, eks_version, replicated_ecr_images_metadata):
         """
@@ -1938,6 +1998,7 @@ class Eks(Stack):  # type: ignore
         )
 
         nvidia_device_plugin_chart.node.add_dependency(nvidia_device_plugin_namespace)
+        self._addons.register(NVIDIA_DEVICE_PLUGIN, nvidia_device_plugin_chart)
 
     def _deploy_grafana_for_amp(
         self,
@@ -1948,8 +2009,6 @@ class Eks(Stack):  # type: ignore
         amp_workspace,
         replicated_ecr_images_metadata,
         eks_addons_config,
-        amp_prometheus_chart,
-        awslbcontroller_chart,
     ):
         """
         Deploys a self-managed Grafana instance to visualize the AMP metrics.
@@ -2016,18 +2075,27 @@ class Eks(Stack):  # type: ignore
                 get_chart_values(replicated_ecr_images_metadata, GRAFANA),
             ),
         )
-        amp_grafana_chart.node.add_dependency(amp_prometheus_chart)
-        amp_grafana_chart.node.add_dependency(awslbcontroller_chart)
-
-        # Dashboards for Grafana from the grafana-dashboards.yaml file
-        grafana_dashboards_yaml_file = open("monitoring-config/grafana-dashboards.yaml", "r")
-        grafana_dashboards_yaml = list(yaml.load_all(grafana_dashboards_yaml_file, Loader=yaml.FullLoader))
-        grafana_dashboards_yaml_file.close()
-        loop_iteration = 0
-        for value in grafana_dashboards_yaml:
-            loop_iteration = loop_iteration + 1
-            manifest_id = "GrafanaDashboard" + str(loop_iteration)
-            eks_cluster.add_manifest(manifest_id, value)
+        self._addons.register(GRAFANA, amp_grafana_chart)
+
+        # Dashboards for Grafana from the grafana-dashboards.yaml file, bundled into a few ConfigMaps of a chart
+        # uploaded as a compressed S3 asset: the template only references the asset, installed in a single call
+        grafana_dashboards = bundle_config_maps(
+            load_yaml_documents(os.path.join(project_dir, "monitoring-config/grafana-dashboards.yaml")),
+            "grafana-dashboards",
+            GRAFANA_DASHBOARDS_MAX_BYTES,
+        )
+        # the chart is written into the cloud assembly, which outlives the synth: without asset staging
+        # (aws:cdk:disable-asset-staging) the asset is published from this directory at deploy time
+        chart_dir = os.path.join(Stage.of(self).outdir, f"{self.artifact_id}.grafana-dashboards")
+        shutil.rmtree(chart_dir, ignore_errors=True)
+        write_manifest_chart(chart_dir, "grafana-dashboards", grafana_dashboards)
+        grafana_dashboards_asset = s3_assets.Asset(self, "GrafanaDashboardsChart", path=chart_dir)
+        eks_cluster.add_helm_chart(
+            "amp-grafana-dashboards",
+            chart_asset=grafana_dashboards_asset,
+            release="grafana-dashboards",
+            namespace="kube-system",
+        )
 
     def _configure_rbac(self, eks_cluster):
         """
@@ -0,0 +1,47 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from utils.addons import AddonGraph
+
+DEPENDENCIES = {
+    "nginx": ["alb"],
+    "kyverno": ["alb"],
+    "reporter": ["kyverno", "alb"],
+    "grafana": ["prometheus", "alb"],
+}
+
+
+def test_edges():
+    graph = AddonGraph(DEPENDENCIES)
+
+    edges = graph.edges(["alb", "kyverno", "reporter", "grafana", "prometheus", "kured"])
+    # the reporter reaches alb through kyverno, independent addons wait for nothing
+    assert edges == {
+        "alb": [],
+        "grafana": ["alb", "prometheus"],
+        "kured": [],
+        "kyverno": ["alb"],
+        "prometheus": [],
+        "reporter": ["kyverno"],
+    }
+    # dependencies on addons not deployed are dropped or replaced by their own dependencies
+    assert graph.edges(["reporter", "alb", "grafana"]) == {"alb": [], "grafana": ["alb"], "reporter": ["alb"]}
+
+
+def test_critical_path():
+    graph = AddonGraph(DEPENDENCIES)
+
+    assert graph.critical_path(["alb", "kyverno", "reporter", "grafana", "prometheus"]) == [
+        "alb",
+        "kyverno",
+        "reporter",
+    ]
+    assert graph.critical_path(["kured"]) == ["kured"]
+    assert graph.critical_path([]) == []
+
+
+def test_cycle():
+    with pytest.raises(ValueError, match="a -> b -> a"):
+        AddonGraph({"a": ["b"], "b": ["a"]})
@@ -0,0 +1,45 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from utils import assets
+
+
+@pytest.fixture
+def asset_dir(tmp_path):
+    assets.clear_cache()
+    (tmp_path / "policy.json").write_text('{"Version": "2012-10-17", "Statement": []}')
+    (tmp_path / "manifests.yaml").write_text("kind: A\nimage: $image\n---\n---\nkind: B\n")
+    return tmp_path
+
+
+def test_load_json_is_memoized(asset_dir):
+    path = str(asset_dir / "policy.json")
+    policy = assets.load_json(path)
+    policy["Statement"].append("changed")
+
+    with patch("builtins.open", side_effect=AssertionError("read again")):
+        assert assets.load_json(path) == {"Version": "2012-10-17", "Statement": []}
+
+
+def test_load_yaml_documents(asset_dir):
+    path = str(asset_dir / "manifests.yaml")
+
+    assert assets.load_yaml_documents(path, {"image": "repo/image:1"}) == [
+        {"kind": "A", "image": "repo/image:1"},
+        {"kind": "B"},
+    ]
+    assert assets.load_yaml_documents(path, {"image": "repo/image:2"})[0]["image"] == "repo/image:2"
+
+
+def test_changed_file_is_parsed_again(asset_dir):
+    path = asset_dir / "policy.json"
+    assert assets.load_json(str(path))["Statement"] == []
+
+    path.write_text('{"Version": "2012-10-17", "Statement": [{"Effect": "Allow"}]}')
+    os.utime(path, ns=(0, 0))
+    assert assets.load_json(str(path))["Statement"] == [{"Effect": "Allow"}]
@@ -1,12 +1,38 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import ast
+import os
+import shutil
+import tempfile
 import unittest
+from unittest.mock import patch
 
 import boto3
 from moto import mock_aws
 
 import helpers
+from utils import versions
+from utils.versions import load_versions
+
+# copy of utils/versions.py kept by the dockerimage-replication module
+REPLICATION_VERSIONS = os.path.join(
+    os.path.dirname(os.path.abspath(versions.__file__)),
+    "../../../replication/dockerimage-replication/replication/parser/versions.py",
+)
+
+
+def _versions_code(path):
+    """Code of a versions module without its docstring and logger, the only parts the copies may differ in"""
+    with open(path, encoding="utf-8") as f:
+        module = ast.parse(f.read())
+    logger_lines = {
+        "import logging",
+        "from replication.logging import logger",
+        "_logger: logging.Logger = logging.getLogger(__name__)",
+    }
+    body = [node for node in module.body[1:] if ast.unparse(node) not in logger_lines]
+    return ast.unparse(ast.Module(body=body, type_ignores=[])).replace("_logger.", "logger.")
 
 
 class TestHelperMethods(unittest.TestCase):
@@ -58,11 +84,6 @@ class TestHelperMethods(unittest.TestCase):
         result = helpers._get_chart_version_from_file(eks_version, workload)
         self.assertEqual(result, "1.0.1")
 
-    def test__parse_versions_file(self):
-        eks_version = "1.30"
-
-        self.assertEqual(helpers._parse_versions_file(eks_version), None)
-
     def test_deep_merge(self):
         d1 = {"a": 1, "b": 2}
         d2 = {"b": 3, "c": 4}
@@ -124,3 +145,38 @@ class TestHelperMethods(unittest.TestCase):
 
         result = helpers.get_chart_version(eks_version, workload)
         self.assertEqual(result, "1.7.0")
+
+    def test_get_image(self):
+        eks_version = "1.30"
+        workload = "cloudwatch_agent"
+
+        result = helpers.get_image(eks_version, {}, workload)
+        self.assertEqual(result, "public.ecr.aws/cloudwatch-agent/cloudwatch-agent:1.300041.0b681")
+
+        result = helpers.get_image(eks_version, {"additional_images": {workload: "mirror/agent:1"}}, workload)
+        self.assertEqual(result, "mirror/agent:1")
+
+    def test_versions_model_is_read_only(self):
+        model = load_versions(helpers.data_dir, "1.30")
+        self.assertIs(model, load_versions(helpers.data_dir, "1.30"))
+        self.assertEqual(model.chart("cluster_autoscaler")["replication"], {"cluster_autoscaler": {"tag": "v1.26.2"}})
+        with self.assertRaises(TypeError):
+            model.chart("alb_controller")["version"] = "0.0.0"
+
+    def test_versions_model_matches_replication_copy(self):
+        if not os.path.isfile(REPLICATION_VERSIONS):
+            self.skipTest("dockerimage-replication module not checked out")
+        self.assertEqual(_versions_code(versions.__file__), _versions_code(REPLICATION_VERSIONS))
+
+    def test_versions_binary_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            versions_dir = shutil.copytree(helpers.data_dir, os.path.join(tmp_dir, "versions"))
+            with patch.object(versions, "binary_cache", True):
+                model = load_versions(versions_dir, "1.30")
+                self.assertIsNotNone(versions._read_cache(os.path.realpath(versions_dir), "1.30"))
+
+                with patch.object(versions, "read_file", side_effect=AssertionError("parsed YAML")):
+                    versions._load.cache_clear()
+                    cached = load_versions(versions_dir, "1.30")
+            self.assertIsNot(cached, model)
+            self.assertEqual(versions.thaw(cached.charts), versions.thaw(model.charts))
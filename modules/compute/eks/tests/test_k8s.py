@@ -0,0 +1,58 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import os
+
+import pytest
+
+from utils.k8s import bundle_config_maps, chunk_manifests, write_manifest_chart
+
+
+def test_chunk_manifests():
+    manifests = [{"kind": "ClusterPolicy", "metadata": {"name": f"policy-{i}"}} for i in range(5)]
+    size = len(json.dumps(manifests[0]))
+
+    assert chunk_manifests(manifests, size * 2) == [manifests[0:2], manifests[2:4], manifests[4:]]
+    assert chunk_manifests(manifests, size * 10) == [manifests]
+    # manifests larger than the limit get a chunk of their own
+    assert chunk_manifests(manifests[:2], 1) == [[manifests[0]], [manifests[1]]]
+    assert chunk_manifests([], size) == []
+
+
+def test_bundle_config_maps():
+    def config_map(name, data, namespace="kube-system"):
+        metadata = {"name": name, "namespace": namespace, "labels": {"grafana_dashboard": "1"}}
+        return {"apiVersion": "v1", "kind": "ConfigMap", "metadata": metadata, "data": data}
+
+    config_maps = [
+        config_map("a", {"a.json": "a" * 100}),
+        config_map("b", {"b.json": "b" * 100}),
+        config_map("c", {"c.json": "c" * 100}),
+        config_map("d", {"d.json": "d" * 100}, namespace="monitoring"),
+    ]
+    bundled = bundle_config_maps(config_maps, "dashboards", 250)
+
+    assert [config_map["metadata"]["name"] for config_map in bundled] == [
+        "dashboards-0",
+        "dashboards-1",
+        "dashboards-2",
+    ]
+    assert bundled[0] == config_map("dashboards-0", {"a.json": "a" * 100, "b.json": "b" * 100})
+    assert bundled[1]["data"] == {"c.json": "c" * 100}
+    # ConfigMaps of another namespace or with other labels are not merged
+    assert bundled[2] == config_map("dashboards-2", {"d.json": "d" * 100}, namespace="monitoring")
+
+    # a data key held by two merged ConfigMaps would be silently replaced
+    with pytest.raises(ValueError, match="ConfigMaps a and e both hold a.json"):
+        bundle_config_maps(config_maps + [config_map("e", {"a.json": "e" * 100})], "dashboards", 250)
+
+
+def test_write_manifest_chart(tmp_path):
+    manifests = [{"kind": "ConfigMap", "data": {"legend": "{{pod}}"}}, {"kind": "ConfigMap", "data": {}}]
+    write_manifest_chart(str(tmp_path), "dashboards", manifests)
+
+    assert sorted(os.listdir(tmp_path / "manifests")) == ["0000.json", "0001.json"]
+    assert json.loads((tmp_path / "manifests" / "0000.json").read_text()) == manifests[0]
+    assert json.loads((tmp_path / "Chart.yaml").read_text())["name"] == "dashboards"
+    assert ".Files.Get" in (tmp_path / "templates" / "manifests.yaml").read_text()
@@ -1,12 +1,13 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import json
 import os
 import sys
 
 import aws_cdk as cdk
 import pytest
-from aws_cdk.assertions import Template
+from aws_cdk.assertions import Match, Template
 from moto import mock_aws
 
 
@@ -146,7 +147,15 @@ def test_synthesize_stack(stack_defaults):
     # template.resource_count_is("AWS::AutoScaling::AutoScalingGroup", 1)
 
     # Helm charts
-    template.resource_count_is("Custom::AWSCDK-EKS-HelmChart", 18)
+    template.resource_count_is("Custom::AWSCDK-EKS-HelmChart", 19)
+
+    # Grafana dashboards are installed from a chart asset rather than inlined in the template
+    template.has_resource_properties(
+        "Custom::AWSCDK-EKS-HelmChart",
+        {"Release": "grafana-dashboards", "ChartAssetURL": Match.any_value()},
+    )
+    assert not any("GrafanaDashboard" in logical_id for logical_id in template.to_json()["Resources"])
+    assert "grafana-dashboard-k8s-pods" not in json.dumps(template.to_json())
 
     # Security groups
     template.resource_count_is("AWS::EC2::SecurityGroup", 1)
@@ -168,3 +177,186 @@ def test_synthesize_stack(stack_defaults):
             },
         },
     )
+
+
+@mock_aws
+def test_synthesize_stack_with_profiling(stack_defaults, tmp_path, monkeypatch):
+    import stack
+    from utils import assets, profiling
+
+    monkeypatch.setattr(profiling, "profiling_enabled", True)
+    # files parsed by earlier stacks are not read again
+    assets.clear_cache()
+    app = cdk.App(outdir=str(tmp_path / "cdk.out"))
+    stack.Eks(
+        scope=app,
+        id="test-project-test-deployment-test-module",
+        partition="aws",
+        project_name="test-project",
+        deployment_name="test-deployment",
+        module_name="test-module",
+        vpc_id="vpc-12345",
+        controlplane_subnet_ids=["subnet-12345", "subnet-54321"],
+        dataplane_subnet_ids=["subnet-12345", "subnet-54321"],
+        eks_version="1.30",
+        eks_compute_config={"eks_api_endpoint_private": "False", "ips_to_whitelist": []},
+        eks_addons_config={"deploy_aws_ebs_csi": "True", "deploy_kured": "True"},
+        custom_subnet_ids=None,
+        codebuild_sg_id=None,
+        replicated_ecr_images_metadata={},
+        mountpoint_buckets=None,
+        env=cdk.Environment(
+            account=os.environ["CDK_DEFAULT_ACCOUNT"],
+            region=os.environ["CDK_DEFAULT_REGION"],
+        ),
+    )
+
+    with open(tmp_path / profiling.REPORT_FILE, encoding="utf-8") as f:
+        report = json.load(f)
+    steps = {step["step"]: step for step in report["steps"]}
+    assert list(steps) == ["vpc_cni_chart", "ebs_csi_driver", "kured"]
+    assert steps["ebs_csi_driver"]["filesRead"] == 1
+    assert steps["ebs_csi_driver"]["constructs"] > 0
+    # the chart and its two storage classes
+    assert steps["ebs_csi_driver"]["manifests"] == 3
+    assert steps["kured"]["manifests"] == 1
+    assert steps["kured"]["manifestBytes"] > 0
+    assert report["total"]["manifests"] == sum(step["manifests"] for step in report["steps"])
+
+    # the wrapped methods are restored
+    assert "wrapper" not in stack.eks.Cluster.add_helm_chart.__qualname__
+
+
+@mock_aws
+def test_synthesize_stack_grafana_dashboards_without_asset_staging(stack_defaults, tmp_path):
+    import stack
+
+    outdir = tmp_path / "cdk.out"
+    app = cdk.App(outdir=str(outdir), context={"aws:cdk:disable-asset-staging": True})
+    stack.Eks(
+        scope=app,
+        id="test-project-test-deployment-test-module",
+        partition="aws",
+        project_name="test-project",
+        deployment_name="test-deployment",
+        module_name="test-module",
+        vpc_id="vpc-12345",
+        controlplane_subnet_ids=["subnet-12345", "subnet-54321"],
+        dataplane_subnet_ids=["subnet-12345", "subnet-54321"],
+        eks_version="1.30",
+        eks_compute_config={"eks_api_endpoint_private": "False", "ips_to_whitelist": []},
+        eks_addons_config={"deploy_amp": "True", "deploy_grafana_for_amp": "True"},
+        custom_subnet_ids=None,
+        codebuild_sg_id=None,
+        replicated_ecr_images_metadata={},
+        mountpoint_buckets=None,
+        env=cdk.Environment(
+            account=os.environ["CDK_DEFAULT_ACCOUNT"],
+            region=os.environ["CDK_DEFAULT_REGION"],
+        ),
+    )
+    assembly = app.synth()
+
+    # the unstaged asset is published from its source directory, which must outlive the synth
+    with open(os.path.join(assembly.directory, "test-project-test-deployment-test-module.assets.json")) as f:
+        sources = [asset["source"]["path"] for asset in json.load(f)["files"].values()]
+    chart_dir = next(path for path in sources if path.endswith("grafana-dashboards"))
+    assert chart_dir.startswith(str(outdir))
+    assert os.path.isfile(os.path.join(chart_dir, "Chart.yaml"))
+    assert os.listdir(os.path.join(chart_dir, "manifests"))
+
+
+@mock_aws
+def test_synthesize_stack_with_kyverno_policy_bundle(stack_defaults):
+    import stack
+
+    policies = {
+        policy_type: sorted(name[: -len(".yaml")] for name in os.listdir(os.path.join("kyverno-policies", policy_type)))
+        for policy_type in ("mutate", "validate")
+    }
+    app = cdk.App()
+    eks_stack = stack.Eks(
+        scope=app,
+        id="test-project-test-deployment-test-module",
+        partition="aws",
+        project_name="test-project",
+        deployment_name="test-deployment",
+        module_name="test-module",
+        vpc_id="vpc-12345",
+        controlplane_subnet_ids=["subnet-12345", "subnet-54321"],
+        dataplane_subnet_ids=["subnet-12345", "subnet-54321"],
+        eks_version="1.30",
+        eks_compute_config={"eks_api_endpoint_private": "False", "ips_to_whitelist": []},
+        eks_addons_config={
+            "deploy_kyverno": {"value": "True", "kyverno_policies": policies, "kyverno_bundle_policies": True}
+        },
+        custom_subnet_ids=None,
+        codebuild_sg_id=None,
+        replicated_ecr_images_metadata={},
+        mountpoint_buckets=None,
+        env=cdk.Environment(
+            account=os.environ["CDK_DEFAULT_ACCOUNT"],
+            region=os.environ["CDK_DEFAULT_REGION"],
+        ),
+    )
+
+    template = Template.from_stack(eks_stack)
+    bundles = {
+        logical_id: resource
+        for logical_id, resource in template.find_resources("Custom::AWSCDK-EKS-KubernetesResource").items()
+        if "kyvernopolicies" in logical_id
+    }
+    assert 1 < len(bundles) < 10
+    for resource in bundles.values():
+        # every bundle only waits for the kyverno chart, so they are applied in parallel
+        assert not any(dependency in bundles for dependency in resource.get("DependsOn", []))
+        assert len(json.dumps(resource["Properties"]["Manifest"])) < 2 * stack.KYVERNO_BUNDLE_MAX_BYTES
+
+
+def test_synthesize_stack_addon_dependencies(stack_defaults):
+    import stack
+
+    app = cdk.App()
+    eks_stack = stack.Eks(
+        scope=app,
+        id="test-project-test-deployment-test-module",
+        partition="aws",
+        project_name="test-project",
+        deployment_name="test-deployment",
+        module_name="test-module",
+        vpc_id="vpc-12345",
+        controlplane_subnet_ids=["subnet-12345", "subnet-54321"],
+        dataplane_subnet_ids=["subnet-12345", "subnet-54321"],
+        eks_version="1.30",
+        eks_compute_config={"eks_api_endpoint_private": "False", "ips_to_whitelist": []},
+        eks_addons_config={
+            "deploy_aws_lb_controller": "True",
+            "deploy_metrics_server": "True",
+            "deploy_kured": "True",
+            "deploy_external_dns": "True",
+            "deploy_kyverno": {"value": "True"},
+        },
+        custom_subnet_ids=None,
+        codebuild_sg_id=None,
+        replicated_ecr_images_metadata={},
+        mountpoint_buckets=None,
+        env=cdk.Environment(
+            account=os.environ["CDK_DEFAULT_ACCOUNT"],
+            region=os.environ["CDK_DEFAULT_REGION"],
+        ),
+    )
+
+    resources = Template.from_stack(eks_stack).find_resources("Custom::AWSCDK-EKS-HelmChart")
+    # logical ids are the chart ids prefixed with "clusterchart" and followed by an uppercase hash
+    names = {logical_id: logical_id[len("clusterchart") :].rstrip("0123456789ABCDEF") for logical_id in resources}
+    dependencies = {
+        names[logical_id]: sorted(names[dependency] for dependency in resource["DependsOn"] if dependency in names)
+        for logical_id, resource in resources.items()
+    }
+
+    # independent addons are installed in parallel, the policy reporter only waits for kyverno
+    for name in ("metricsserver", "kured", "externaldns", "awsloadbalancercontroller"):
+        assert dependencies[name] == []
+    assert dependencies["kyverno"] == ["awsloadbalancercontroller"]
+    assert dependencies["kyvernopolicyreporter"] == ["kyverno"]
+    assert eks_stack._addons.critical_path() == [stack.ALB_CONTROLLER, stack.KYVERNO, stack.KYVERNO_POLICY_REPORTER]
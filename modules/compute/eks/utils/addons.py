@@ -0,0 +1,104 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Dependency graph of the addons deployed by the Eks stack"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+
+from constructs import Construct
+
+_logger: logging.Logger = logging.getLogger(__name__)
+
+
+class AddonGraph:
+    """Orders addon installation from declared dependencies, leaving independent addons to install in parallel
+
+    `dependencies` maps an addon to the addons it needs running first. Only the minimal edges between the
+    addons that are registered are added to the constructs: a dependency reachable through another one is
+    dropped, and a dependency on an addon that is not deployed is replaced by that addon's own dependencies.
+    """
+
+    def __init__(self, dependencies: Dict[str, List[str]]):
+        self.dependencies = dependencies
+        self.addons: Dict[str, Construct] = {}
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        visiting: Set[str] = set()
+        done: Set[str] = set()
+
+        def visit(addon: str, path: List[str]) -> None:
+            if addon in done:
+                return
+            if addon in visiting:
+                raise ValueError(f"Addon dependency cycle: {' -> '.join(path + [addon])}")
+            visiting.add(addon)
+            for dependency in self.dependencies.get(addon, []):
+                visit(dependency, path + [addon])
+            visiting.remove(addon)
+            done.add(addon)
+
+        for addon in self.dependencies:
+            visit(addon, [])
+
+    def register(self, addon: str, construct: Construct) -> None:
+        """Records the construct installing `addon`, usually its helm chart"""
+        self.addons[addon] = construct
+
+    def _effective(self, addon: str, enabled: Set[str]) -> Set[str]:
+        """Enabled addons `addon` depends on, looking through the dependencies of the addons not deployed"""
+        found: Set[str] = set()
+        for dependency in self.dependencies.get(addon, []):
+            found |= {dependency} if dependency in enabled else self._effective(dependency, enabled)
+        return found
+
+    def _reachable(self, addon: str, enabled: Set[str]) -> Set[str]:
+        reachable: Set[str] = set()
+        pending = list(self._effective(addon, enabled))
+        while pending:
+            dependency = pending.pop()
+            if dependency not in reachable:
+                reachable.add(dependency)
+                pending.extend(self._effective(dependency, enabled))
+        return reachable
+
+    def edges(self, enabled: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """Minimal dependencies of every enabled addon, the transitive reduction of the declared graph
+
+        Args:
+            enabled (Iterable[str], optional): Addons deployed, the registered addons by default
+
+        Returns:
+            Dict[str, List[str]]: Addons every enabled addon directly waits for
+        """
+        enabled = set(self.addons if enabled is None else enabled)
+        edges = {}
+        for addon in sorted(enabled):
+            dependencies = self._effective(addon, enabled)
+            redundant = {
+                dependency
+                for dependency in dependencies
+                if any(dependency in self._reachable(other, enabled) for other in dependencies - {dependency})
+            }
+            edges[addon] = sorted(dependencies - redundant)
+        return edges
+
+    def critical_path(self, enabled: Optional[Iterable[str]] = None) -> List[str]:
+        """Longest chain of addons installed one after the other, which bounds the rollout time"""
+        edges = self.edges(enabled)
+        longest: Dict[str, List[str]] = {}
+
+        def chain(addon: str) -> List[str]:
+            if addon not in longest:
+                longest[addon] = max((chain(dependency) for dependency in edges[addon]), key=len, default=[]) + [addon]
+            return longest[addon]
+
+        return max((chain(addon) for addon in sorted(edges)), key=len, default=[])
+
+    def apply(self) -> None:
+        """Adds the minimal dependencies between the constructs of the registered addons"""
+        for addon, dependencies in self.edges().items():
+            for dependency in dependencies:
+                self.addons[addon].node.add_dependency(self.addons[dependency])
+        _logger.info("Addon critical path: %s", " -> ".join(self.critical_path()))
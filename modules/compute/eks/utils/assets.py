@@ -0,0 +1,73 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Memoized loading of the policy, manifest and dashboard files deployed by the Eks stack
+
+Files are read when an enabled addon asks for them, and parsed once per path and modification time, so
+stacks built repeatedly in one process, as in tests, do not parse them again.
+"""
+
+import copy
+import json
+import os
+from functools import lru_cache
+from string import Template
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+# libyaml parses large files such as the grafana dashboards an order of magnitude faster
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _key(path: str) -> Tuple[str, int, int]:
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=None)
+def _text(path: str, mtime_ns: int, size: int) -> str:
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+@lru_cache(maxsize=None)
+def _json(path: str, mtime_ns: int, size: int) -> Any:
+    return json.loads(_text(path, mtime_ns, size))
+
+
+@lru_cache(maxsize=None)
+def _yaml_documents(path: str, mtime_ns: int, size: int, substitutions: Tuple[Tuple[str, str], ...]) -> List[Any]:
+    text = _text(path, mtime_ns, size)
+    if substitutions:
+        text = Template(text).substitute(dict(substitutions))
+    return [document for document in yaml.load_all(text, Loader=_Loader) if document is not None]
+
+
+def load_text(path: str) -> str:
+    return _text(*_key(path))
+
+
+def load_json(path: str) -> Any:
+    """Returns a copy of the parsed JSON file, callers can change it"""
+    return copy.deepcopy(_json(*_key(path)))
+
+
+def load_yaml_documents(path: str, substitutions: Optional[Dict[str, str]] = None) -> List[Any]:
+    """Returns a copy of every document of a YAML file
+
+    Args:
+        path (str): Path of the file
+        substitutions (Dict[str, str], optional): `$name` placeholders of the file replaced before parsing
+
+    Returns:
+        List[Any]: Parsed documents, empty documents are skipped
+    """
+    return copy.deepcopy(_yaml_documents(*_key(path), tuple(sorted((substitutions or {}).items()))))
+
+
+def clear_cache() -> None:
+    _text.cache_clear()
+    _json.cache_clear()
+    _yaml_documents.cache_clear()
@@ -1,7 +1,19 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-from typing import Dict, List
+import json
+import os
+from typing import Any, Dict, List, TypeVar
+
+T = TypeVar("T")
+
+# Installs the chart files under manifests/ as they are, their content is not rendered as a template
+_MANIFEST_CHART_TEMPLATE = """\
+{{- range $path, $_ := .Files.Glob "manifests/*.json" }}
+---
+{{ $.Files.Get $path }}
+{{- end }}
+"""
 
 
 def convert_node_labels_to_k8sargs(labels_dict: Dict[str, str]) -> str:
@@ -20,3 +32,70 @@ def convert_taints_to_k8sargs(taints_dict: List[Dict[str, str]]) -> str:
     # e.g i/p. taints_dict=[{"key": "nvidia.com/gpu", "value": "true", "effect": "NoSchedule"}]
     # e.g o/p  nvidia.com/gpu:NoSchedule
     return ",".join(f"{i['key']}:{i['effect']}" for i in taints_dict)
+
+
+def chunk_manifests(manifests: List[T], max_bytes: int) -> List[List[T]]:
+    """
+    Groups manifests, in order, into chunks whose serialized size stays under max_bytes.
+    A manifest larger than max_bytes gets a chunk of its own.
+    """
+    chunks: List[List[T]] = []
+    size = 0
+    for manifest in manifests:
+        manifest_size = len(json.dumps(manifest))
+        if not chunks or size + manifest_size > max_bytes:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(manifest)
+        size += manifest_size
+    return chunks
+
+
+def bundle_config_maps(config_maps: List[Dict[str, Any]], name: str, max_bytes: int) -> List[Dict[str, Any]]:
+    """
+    Merges the data of ConfigMaps sharing a namespace and labels into as few ConfigMaps as keep
+    the serialized data of each under max_bytes, named `<name>-<index>`. Raises a ValueError when
+    two of the merged ConfigMaps hold the same data key, as one would silently replace the other.
+    """
+    groups: Dict[str, List[Any]] = {}
+    metadata: Dict[str, Dict[str, Any]] = {}
+    owners: Dict[str, Dict[str, str]] = {}
+    for config_map in config_maps:
+        key = json.dumps(
+            [config_map["metadata"].get("namespace"), config_map["metadata"].get("labels")], sort_keys=True
+        )
+        for data_key in config_map.get("data", {}):
+            owner = owners.setdefault(key, {}).setdefault(data_key, config_map["metadata"]["name"])
+            if owner != config_map["metadata"]["name"]:
+                raise ValueError(
+                    f"ConfigMaps {owner} and {config_map['metadata']['name']} both hold {data_key}, "
+                    "they cannot be merged"
+                )
+        groups.setdefault(key, []).extend(config_map.get("data", {}).items())
+        metadata.setdefault(key, config_map["metadata"])
+
+    bundled: List[Dict[str, Any]] = []
+    for key, items in groups.items():
+        for chunk in chunk_manifests(items, max_bytes):
+            bundled_metadata = {
+                **{field: value for field, value in metadata[key].items() if field in ("namespace", "labels")},
+                "name": f"{name}-{len(bundled)}",
+            }
+            bundled.append({"apiVersion": "v1", "kind": "ConfigMap", "metadata": bundled_metadata, "data": dict(chunk)})
+    return bundled
+
+
+def write_manifest_chart(path: str, name: str, manifests: List[Dict[str, Any]]) -> None:
+    """
+    Writes to the path a helm chart installing the manifests. They are kept as chart files, so
+    content that looks like a template, such as the legends of grafana dashboards, is left as is.
+    """
+    os.makedirs(os.path.join(path, "manifests"), exist_ok=True)
+    os.makedirs(os.path.join(path, "templates"), exist_ok=True)
+    with open(os.path.join(path, "Chart.yaml"), "w", encoding="utf-8") as f:
+        json.dump({"apiVersion": "v2", "name": name, "version": "1.0.0"}, f)
+    with open(os.path.join(path, "templates", "manifests.yaml"), "w", encoding="utf-8") as f:
+        f.write(_MANIFEST_CHART_TEMPLATE)
+    for index, manifest in enumerate(manifests):
+        with open(os.path.join(path, "manifests", f"{index:04d}.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, sort_keys=True)
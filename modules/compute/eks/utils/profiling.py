@@ -0,0 +1,123 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Opt-in profiling of the addon deployment steps of the Eks stack"""
+
+import builtins
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from aws_cdk import Stage
+from aws_cdk import aws_eks as eks
+from constructs import Construct
+
+_logger: logging.Logger = logging.getLogger(__name__)
+
+REPORT_FILE = "synth-profile.json"
+
+# profiles every addon deployment step and writes `synth-profile.json` next to `cdk.out`
+profiling_enabled = os.getenv("EKS_SYNTH_PROFILE", "false").lower() in ("1", "true", "yes")
+
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value, default=str))
+
+
+class SynthProfiler:
+    """Records wall time, constructs created, manifest bytes and files read of every step
+
+    Manifests are counted as they are passed to `add_manifest`, `add_helm_chart` (values), `KubernetesManifest`
+    and `HelmChart`, files as they are opened for reading. When disabled, steps are not instrumented.
+    """
+
+    def __init__(self, scope: Construct, enabled: Optional[bool] = None):
+        self.scope = scope
+        self.enabled = profiling_enabled if enabled is None else enabled
+        self.steps: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        record: Dict[str, Any] = {"step": name, "manifests": 0, "manifestBytes": 0, "filesRead": 0, "bytesRead": 0}
+        constructs = len(self.scope.node.find_all())
+        started = time.perf_counter()
+        try:
+            with self._instrumented(record):
+                yield
+        finally:
+            record["seconds"] = round(time.perf_counter() - started, 3)
+            record["constructs"] = len(self.scope.node.find_all()) - constructs
+            self.steps.append(record)
+
+    @contextmanager
+    def _instrumented(self, record: Dict[str, Any]) -> Iterator[None]:
+        def manifests(count: int, size: int) -> None:
+            record["manifests"] += count
+            record["manifestBytes"] += size
+
+        def wrap(original: Callable[..., Any], measure: Callable[..., Tuple[int, int]]) -> Callable[..., Any]:
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                manifests(*measure(*args, **kwargs))
+                return original(*args, **kwargs)
+
+            return wrapper
+
+        def read(file: Any, mode: str = "r", *args: Any, **kwargs: Any) -> Any:
+            if not any(flag in mode for flag in "wax+") and isinstance(file, (str, os.PathLike)):
+                record["filesRead"] += 1
+                record["bytesRead"] += os.path.getsize(file) if os.path.isfile(file) else 0
+            return original_open(file, mode, *args, **kwargs)
+
+        original_open = builtins.open
+        patches: List[Tuple[type, str, Callable[..., Tuple[int, int]]]] = [
+            (eks.Cluster, "add_manifest", lambda _, id, *manifest: (len(manifest), _size(list(manifest)))),
+            (eks.Cluster, "add_helm_chart", lambda _, id, **options: (1, _size(options.get("values")))),
+            (eks.KubernetesManifest, "__init__", lambda *_, manifest, **__: (len(manifest), _size(manifest))),
+            (eks.HelmChart, "__init__", lambda *_, **options: (1, _size(options.get("values")))),
+        ]
+        originals = [(cls, attr, cls.__dict__[attr]) for cls, attr, _ in patches]
+        builtins.open = read
+        for cls, attr, measure in patches:
+            setattr(cls, attr, wrap(cls.__dict__[attr], measure))
+        try:
+            yield
+        finally:
+            builtins.open = original_open
+            for cls, attr, original in originals:
+                setattr(cls, attr, original)
+
+    def report(self) -> Dict[str, Any]:
+        keys = ("seconds", "constructs", "manifests", "manifestBytes", "filesRead", "bytesRead")
+        return {
+            "steps": self.steps,
+            "total": {key: round(sum(step[key] for step in self.steps), 3) for key in keys},
+        }
+
+    def write(self) -> str:
+        """Writes the report next to the cloud assembly directory and logs the steps, slowest first
+
+        Returns:
+            str: Path of the report
+        """
+        outdir = os.path.abspath(Stage.of(self.scope).outdir)  # type: ignore
+        path = os.path.join(os.path.dirname(outdir), REPORT_FILE)
+        report = self.report()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        _logger.info("Synth profile written to %s", path)
+        for step in sorted(self.steps, key=lambda step: step["seconds"], reverse=True):
+            _logger.info(
+                "%8.3fs %6d constructs %10d manifest bytes %4d files read  %s",
+                step["seconds"],
+                step["constructs"],
+                step["manifestBytes"],
+                step["filesRead"],
+                step["step"],
+            )
+        return path
@@ -0,0 +1,154 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Versions model of the shared data folder: `default.yaml` merged with `<eks_version>.yaml`, read-only
+
+The modules are deployed separately and cannot import from each other, so the dockerimage-replication module
+keeps a copy of this file in replication/parser/versions.py. tests/test_helpers.py fails when the copies differ.
+"""
+
+import copy
+import logging
+import marshal
+import os
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
+import yaml
+
+_logger: logging.Logger = logging.getLogger(__name__)
+
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# bumped when the merged structure changes, which invalidates binary caches
+FORMAT = 1
+
+# keeps the merged model in a binary file next to the versions files, so repeated runs skip YAML parsing
+binary_cache = os.getenv("VERSIONS_BINARY_CACHE", "false").lower() in ("1", "true", "yes")
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Returns a mutable copy of a value of the model"""
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+def read_file(versions_dir: str, name: str) -> Dict[str, Any]:
+    """Parses `<name>.yaml` of the versions directory, an empty file parses to an empty dictionary"""
+    with open(os.path.join(versions_dir, f"{name}.yaml"), encoding="utf-8") as yaml_file:
+        return yaml.load(yaml_file, Loader=_Loader) or {}  # nosec B506
+
+
+def merge(default: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Merges the versions file of an EKS version over `default.yaml`
+
+    Every key of a chart in the EKS version file replaces the default one, charts only defined there are
+    added, and `skip` is kept so skipped charts can still be looked up.
+    """
+    charts = {name: dict(chart or {}) for name, chart in (default.get("charts") or {}).items()}
+    for name, chart in (overrides.get("charts") or {}).items():
+        charts[name] = {**charts.get(name, {}), **(chart or {})}
+    return copy.deepcopy(
+        {
+            "ami": {**(default.get("ami") or {}), **(overrides.get("ami") or {})},
+            "charts": charts,
+            "additional_images": {
+                **(default.get("additional_images") or {}),
+                **(overrides.get("additional_images") or {}),
+            },
+            "docker_mappings": {**(default.get("docker_mappings") or {}), **(overrides.get("docker_mappings") or {})},
+        }
+    )
+
+
+class VersionsModel:
+    """Merged versions of an EKS version, answering chart and image lookups without further merging
+
+    All mappings are read-only, `thaw` returns copies callers can change.
+    """
+
+    def __init__(self, eks_version: str, data: Dict[str, Any]):
+        frozen = _freeze(data)
+        self.eks_version = eks_version
+        self.ami: Mapping[str, Any] = frozen["ami"]
+        self.charts: Mapping[str, Mapping[str, Any]] = frozen["charts"]
+        self.additional_images: Mapping[str, str] = frozen["additional_images"]
+        self.docker_mappings: Mapping[str, str] = frozen["docker_mappings"]
+
+    def chart(self, workload: str) -> Mapping[str, Any]:
+        return self.charts[workload]
+
+    def workloads(self) -> Dict[str, Any]:
+        """Returns a mutable copy of the charts that are not skipped"""
+        return {name: thaw(chart) for name, chart in self.charts.items() if not chart.get("skip")}
+
+
+def _sources(versions_dir: str, eks_version: str) -> Dict[str, Any]:
+    sources = {}
+    for name in ("default", eks_version):
+        stat = os.stat(os.path.join(versions_dir, f"{name}.yaml"))
+        sources[name] = [stat.st_mtime_ns, stat.st_size]
+    return sources
+
+
+def _cache_path(versions_dir: str, eks_version: str) -> str:
+    return os.path.join(versions_dir, f".{eks_version}.versions.bin")
+
+
+def _read_cache(versions_dir: str, eks_version: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_cache_path(versions_dir, eks_version), "rb") as f:
+            # the cache is written by this module next to the versions files it was built from
+            cached = marshal.load(f)  # nosec B302
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if cached.get("format") != FORMAT or cached.get("sources") != _sources(versions_dir, eks_version):
+        return None
+    return cached["data"]  # type: ignore
+
+
+def _write_cache(versions_dir: str, eks_version: str, data: Dict[str, Any]) -> None:
+    path = _cache_path(versions_dir, eks_version)
+    try:
+        content = marshal.dumps({"format": FORMAT, "sources": _sources(versions_dir, eks_version), "data": data})
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(content)
+        os.replace(f"{path}.tmp", path)
+    except (OSError, ValueError) as e:
+        # values YAML parses to types marshal does not support, such as dates, are not cached
+        _logger.debug(f"Not caching the versions of {eks_version}: {e}")
+
+
+@lru_cache(maxsize=None)
+def _load(versions_dir: str, eks_version: str) -> VersionsModel:
+    data = _read_cache(versions_dir, eks_version) if binary_cache else None
+    if data is None:
+        data = merge(read_file(versions_dir, "default"), read_file(versions_dir, eks_version))
+        if binary_cache:
+            _write_cache(versions_dir, eks_version, data)
+    return VersionsModel(eks_version, data)
+
+
+def load_versions(versions_dir: str, eks_version: str) -> VersionsModel:
+    """Returns the versions model of `eks_version`, built once per process
+
+    Args:
+        versions_dir (str): Directory with versions files
+        eks_version (str): EKS version
+
+    Returns:
+        VersionsModel: Merged versions
+    """
+    return _load(os.path.realpath(versions_dir), eks_version)
@@ -6,11 +6,16 @@
 import json
 import os
 import sys
-from typing import Any, Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import replication.helm.commands as helm
 from replication.arguments import parse_args
+from replication.fingerprint import ChartInfoCache, fingerprint
+from replication.helm.cache import ChartCache
+from replication.helm.repository import ChartRepositories, repository_names
 from replication.logging import logger
+from replication.metrics import metrics
 from replication.parser import parser
 from replication.utils import deep_merge, get_credentials
 
@@ -22,30 +27,72 @@ repo_key = os.getenv("SEEDFARMER_PARAMETER_HELM_REPO_SECRET_KEY", None)
 def update_helm(update_helm: bool, workloads_data: Dict[str, Any]) -> None:
     if update_helm:
         username, pwd = get_credentials(repo_secret, repo_key)  # type: ignore
-        for workload, values in workloads_data.items():
-            logger.info("Syncing %s", workload)
-            helm.add_repo(workload, values["repository"], username, pwd)
+        names = repository_names({workload: values["repository"] for workload, values in workloads_data.items()})
+        repositories = {name: workloads_data[name]["repository"] for name in names.values()}
+        for name, repository in repositories.items():
+            logger.info("Syncing %s", repository)
+            helm.add_repo(name, repository, username, pwd)
+
+        helm.update_repos(sorted(repositories))
 
-        helm.update_repos()
 
+def fetch_chart_info(
+    workloads_data: Dict[str, Any],
+    max_workers: int = 8,
+    cache: Optional[ChartCache] = None,
+    repositories: Optional[ChartRepositories] = None,
+) -> Dict[str, Any]:
+    """Fetches chart and values of every workload with images, and of the subcharts it references
 
-def fetch_chart_info(workloads_data: Dict[str, Any]) -> Dict[str, Any]:
+    The requests run on a bounded pool of workers; identical (repository, chart, version) requests
+    are issued once and shared between the workloads referencing them. With a cache, each chart archive
+    is pulled once and chart, values and subcharts are read from it. With `repositories`, archives are
+    downloaded and read in-process, the helm CLI is only used when that fails.
+    """
     parsed_charts = {}  # type: ignore
-    for workload, values in workloads_data.items():
-        parsed_charts[workload] = {}
-        if "images" not in values:
-            continue
-
-        logger.debug("Getting %s data", workload)
-        parsed_charts[workload]["chart"] = helm.show("chart", f"{workload}/{values['name']}", values["version"])
-        parsed_charts[workload]["values"] = helm.show("values", f"{workload}/{values['name']}", values["version"])
-        if "subcharts" in values:
-            parsed_charts[workload]["subcharts"] = {}
-            for subchart in values["subcharts"]:
-                parsed_charts[workload]["subcharts"][subchart] = {}
-                parsed_charts[workload]["subcharts"][subchart] = helm.show_subchart(
-                    project_path, workload, values["name"], subchart, values["version"]
-                )
+    requests: Dict[Tuple[str, ...], Future] = {}  # type: ignore
+    names = repository_names({workload: values["repository"] for workload, values in workloads_data.items()})
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+
+        def submit(key: Tuple[str, ...], fn: Callable[..., Any], *args: Any) -> Future:  # type: ignore
+            if key not in requests:
+                requests[key] = executor.submit(fn, *args, repo_url=key[0], cache=cache, repositories=repositories)
+            return requests[key]
+
+        pending: Dict[str, Dict[str, Any]] = {}
+        for workload, values in workloads_data.items():
+            parsed_charts[workload] = {}
+            if "images" not in values:
+                continue
+
+            logger.debug("Getting %s data", workload)
+            chart_id = (values["repository"], values["name"], values["version"])
+            chart = f"{names[workload]}/{values['name']}"
+            pending[workload] = {
+                "chart": submit((*chart_id, "chart"), helm.show, "chart", chart, values["version"]),
+                "values": submit((*chart_id, "values"), helm.show, "values", chart, values["version"]),
+                "subcharts": {
+                    subchart: submit(
+                        (*chart_id, "subchart", subchart),
+                        helm.show_subchart,
+                        project_path,
+                        names[workload],
+                        values["name"],
+                        subchart,
+                        values["version"],
+                    )
+                    for subchart in values.get("subcharts", [])
+                },
+            }
+
+    for workload, futures in pending.items():
+        parsed_charts[workload]["chart"] = futures["chart"].result()
+        parsed_charts[workload]["values"] = futures["values"].result()
+        if "subcharts" in workloads_data[workload]:
+            parsed_charts[workload]["subcharts"] = {
+                subchart: future.result() for subchart, future in futures["subcharts"].items()
+            }
     return parsed_charts
 
 
@@ -188,10 +235,46 @@ def main() -> None:
 
     workloads_data = parser.get_workloads(args.versions_dir, args.eks_version)
 
+    # replicate_charts.py pulls charts from the repositories registered here, cached or not
     update_helm(args.update_helm, workloads_data)
-    # custom_chart_values = {}
-    parsed_charts = fetch_chart_info(workloads_data)
-    custom_chart_values = apply_chart_info(workloads_data, parsed_charts, args.registry_prefix, images_wip_list)
+
+    chart_info_cache = ChartInfoCache(args.chart_info_cache).load() if args.chart_info_cache else None
+    fingerprints = {workload: fingerprint(values, args.registry_prefix) for workload, values in workloads_data.items()}
+    cached = {}
+    if chart_info_cache:
+        for workload in workloads_data:
+            entry = chart_info_cache.get(workload, fingerprints[workload])
+            if entry:
+                cached[workload] = entry
+        logger.info(f"Reusing chart info of {len(cached)} of {len(workloads_data)} workloads")
+    changed_workloads = {workload: values for workload, values in workloads_data.items() if workload not in cached}
+
+    parsed_charts: Dict[str, Any] = {}
+    if changed_workloads:
+        cache = ChartCache.from_env(os.path.join(project_path, ".helm-cache"))
+        repositories = ChartRepositories(
+            *get_credentials(repo_secret, repo_key),  # type: ignore
+            cache_dir=os.path.join(cache.cache_dir, "indexes") if cache else None,
+        )
+        repositories.load((values["repository"] for values in changed_workloads.values()), args.concurrency)
+        parsed_charts = fetch_chart_info(changed_workloads, args.concurrency, cache, repositories)
+
+    # workloads keep the order of the versions files, whether their chart info is cached or not
+    custom_chart_values = {}
+    for workload, values in workloads_data.items():
+        if workload in cached:
+            custom_chart_values[workload] = cached[workload]["values"]
+            workload_images = cached[workload]["images"]
+        else:
+            workload_images = []
+            custom_chart_values.update(
+                apply_chart_info({workload: values}, parsed_charts, args.registry_prefix, workload_images)
+            )
+        images_wip_list.extend(workload_images)
+        if chart_info_cache:
+            chart_info_cache.record(workload, fingerprints[workload], custom_chart_values[workload], workload_images)
+    if chart_info_cache:
+        chart_info_cache.save()
 
     updated_images = []
 
@@ -229,6 +312,8 @@ def main() -> None:
     ) as file:
         file.write(json.dumps(updated_images, indent=4))
 
+    metrics.report("chart-info")
+
 
 if __name__ == "__main__":
     main()
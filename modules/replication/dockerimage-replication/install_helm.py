@@ -1,8 +1,14 @@
+import hashlib
+import json
 import os
 import shutil
+import stat
 import tarfile
+import tempfile
+from typing import Any, Dict, Optional, Tuple
 
-import requests  # type:ignore
+import requests
+import urllib3
 
 from replication.logging import logger
 from replication.utils import get_credentials
@@ -10,47 +16,171 @@ from replication.utils import get_credentials
 distro_url = os.getenv("SEEDFARMER_PARAMETER_HELM_DISTRO_URL", "https://get.helm.sh/helm-v3.11.3-linux-amd64.tar.gz")
 distro_secret = os.getenv("SEEDFARMER_PARAMETER_HELM_DISTRO_SECRET_NAME", None)
 distro_key = os.getenv("SEEDFARMER_PARAMETER_HELM_DISTRO_SECRET_KEY", None)
-tar_filename = "helm.tar.gz"
-extracted_dir = "linux-amd64"
+# sha256 of the distribution tarball, read from `<distro url>.sha256sum` when not set
+distro_sha256 = os.getenv("SEEDFARMER_PARAMETER_HELM_DISTRO_SHA256", None)
+cache_dir = os.getenv("HELM_DISTRO_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "helm-distro"))
 dest_path = "/usr/local/bin/helm"
+chunk_size = 1024 * 1024
+max_resumes = 3
 
 
-def get_distro() -> requests.models.Response:
+def _auth() -> Optional[Tuple[str, str]]:
     if distro_secret is None:
         # Security: This log message only indicates authentication mode, no credentials are logged.
         logger.info("Downloading Helm distribution without authentication")  # nosec
-        response = requests.get(distro_url, stream=True)
+        return None
+    user, pwd = get_credentials(distro_secret, distro_key)
+    if user is None or pwd is None:
+        # Security: This log message only indicates authentication mode, no credentials are logged.
+        logger.info("Downloading Helm distribution without authentication (credentials not found in secret)")  # nosec
+        return None
+    # Security: This log message only indicates authentication mode, no credentials are logged.
+    logger.info("Downloading Helm distribution with authentication")  # nosec
+    return (user, pwd)
+
+
+def get_distro(
+    auth: Optional[Tuple[str, str]] = None, headers: Optional[Dict[str, str]] = None, url: Optional[str] = None
+) -> requests.models.Response:
+    kwargs: Dict[str, Any] = {"stream": True}
+    if auth:
+        kwargs["auth"] = auth
+    if headers:
+        kwargs["headers"] = headers
+    return requests.get(url or distro_url, **kwargs)
+
+
+def expected_sha256(auth: Optional[Tuple[str, str]] = None) -> Optional[str]:
+    """Returns the published sha256 of the distribution, None when it cannot be found"""
+    if distro_sha256:
+        return distro_sha256.lower()
+    try:
+        response = get_distro(auth, url=f"{distro_url}.sha256sum")
+        if response.status_code == 200:
+            return str(response.text.split()[0].lower())
+    except requests.RequestException:
+        pass
+    logger.info(f"No checksum published for {distro_url}, the download is not verified")
+    return None
+
+
+class _ResumableStream:
+    """File-like view of the distribution download that hashes what is read and resumes with a
+    `Range` request when the connection drops"""
+
+    def __init__(self, auth: Optional[Tuple[str, str]]):
+        self.auth = auth
+        self.offset = 0
+        self.resumes = 0
+        self.sha256 = hashlib.sha256()
+        self.response = self._open()
+
+    def _open(self) -> requests.models.Response:
+        headers = {"Range": f"bytes={self.offset}-"} if self.offset else None
+        response = get_distro(self.auth, headers)
+        expected = 206 if self.offset else 200
+        if response.status_code != expected:
+            raise Exception(f"Failed to download file: {response.status_code}")
+        # raw tarball bytes, so offsets match the `Range` of a resumed request
+        response.raw.decode_content = False
         return response
-    else:
-        user, pwd = get_credentials(distro_secret, distro_key)
-        if user is None or pwd is None:
-            # Security: This log message only indicates authentication mode, no credentials are logged.
-            logger.info("Downloading Helm distribution without authentication (credentials not found in secret)")  # nosec
-            response = requests.get(distro_url, stream=True)
-            return response
-        else:
-            # Security: This log message only indicates authentication mode, no credentials are logged.
-            logger.info("Downloading Helm distribution with authentication")  # nosec
-            response = requests.get(distro_url, stream=True, auth=(user, pwd))
-            return response
 
+    def read(self, size: int = -1) -> bytes:
+        while True:
+            try:
+                data: bytes = self.response.raw.read(size)
+                break
+            except (requests.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+                if self.resumes >= max_resumes:
+                    raise
+                self.resumes += 1
+                logger.info(f"Download interrupted at {self.offset} bytes ({e}), resuming")
+                self.response.close()
+                self.response = self._open()
+        self.offset += len(data)
+        self.sha256.update(data)
+        return data
 
-def install_helm() -> None:
-    response = get_distro()
-    if response.status_code == 200:
-        with open(tar_filename, "wb") as file:
-            for chunk in response.iter_content(chunk_size=1024):
-                file.write(chunk)
-    else:
-        raise Exception(f"Failed to download file: {response.status_code}")
+    def drain(self) -> None:
+        while self.read(chunk_size):
+            pass
 
-    with tarfile.open(tar_filename, "r:gz") as tar:
-        tar.extractall()
+    def close(self) -> None:
+        self.response.close()
 
-    shutil.move(os.path.join(extracted_dir, "helm"), dest_path)
 
-    shutil.rmtree(extracted_dir)
-    os.remove(tar_filename)
+def _cache_entry() -> str:
+    return os.path.join(cache_dir, hashlib.sha256(distro_url.encode("utf-8")).hexdigest()[:16])
+
+
+def _cached_binary() -> Optional[str]:
+    entry = _cache_entry()
+    binary = os.path.join(entry, "helm")
+    try:
+        with open(os.path.join(entry, "metadata.json"), encoding="utf-8") as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if metadata.get("url") != distro_url or not os.path.isfile(binary):
+        return None
+    with open(binary, "rb") as f:
+        if hashlib.sha256(f.read()).hexdigest() != metadata.get("binarySha256"):
+            return None
+    return binary
+
+
+def download_helm() -> str:
+    """Streams the distribution and extracts only the `helm` binary into the cache
+
+    Returns:
+        str: Path of the cached binary
+    """
+    auth = _auth()
+    checksum = expected_sha256(auth)
+    entry = _cache_entry()
+    os.makedirs(cache_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(dir=cache_dir)
+    try:
+        stream = _ResumableStream(auth)
+        try:
+            binary = os.path.join(work_dir, "helm")
+            with tarfile.open(fileobj=stream, mode="r|gz", bufsize=chunk_size) as tar:  # type: ignore
+                for member in tar:
+                    if member.isfile() and os.path.basename(member.name) == "helm":
+                        with tar.extractfile(member) as src, open(binary, "wb") as dst:
+                            shutil.copyfileobj(src, dst, chunk_size)
+                        break
+                else:
+                    raise Exception(f"No helm binary in {distro_url}")
+            # the checksum covers the whole tarball
+            stream.drain()
+        finally:
+            stream.close()
+
+        if checksum and stream.sha256.hexdigest() != checksum:
+            raise Exception(f"Checksum mismatch for {distro_url}")
+        os.chmod(binary, os.stat(binary).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+        with open(binary, "rb") as f:
+            binary_sha256 = hashlib.sha256(f.read()).hexdigest()
+        with open(os.path.join(work_dir, "metadata.json"), "w", encoding="utf-8") as f:
+            json.dump({"url": distro_url, "sha256": stream.sha256.hexdigest(), "binarySha256": binary_sha256}, f)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(work_dir, entry)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    logger.info(f"Downloaded {stream.offset} bytes from {distro_url}")
+    return os.path.join(entry, "helm")
+
+
+def install_helm() -> None:
+    binary = _cached_binary()
+    if binary:
+        logger.info(f"Using cached Helm distribution for {distro_url}")
+    else:
+        binary = download_helm()
+
+    shutil.copy2(binary, dest_path)
 
     logger.info(f"Helm installed successfully at {dest_path}")
 
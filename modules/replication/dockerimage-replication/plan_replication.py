@@ -0,0 +1,99 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Computes what the replication would transfer, without transferring anything
+
+Writes `replication-plan.json`, which `replicate_images.py` and `replicate_charts.py` consume so targets are not
+checked twice. The duration estimate uses the throughput measured by the previous replication run.
+
+Image manifests are only resolved to count the bytes to transfer with the `registry` transfer backend: Docker Hub
+counts manifest requests as pulls, which the `docker` backend would repeat when pulling the image.
+"""
+
+import json
+import os
+import sys
+from typing import Any, Dict, List
+
+from replication.checkpoint import Checkpoint
+from replication.ecr.ecr_utils import ECRUtils, split_target_image
+from replication.logging import logger
+from replication.plan import (
+    CHARTS_FILE,
+    IMAGES_FILE,
+    PLAN_FILE,
+    chart_repository,
+    input_digests,
+    plan_charts,
+    plan_images,
+    summarize,
+    write_plan,
+)
+from replication.registry.copier import DEFAULT_PLATFORM, ImageCopier, parse_platforms
+from replication.registry.registry_client import RegistryClient, RegistryClients
+from replication.state import ReplicationState
+from replication.utils import get_credentials
+
+aws_region = os.getenv("AWS_DEFAULT_REGION")
+aws_account_id = os.getenv("AWS_ACCOUNT_ID")
+aws_partition = os.getenv("AWS_PARTITION", "aws")
+aws_domain = "amazonaws.com" if aws_partition == "aws" else "amazonaws.com.cn"
+
+repo_secret = os.getenv("SEEDFARMER_PARAMETER_HELM_REPO_SECRET_NAME", None)
+repo_key = os.getenv("SEEDFARMER_PARAMETER_HELM_REPO_SECRET_KEY", None)
+transfer_backend = os.getenv("SEEDFARMER_PARAMETER_TRANSFER_BACKEND", "docker").lower()
+planning_concurrency = int(os.getenv("SEEDFARMER_PARAMETER_PLANNING_CONCURRENCY", "8"))
+replication_platforms = parse_platforms(os.getenv("SEEDFARMER_PARAMETER_REPLICATION_PLATFORMS", DEFAULT_PLATFORM))
+state_uri = os.getenv("REPLICATION_STATE_URI")
+checkpoint_prefix = os.getenv("REPLICATION_CHECKPOINT_PREFIX")
+
+
+def main() -> None:
+    if not os.path.isfile(IMAGES_FILE):
+        logger.info(f"Error: {IMAGES_FILE} not found!")
+        sys.exit(1)
+    inputs = input_digests([IMAGES_FILE, CHARTS_FILE])
+    with open(IMAGES_FILE, "r") as f:
+        image_data: List[Dict[str, str]] = json.load(f)
+    charts: Dict[str, Dict[str, Any]] = {}
+    if os.path.isfile(CHARTS_FILE):
+        with open(CHARTS_FILE, "r") as f:
+            charts = json.load(f).get("charts", {})
+
+    repo_user, repo_password = get_credentials(repo_secret, repo_key)  # type:ignore
+    ecr_utils = ECRUtils(aws_account_id, aws_region, aws_domain)  # type:ignore
+    sources = RegistryClients(repo_user or None, repo_password or None)
+    # only source manifests are read, the target client is never used
+    copier = (
+        ImageCopier(RegistryClient(ecr_utils.registry), sources, replication_platforms)
+        if transfer_backend == "registry"
+        else None
+    )
+    if copier is None:
+        logger.info(f"Not counting the bytes to transfer with the {transfer_backend} transfer backend")
+    ecr_utils.load_index(
+        {split_target_image(image_repl["target"], aws_account_id)[0] for image_repl in image_data}  # type:ignore
+        | {chart_repository(chart) for chart in charts.values()},
+        max_workers=planning_concurrency,
+    )
+    state = ReplicationState(state_uri).load() if state_uri else None
+
+    # images and charts completed by an interrupted run are not looked up again
+    images_checkpoint = Checkpoint(f"{checkpoint_prefix}-images.jsonl").load() if checkpoint_prefix else None
+    charts_checkpoint = Checkpoint(f"{checkpoint_prefix}-charts.jsonl").load() if checkpoint_prefix else None
+
+    images = plan_images(ecr_utils, image_data, sources, copier, state, planning_concurrency, images_checkpoint)
+    chart_plan = plan_charts(ecr_utils, charts, charts_checkpoint)
+    summary = summarize(images, chart_plan, state.throughput if state else None)
+    write_plan(PLAN_FILE, images, chart_plan, summary, inputs)
+
+    logger.info(f"Images: {summary['images']}, charts: {summary['charts']}")
+    logger.info(
+        f"{summary['uniqueBytes']} bytes to transfer ({summary['totalBytes']} before deduplication),"
+        f" estimated {summary['estimatedSeconds']}s at {int(summary['throughputBytesPerSecond'])} bytes/s"
+    )
+    logger.info(f"Plan written to {PLAN_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,23 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import glob
 import json
 import os
+import shutil
 import sys
-import time
-from typing import Any, Dict
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
 
+from replication.checkpoint import Checkpoint
 from replication.ecr.ecr_utils import ECRUtils
+from replication.helm.repository import repository_names
 from replication.logging import logger
-from replication.utils import export_results, get_credentials, run_command
-
-successful_replication = []
-failed_replication = []
+from replication.metrics import metrics
+from replication.plan import CURRENT, MISSING, chart_reference, chart_repository, load_plan
+from replication.utils import export_results, get_credentials, run_command, wait_until
 
 aws_account_id = os.getenv("AWS_ACCOUNT_ID")
 aws_region = os.getenv("AWS_DEFAULT_REGION")
@@ -21,10 +26,43 @@ aws_domain = "amazonaws.com" if aws_partition == "aws" else "amazonaws.com.cn"
 
 repo_secret = os.getenv("SEEDFARMER_PARAMETER_HELM_REPO_SECRET_NAME", None)
 repo_key = os.getenv("SEEDFARMER_PARAMETER_HELM_REPO_SECRET_KEY", None)
-
-
-def process_chart(ecr_utils: ECRUtils, chart_key: str, chart_data: Dict[str, Any]) -> None:
-    """Process a single chart from the JSON document."""
+replication_concurrency = int(os.getenv("SEEDFARMER_PARAMETER_REPLICATION_CONCURRENCY", "4"))
+# local path or s3:// URI prefix of the journals of interrupted runs
+checkpoint_prefix = os.getenv("REPLICATION_CHECKPOINT_PREFIX")
+
+# `helm registry login` rewrites the registry config, so a source repository is logged into once, by one worker
+_registry_logins: Dict[str, bool] = {}
+_registry_login_lock = threading.Lock()
+
+
+def _registry_login(src_repository: str, repo_user: str, repo_password: str) -> bool:
+    with _registry_login_lock:
+        if src_repository not in _registry_logins:
+            logger.info(f"Logging into source Helm repository: {src_repository}")
+            helm_login_command = (
+                f"helm registry login {src_repository} --username {repo_user} --password {repo_password}"
+            )
+            _registry_logins[src_repository] = run_command(helm_login_command.split(), shell=False)
+        return _registry_logins[src_repository]
+
+
+def process_chart(
+    ecr_utils: ECRUtils,
+    chart_key: str,
+    chart_data: Dict[str, Any],
+    repo_user: Optional[str] = None,
+    repo_password: Optional[str] = None,
+    repo_name: Optional[str] = None,
+    check_existing: bool = True,
+) -> bool:
+    """Process a single chart from the JSON document.
+
+    Every chart is pulled into its own working directory, so charts can be processed concurrently.
+    `check_existing=False` skips the ECR lookup of a chart the replication plan found missing.
+
+    Returns:
+        bool: True when the chart is available in ECR
+    """
     logger.info(f"Processing chart: {chart_key} ")
 
     # Extract Helm and repository details
@@ -35,64 +73,112 @@ def process_chart(ecr_utils: ECRUtils, chart_key: str, chart_data: Dict[str, Any
     target_repository = helm["repository"]
 
     # Prepare for push
-    chart_package = f"{name}-{version}.tgz"
-    ecr_repo_name = f"{target_repository.replace('oci://', '').split('/', 1)[-1]}"
+    ecr_repo_name = chart_repository(chart_data)
     ecr_repo_target = target_repository.replace(f"/{name}", "")
 
-    if ecr_utils.image_exists(ecr_repo_name, version):
+    if check_existing and ecr_utils.image_exists(ecr_repo_name, version):
         logger.info(f"Chart {name} with version {version} already exists in {ecr_repo_name}. Skipping.")
-        successful_replication.append(name)
-        return
+        return True
 
     # Log in to the source repository
-    repo_user, repo_password = get_credentials(repo_secret, repo_key)  # type:ignore
     if repo_user and repo_password:
-        logger.info(f"Logging into source Helm repository: {src_repository}")
-        helm_login_command = f"helm registry login {src_repository} --username {repo_user} --password {repo_password}"
-        if not run_command(helm_login_command.split(), shell=False):
+        if not _registry_login(src_repository, repo_user, repo_password):
             logger.info(f"Error: Failed to log in to source Helm repository {src_repository}. Skipping {name}.")
-            failed_replication.append(name)
-            return
-
-    # Pull the chart
-    chart_path = f"{src_repository}/{name}"
-
-    logger.info(f"Pulling chart: {name} (Version: {version}) from {chart_path}")
-    pull_command = f"helm pull {chart_key}/{name} --version {version}"
-    if not run_command(pull_command.split(), shell=False):
-        logger.info(f"Error: Failed to pull chart: {chart_key}/{name} Skipping.")
-        failed_replication.append(name)
-        return
-    time.sleep(2)
-
-    logger.info(f" {chart_package}  {ecr_repo_name}")
+            return False
 
-    # Create the ECR repository if needed
+    work_dir = tempfile.mkdtemp(prefix=f".{name}-{version}-", dir=os.getcwd())
     try:
-        ecr_utils.create_repository(ecr_repo_name)
-    except Exception as e:
-        logger.info(f"Error: Could not ensure ECR repository exists. Skipping {name}. - {e}")
-        failed_replication.append(name)
-        return
-
-    # Push the chart to the target ECR repository
-    logger.info(f"Pushing chart: {chart_package} to {ecr_repo_target}")
-    push_command = f"helm push {chart_package} {ecr_repo_target}"
-    if not run_command(push_command.split(), shell=False):
-        logger.info(f"Error: Failed to push chart: {ecr_repo_name}. Skipping.")
-        failed_replication.append(name)
-        return
-
-    successful_replication.append(name)
-
-    # Clean up local chart package
-    logger.info(f"Cleaning up local chart package: {chart_package}")
-    run_command((f"rm -f {chart_package}").split(), shell=False)
+        # Pull the chart
+        chart_path = f"{src_repository}/{name}"
+
+        logger.info(f"Pulling chart: {name} (Version: {version}) from {chart_path}")
+        pull_command = f"helm pull {repo_name or chart_key}/{name} --version {version} --destination {work_dir}"
+        if not run_command(pull_command.split(), shell=False, registry=src_repository):
+            logger.info(f"Error: Failed to pull chart: {repo_name or chart_key}/{name} Skipping.")
+            return False
+        packages = glob.glob(os.path.join(work_dir, "*.tgz"))
+        if not packages:
+            logger.info(f"Error: No chart package pulled for {name}. Skipping.")
+            return False
+        chart_package = packages[0]
+
+        logger.info(f" {os.path.basename(chart_package)}  {ecr_repo_name}")
+
+        # Create the ECR repository if needed
+        try:
+            ecr_utils.create_repository(ecr_repo_name)
+        except Exception as e:
+            logger.info(f"Error: Could not ensure ECR repository exists. Skipping {name}. - {e}")
+            return False
+
+        # Push the chart to the target ECR repository
+        logger.info(f"Pushing chart: {os.path.basename(chart_package)} to {ecr_repo_target}")
+        push_command = f"helm push {chart_package} {ecr_repo_target}"
+        if not run_command(push_command.split(), shell=False):
+            logger.info(f"Error: Failed to push chart: {ecr_repo_name}. Skipping.")
+            return False
+    finally:
+        # Clean up local chart package
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # wait for the pushed chart to be listed instead of sleeping a fixed amount of time
+    if not wait_until(lambda: ecr_utils.image_digest(ecr_repo_name, version, refresh=True) is not None):
+        logger.info(f"Chart {name}:{version} is not listed in {ecr_repo_name} yet")
+        ecr_utils.record_image(ecr_repo_name, version)
 
     logger.info(f"Successfully processed {name} -> {target_repository}")
     logger.info("------------------------------------------------")
-
-    time.sleep(2)
+    return True
+
+
+def replicate(
+    ecr_utils: ECRUtils,
+    charts: Dict[str, Dict[str, Any]],
+    repo_user: Optional[str] = None,
+    repo_password: Optional[str] = None,
+    max_workers: int = replication_concurrency,
+    plan: Optional[Dict[str, str]] = None,
+    checkpoint: Optional[Checkpoint] = None,
+) -> Tuple[List[str], List[str]]:
+    """Replicates charts with a bounded pool of workers
+
+    Results are collected on the calling thread, the returned lists keep the order of `charts`.
+    `plan` holds the planned status of every chart key, charts planned as current are not processed.
+    Every replicated chart is journaled to `checkpoint`.
+
+    Returns:
+        tuple: names of the successfully and unsuccessfully replicated charts
+    """
+    names = repository_names({chart_key: chart["helm"]["srcRepository"] for chart_key, chart in charts.items()})
+    plan = plan or {}
+    outcomes: Dict[str, bool] = {chart_key: True for chart_key in charts if plan.get(chart_key) == CURRENT}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(
+                metrics.track,
+                "chart",
+                chart_key,
+                process_chart,
+                ecr_utils,
+                chart_key,
+                chart_data,
+                repo_user,
+                repo_password,
+                names[chart_key],
+                plan.get(chart_key) != MISSING,
+            ): chart_key
+            for chart_key, chart_data in charts.items()
+            if chart_key not in outcomes
+        }
+        for future in as_completed(futures):
+            chart_key = futures[future]
+            outcomes[chart_key] = future.result()
+            if outcomes[chart_key] and checkpoint:
+                checkpoint.record("chart", chart_reference(charts[chart_key]))
+
+    successful_replication = [chart["helm"]["name"] for chart_key, chart in charts.items() if outcomes[chart_key]]
+    failed_replication = [chart["helm"]["name"] for chart_key, chart in charts.items() if not outcomes[chart_key]]
+    return successful_replication, failed_replication
 
 
 def main() -> None:
@@ -122,12 +208,37 @@ def main() -> None:
         logger.info("Cannot log into account ECR, skipping everything")
         return
 
-    # Process each chart
-    for chart_key, chart_data in charts.items():
-        process_chart(ecr_utils, chart_key, chart_data)
-
+    replication_plan = load_plan()
+    plan = {entry["key"]: entry["status"] for entry in replication_plan["charts"]} if replication_plan else {}
+    checkpoint = Checkpoint(f"{checkpoint_prefix}-charts.jsonl").load() if checkpoint_prefix else None
+    if checkpoint:
+        # charts journaled by an interrupted run are skipped without API calls
+        plan.update({key: CURRENT for key, chart in charts.items() if checkpoint.get("chart", chart_reference(chart))})
+    target_repositories = {chart_repository(chart) for chart in charts.values()}
+    # tags are only listed for the repositories of charts the plan did not decide on
+    ecr_utils.load_index(
+        {chart_repository(chart) for key, chart in charts.items() if plan.get(key) not in (CURRENT, MISSING)}
+    )
+    # missing repositories are created in the background while the first charts are pulled
+    ecr_utils.create_repositories(target_repositories)
+
+    # Fetch the source repository credentials once for all charts
+    repo_user, repo_password = get_credentials(repo_secret, repo_key)  # type:ignore
+    logger.info(f"Replicating {len(charts)} charts with {replication_concurrency} workers")
+    try:
+        successful_replication, failed_replication = replicate(
+            ecr_utils, charts, repo_user, repo_password, plan=plan, checkpoint=checkpoint
+        )
+    finally:
+        ecr_utils.close()
+        if checkpoint:
+            checkpoint.flush()
+
+    metrics.report("charts")
     export_results("Successfully replicated charts", successful_replication)  # type: ignore
     export_results("FAILED replicated charts", failed_replication)  # type: ignore
+    if checkpoint:
+        checkpoint.clear()
 
     logger.info("Script completed.")
 
@@ -3,16 +3,23 @@
 
 import json
 import os
+import subprocess
 import sys
-from typing import Dict, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
 
-from replication.ecr.ecr_utils import ECRUtils
+from replication.checkpoint import Checkpoint
+from replication.ecr.ecr_utils import ECRUtils, split_target_image
 from replication.logging import logger
+from replication.metrics import metrics
+from replication.plan import CHANGED, CURRENT, MISSING, load_plan
+from replication.registry.copier import DEFAULT_PLATFORM, ImageCopier, parse_platforms
+from replication.registry.registry_client import ImageReference, RegistryClient, RegistryClients
+from replication.state import ReplicationState
 from replication.utils import export_results, get_credentials, run_command
 
-successful_replication = []
-failed_replication = []
-
 aws_region = os.getenv("AWS_DEFAULT_REGION")
 aws_account_id = os.getenv("AWS_ACCOUNT_ID")
 aws_partition = os.getenv("AWS_PARTITION", "aws")
@@ -20,6 +27,37 @@ aws_domain = "amazonaws.com" if aws_partition == "aws" else "amazonaws.com.cn"
 
 repo_secret = os.getenv("SEEDFARMER_PARAMETER_HELM_REPO_SECRET_NAME", None)
 repo_key = os.getenv("SEEDFARMER_PARAMETER_HELM_REPO_SECRET_KEY", None)
+replication_concurrency = int(os.getenv("SEEDFARMER_PARAMETER_REPLICATION_CONCURRENCY", "4"))
+# docker: pull/tag/push through the local daemon, registry: stream blobs between registries over the OCI API
+transfer_backend = os.getenv("SEEDFARMER_PARAMETER_TRANSFER_BACKEND", "docker").lower()
+# platforms of multi-platform images copied by the registry backend, `all` or a comma separated list
+replication_platforms = parse_platforms(os.getenv("SEEDFARMER_PARAMETER_REPLICATION_PLATFORMS", DEFAULT_PLATFORM))
+# local file or s3:// URI of the state used to skip images whose source digest did not change
+state_uri = os.getenv("REPLICATION_STATE_URI")
+# local path or s3:// URI prefix of the journals of interrupted runs
+checkpoint_prefix = os.getenv("REPLICATION_CHECKPOINT_PREFIX")
+
+# `docker login` rewrites ~/.docker/config.json, so concurrent workers must not interleave logins
+_docker_login_lock = threading.Lock()
+# the same source image may be listed for several targets, its pull/tag/rmi sequence must not interleave
+_source_locks: Dict[str, threading.Lock] = {}
+_source_locks_guard = threading.Lock()
+
+
+def _source_lock(src: str) -> threading.Lock:
+    with _source_locks_guard:
+        return _source_locks.setdefault(src, threading.Lock())
+
+
+def image_size(image: str) -> int:
+    """Size in bytes of a local image as reported by `docker image inspect`, 0 when it cannot be inspected"""
+    try:
+        result = subprocess.run(
+            ["docker", "image", "inspect", "--format", "{{.Size}}", image], shell=False, capture_output=True, text=True
+        )
+        return int(result.stdout.strip()) if result.returncode == 0 else 0
+    except (OSError, ValueError):
+        return 0
 
 
 # Pull and push Docker image
@@ -30,16 +68,20 @@ def pull_and_push_image(
         if username and password:
             # logger.info(f"Username and PWD found {username} to log into the src docker repo")
             login_cmd = ["docker", "login", "-u", username, "-p", password, src_repo]
-            logged_in = run_command(login_cmd, shell=False)  # tyep: ignore
+            with _docker_login_lock:
+                logged_in = run_command(login_cmd, shell=False)  # tyep: ignore
             if not logged_in:
                 logger.info(f"Failed to login to {src_repo}")
                 return False
-        logger.info(f"Pulling image {src}")
-        pull_image = run_command(["docker", "pull", src], shell=False)
-        tag_image = run_command(["docker", "tag", src, target_ecr_tag], shell=False)
-        logger.info(f"Pushing image {target_ecr_tag}")
-        push_image = run_command(["docker", "push", target_ecr_tag], shell=False)
-        run_command(["docker", "rmi", src], shell=False)
+        with _source_lock(src):
+            logger.info(f"Pulling image {src}")
+            pull_image = run_command(["docker", "pull", src], shell=False, registry=ImageReference.parse(src).registry)
+            # the uncompressed size of the image stands for the bytes pushed, docker does not report the layers sent
+            size = image_size(src) if pull_image else 0
+            tag_image = run_command(["docker", "tag", src, target_ecr_tag], shell=False)
+            logger.info(f"Pushing image {target_ecr_tag}")
+            push_image = run_command(["docker", "push", target_ecr_tag], shell=False, transferred_bytes=size)
+            run_command(["docker", "rmi", src], shell=False)
         if False in [pull_image, tag_image, push_image]:
             return False
         return True
@@ -49,13 +91,28 @@ def pull_and_push_image(
         return False
 
 
+def target_repository(target: str) -> Tuple[str, str]:
+    """Splits a target image into the ECR repository name and tag"""
+    return split_target_image(target, aws_account_id)  # type: ignore
+
+
 # Create workflow
 def create(
     ecr_utils: ECRUtils,
     image_repl: Dict[str, str],
     src_repo_user: Optional[str] = None,
     src_repo_pwd: Optional[str] = None,
-) -> None:
+    copier: Optional[ImageCopier] = None,
+    state: Optional[ReplicationState] = None,
+    sources: Optional[RegistryClients] = None,
+    planned: Optional[Dict[str, Any]] = None,
+) -> bool:
+    """Replicates a single image, returns True when the image is available in ECR
+
+    With a replication state, an existing tag is only trusted while the source still resolves to the digest it
+    was replicated from; a re-pushed upstream tag is replicated again. An image of the replication plan is
+    not checked again, unless the planner could not resolve its source.
+    """
     try:
         src = image_repl["src"]
         target = image_repl["target"]
@@ -63,27 +120,120 @@ def create(
         src_repo = src_info[0]
         # src_version = src_info[1]
 
-        target_info = target.split(":")
-        target_repo = target_info[0]
-        if target_repo.startswith(f"{aws_account_id}.dkr.ecr"):
-            s = target_repo.split("/")
-            target_repo = "/".join(s[1:])
-
-        target_version = target_info[1]
+        target_repo, target_version = target_repository(target)
+        planned = planned or {}
+        status = planned.get("status")
+        if status == CURRENT:
+            source_digest, target_digest = planned.get("sourceDigest"), planned.get("targetDigest")
+            if state and source_digest and not state.is_current(target, source_digest, target_digest):
+                state.record(target, src, source_digest, target_digest)
+            logger.info(f"{target_version} found in {target_repo} by the replication plan, skipping replication")
+            return True
         ecr_utils.create_repository(target_repo)
-        if not ecr_utils.image_exists(target_repo, target_version):
+        if status in (MISSING, CHANGED):
+            source_digest = planned.get("sourceDigest")
+            exists = False
+        else:
+            source_digest = sources.resolve_digest(src) if state and sources else None
+            exists = ecr_utils.image_exists(target_repo, target_version)
+        if exists and state and source_digest:
+            target_digest = ecr_utils.image_digest(target_repo, target_version)
+            if state.get(target) is None:
+                # adopt images replicated before the state was kept
+                state.record(target, src, source_digest, target_digest)
+            elif not state.is_current(target, source_digest, target_digest):
+                logger.info(f"{src} changed to {source_digest}, refreshing {target_repo}:{target_version}")
+                exists = False
+        if not exists:
             logger.info(f"{target_repo}:{target_version} not found, fetching")
-            result_push = pull_and_push_image(src_repo, src, target, src_repo_user, src_repo_pwd)
+            if copier:
+                result_push = copier.copy(src, target)
+            else:
+                result_push = pull_and_push_image(src_repo, src, target, src_repo_user, src_repo_pwd)
             if not result_push:
-                failed_replication.append(image_repl)
-                return
+                return False
+            ecr_utils.record_image(target_repo, target_version)
+            if state and source_digest:
+                state.record(
+                    target, src, source_digest, ecr_utils.image_digest(target_repo, target_version, refresh=True)
+                )
         else:
             logger.info(f"{target_version} found in {target_repo}, skipping replication")
     except Exception as e:
         logger.info(f"Error: {e}")
-        failed_replication.append(image_repl)
-        return
-    successful_replication.append(image_repl)
+        return False
+    return True
+
+
+def replicate(
+    ecr_utils: ECRUtils,
+    image_data: List[Dict[str, str]],
+    src_repo_user: Optional[str] = None,
+    src_repo_pwd: Optional[str] = None,
+    max_workers: int = replication_concurrency,
+    copier: Optional[ImageCopier] = None,
+    state: Optional[ReplicationState] = None,
+    sources: Optional[RegistryClients] = None,
+    plan: Optional[Dict[str, Dict[str, Any]]] = None,
+    checkpoint: Optional[Checkpoint] = None,
+) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """Replicates images with a bounded pool of workers
+
+    Results are collected on the calling thread as workers finish, so the returned lists
+    keep the order of `image_data` regardless of completion order. `plan` holds the planned
+    entry of every target image, every replicated image is journaled to `checkpoint`.
+
+    Returns:
+        tuple: successful and failed replications
+    """
+    outcomes: Dict[int, bool] = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(
+                metrics.track,
+                "image",
+                image_repl["target"],
+                create,
+                ecr_utils,
+                image_repl,
+                src_repo_user,
+                src_repo_pwd,
+                copier,
+                state,
+                sources,
+                (plan or {}).get(image_repl["target"]),
+            ): index
+            for index, image_repl in enumerate(image_data)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            outcomes[index] = future.result()
+            if outcomes[index] and checkpoint:
+                target = image_data[index]["target"]
+                recorded = (state.get(target) if state else None) or {}
+                checkpoint.record(
+                    "image",
+                    target,
+                    source=image_data[index]["src"],
+                    sourceDigest=recorded.get("sourceDigest"),
+                    targetDigest=recorded.get("targetDigest"),
+                )
+
+    successful_replication = [image_repl for index, image_repl in enumerate(image_data) if outcomes[index]]
+    failed_replication = [image_repl for index, image_repl in enumerate(image_data) if not outcomes[index]]
+    return successful_replication, failed_replication
+
+
+def resume(
+    planned: Dict[str, Dict[str, Any]], image_data: List[Dict[str, str]], checkpoint: Checkpoint
+) -> Dict[str, Dict[str, Any]]:
+    """Plans the images journaled by an interrupted run as current, so they are skipped without API calls"""
+    resumed = dict(planned)
+    for image_repl in image_data:
+        done = checkpoint.get("image", image_repl["target"])
+        if done and done.get("source") == image_repl["src"]:
+            resumed[image_repl["target"]] = {**done, "status": CURRENT}
+    return resumed
 
 
 def main() -> None:
@@ -104,15 +254,88 @@ def main() -> None:
     else:
         logger.info("Using auth for source repos for images")
     ecr_utils = ECRUtils(aws_account_id, aws_region, aws_domain)  # type:ignore
+    sources = RegistryClients(repo_user, repo_password)
+    checkpoint = Checkpoint(f"{checkpoint_prefix}-images.jsonl").load() if checkpoint_prefix else None
+    copier = None
     try:
-        ecr_utils.login_to_ecr(type="docker")
+        if transfer_backend == "registry":
+            copier = ImageCopier(
+                RegistryClient(ecr_utils.registry, *ecr_utils.get_registry_credentials()),
+                sources,
+                replication_platforms,
+                checkpoint=checkpoint,
+            )
+        else:
+            if replication_platforms != [DEFAULT_PLATFORM]:
+                logger.info(f"The docker backend only replicates {DEFAULT_PLATFORM}, use the registry backend")
+            ecr_utils.login_to_ecr(type="docker")
     except Exception:
         logger.info("Cannot log into ECR, stopping the replication entirely")
         exit(1)
-    for image_repl in image_data:
-        create(ecr_utils, image_repl, repo_user, repo_password)
+    replication_plan = load_plan()
+    planned = {entry["target"]: entry for entry in replication_plan["images"]} if replication_plan else {}
+    if checkpoint:
+        planned = resume(planned, image_data, checkpoint)
+    target_repositories = {target_repository(image_repl["target"])[0] for image_repl in image_data}
+    # tags are only listed for the repositories of images the plan did not decide on
+    ecr_utils.load_index(
+        {
+            target_repository(image_repl["target"])[0]
+            for image_repl in image_data
+            if planned.get(image_repl["target"], {}).get("status") not in (CURRENT, MISSING, CHANGED)
+        }
+    )
+    # missing repositories are created in the background while the first images are transferred
+    ecr_utils.create_repositories(target_repositories)
+    logger.info(f"Replicating {len(image_data)} images with {replication_concurrency} workers ({transfer_backend})")
+    state = ReplicationState(state_uri).load() if state_uri else None
+    if copier:
+        # resolve every manifest up front, so blobs shared between images are uploaded once and mounted elsewhere
+        copier.plan(
+            [
+                (image_repl["src"], image_repl["target"])
+                for image_repl in image_data
+                if planned.get(image_repl["target"], {}).get("status") in (MISSING, CHANGED)
+                or (
+                    image_repl["target"] not in planned
+                    and not ecr_utils.image_exists(*target_repository(image_repl["target"]))
+                )
+            ],
+            replication_concurrency,
+        )
+    started = time.monotonic()
+    try:
+        successful_replication, failed_replication = replicate(
+            ecr_utils,
+            image_data,
+            repo_user,
+            repo_password,
+            copier=copier,
+            state=state,
+            sources=sources,
+            plan=planned,
+            checkpoint=checkpoint,
+        )
+    finally:
+        ecr_utils.close()
+        if checkpoint:
+            checkpoint.flush()
+        if state:
+            if copier and copier.bytes_transferred >= 1024 * 1024:
+                # estimates the duration of the next replication plan
+                state.throughput = copier.bytes_transferred / max(time.monotonic() - started, 0.001)
+            state.save()
+    if copier:
+        logger.info(
+            f"Transferred {copier.bytes_transferred} bytes, saved {copier.bytes_saved} bytes"
+            f" ({copier.bytes_mounted} mounted, {copier.bytes_existing} already in ECR)"
+        )
+    metrics.report("images")
     export_results("Successfully replicated images", successful_replication)  # type:ignore
     export_results("FAILED replicated image", failed_replication)  # type:ignore
+    if checkpoint:
+        # the run completed, the next one starts from the replication state again
+        checkpoint.clear()
     logger.info("Script completed.")
     logger.info("------------------------------------------------")
 
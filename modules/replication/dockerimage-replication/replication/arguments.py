@@ -58,4 +58,23 @@ def parse_args(args: Any) -> argparse.Namespace:
         type=str,
         required=True,
     )
+
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        action="store",
+        default=8,
+        dest="concurrency",
+        help="number of helm charts fetched at the same time",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--chart-info-cache",
+        action="store",
+        default=None,
+        dest="chart_info_cache",
+        help="file or s3:// URI caching the chart values and images of unchanged workloads between runs",
+        type=str,
+    )
     return parser.parse_args(args)
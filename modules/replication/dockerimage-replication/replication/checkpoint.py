@@ -0,0 +1,110 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Journal of the work completed by a replication run, so an interrupted run resumes where it stopped"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+from replication.logging import logger
+from replication.state import _split_s3_uri
+
+
+class Checkpoint:
+    """Records every image or chart as it completes, and the progress of resumable blob uploads
+
+    The journal is a JSON lines file, appended to as entries are recorded, or an S3 object when `uri` starts
+    with `s3://`, rewritten at most every `flush_interval` seconds. A run that completes clears its journal, a
+    journal left behind by an interrupted run is loaded by the next one.
+    """
+
+    def __init__(self, uri: str, flush_interval: float = 15.0):
+        self.uri = uri
+        self.flush_interval = flush_interval
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._flushed = time.monotonic()
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(kind: str, key: str) -> str:
+        return f"{kind}|{key}"
+
+    def load(self) -> "Checkpoint":
+        content = b""
+        if self.uri.startswith("s3://"):
+            bucket, key = _split_s3_uri(self.uri)
+            s3_client = boto3.client("s3")
+            try:
+                content = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+            except s3_client.exceptions.NoSuchKey:
+                pass
+        elif os.path.isfile(self.uri):
+            with open(self.uri, "rb") as f:
+                content = f.read()
+        for line in content.decode("utf-8").splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # the last line of a journal interrupted while it was written
+                continue
+            self.entries[self._key(entry["kind"], entry["key"])] = entry
+        if self.entries:
+            logger.info(f"Resuming from {len(self.entries)} checkpoint entries of {self.uri}")
+        return self
+
+    def get(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.entries.get(self._key(kind, key))
+
+    def record(self, kind: str, key: str, **data: Any) -> None:
+        """Records `key` as completed, or the progress of an upload, replacing its previous entry"""
+        entry = {"kind": kind, "key": key, **data}
+        with self._lock:
+            self.entries[self._key(kind, key)] = entry
+            if not self.uri.startswith("s3://"):
+                with open(self.uri, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, sort_keys=True) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                return
+            self._dirty = True
+        self.flush(force=False)
+
+    def flush(self, force: bool = True) -> None:
+        """Uploads the journal to S3, unless it was uploaded less than `flush_interval` seconds ago"""
+        if not self.uri.startswith("s3://"):
+            return
+        with self._lock:
+            if not self._dirty or (not force and time.monotonic() - self._flushed < self.flush_interval):
+                return
+            # the object holds the latest entry of every key
+            content = "".join(json.dumps(entry, sort_keys=True) + "\n" for entry in self.entries.values())
+            self._dirty = False
+            self._flushed = time.monotonic()
+        bucket, key = _split_s3_uri(self.uri)
+        boto3.client("s3").put_object(Bucket=bucket, Key=key, Body=content.encode("utf-8"))
+
+    def clear(self) -> None:
+        """Removes the journal once the run completed
+
+        The run already succeeded, failing to remove the journal is only logged: the next run skips the work it
+        journaled after checking the sources, as it would for an interrupted run.
+        """
+        with self._lock:
+            self.entries = {}
+            self._dirty = False
+        if self.uri.startswith("s3://"):
+            bucket, key = _split_s3_uri(self.uri)
+            try:
+                boto3.client("s3").delete_object(Bucket=bucket, Key=key)
+            except ClientError as e:
+                logger.info(f"Could not remove the checkpoint {self.uri}: {e}")
+        elif os.path.isfile(self.uri):
+            os.remove(self.uri)
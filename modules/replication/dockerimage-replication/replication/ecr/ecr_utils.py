@@ -1,9 +1,25 @@
+import base64
 import subprocess
-import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Set, Tuple
 
 import boto3
+from botocore.config import Config
 
 from replication.logging import logger
+from replication.metrics import metrics
+from replication.utils import wait_until
+
+
+def split_target_image(target: str, aws_account_id: str) -> Tuple[str, str]:
+    """Splits a target image into the ECR repository name and tag"""
+    target_info = target.split(":")
+    target_repo = target_info[0]
+    if target_repo.startswith(f"{aws_account_id}.dkr.ecr"):
+        s = target_repo.split("/")
+        target_repo = "/".join(s[1:])
+    return target_repo, target_info[1]
 
 
 class ECRUtils:
@@ -11,7 +27,19 @@ class ECRUtils:
         self.aws_account_id = aws_account_id
         self.aws_region = aws_region
         self.aws_domain = aws_domain
-        self.ecr_client = boto3.client("ecr", region_name=aws_region)
+        self.registry = f"{aws_account_id}.dkr.ecr.{aws_region}.{aws_domain}"
+        # adaptive retries back off and rate limit the client when ECR throttles concurrent workers
+        self.ecr_client = boto3.client(
+            "ecr", region_name=aws_region, config=Config(retries={"max_attempts": 10, "mode": "adaptive"})
+        )
+        # repository name -> {tag: digest}, None when the tags of the repository were not indexed
+        self._index: Optional[Dict[str, Optional[Dict[str, str]]]] = None
+        self._index_lock = threading.Lock()
+        # repositories created in the background by create_repositories
+        self._creations: Dict[str, "Future[None]"] = {}
+        self._creation_lock = threading.Lock()
+        self._creation_executor: Optional[ThreadPoolExecutor] = None
+        self.readiness_timeout = 30.0
 
     def login_to_ecr(self, type: str = "docker") -> bool:
         get_password_cmd = ["aws", "ecr", "get-login-password", "--region", f"{self.aws_region}"]
@@ -24,13 +52,16 @@ class ECRUtils:
             "--username",
             "AWS",
             "--password-stdin",
-            f"{self.aws_account_id}.dkr.ecr.{self.aws_region}.{self.aws_domain}",
+            self.registry,
         ]
         login_cmd = login_cmd_type + login_cmd_tail
-        auth_process = subprocess.Popen(get_password_cmd, shell=False, stdout=subprocess.PIPE)
-        login_process = subprocess.run(
-            login_cmd, stdin=auth_process.stdout, shell=False, capture_output=True, text=True
-        )
+        with metrics.operation(f"ecr login {type}") as record:
+            auth_process = subprocess.Popen(get_password_cmd, shell=False, stdout=subprocess.PIPE)
+            login_process = subprocess.run(
+                login_cmd, stdin=auth_process.stdout, shell=False, capture_output=True, text=True
+            )
+            if login_process.returncode != 0:
+                record["outcome"] = "failed"
 
         if login_process.returncode == 0:
             logger.info(f"ECR login for {type} successful: {login_process.stdout.strip()}")
@@ -39,37 +70,159 @@ class ECRUtils:
             logger.info(f"ECR login for {type} failed: {login_process.stderr.strip()}")
             return False
 
+    # Username and password for the registry API, as used by `docker login`
+    def get_registry_credentials(self) -> Tuple[str, str]:
+        with metrics.operation("ecr get_authorization_token"):
+            response = self.ecr_client.get_authorization_token()
+        token = base64.b64decode(response["authorizationData"][0]["authorizationToken"]).decode("utf-8")
+        username, password = token.split(":", 1)
+        return username, password
+
+    def _list_tags(self, repo_name: str) -> Dict[str, str]:
+        tags = {}
+        with metrics.operation("ecr list_images", repo_name):
+            paginator = self.ecr_client.get_paginator("list_images")
+            for page in paginator.paginate(repositoryName=repo_name, filter={"tagStatus": "TAGGED"}):
+                for image in page["imageIds"]:
+                    tags[image["imageTag"]] = image["imageDigest"]
+        return tags
+
+    # Index repositories and tags once, so existence checks are answered from memory
+    def load_index(self, repo_names: Optional[Iterable[str]] = None, max_workers: int = 8) -> None:
+        repositories: Set[str] = set()
+        with metrics.operation("ecr describe_repositories"):
+            paginator = self.ecr_client.get_paginator("describe_repositories")
+            for page in paginator.paginate():
+                repositories.update(repo["repositoryName"] for repo in page["repositories"])
+        wanted = sorted(repositories if repo_names is None else repositories.intersection(repo_names))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            tags = dict(zip(wanted, executor.map(self._list_tags, wanted)))
+        with self._index_lock:
+            self._index = {repo: tags.get(repo) for repo in repositories}
+        logger.info(f"Indexed {len(repositories)} ECR repositories, {len(wanted)} with tags")
+
+    # Record an image pushed during the run
+    def record_image(self, repo_name: str, image_tag: str, image_digest: str = "") -> None:
+        with self._index_lock:
+            if self._index is not None and self._index.get(repo_name) is not None:
+                self._index[repo_name][image_tag] = image_digest  # type: ignore
+
+    def _record_repository(self, repo_name: str) -> None:
+        with self._index_lock:
+            if self._index is not None:
+                self._index.setdefault(repo_name, {})
+
     # Check if repository exists
     def repository_exists(self, repo_name: str) -> bool:
+        with self._index_lock:
+            if self._index is not None:
+                return repo_name in self._index
+        with metrics.operation("ecr describe_repositories", repo_name):
+            try:
+                self.ecr_client.describe_repositories(repositoryNames=[repo_name])
+                return True
+            except self.ecr_client.exceptions.RepositoryNotFoundException:
+                return False
+
+    # Whether a new repository is visible to the API, bypassing the index
+    def _repository_ready(self, repo_name: str) -> bool:
         try:
             self.ecr_client.describe_repositories(repositoryNames=[repo_name])
             return True
         except self.ecr_client.exceptions.RepositoryNotFoundException:
             return False
 
+    def _create_repository(self, repo_name: str) -> None:
+        logger.info(f"ECR repository '{repo_name}' does not exist. Creating...")
+        with metrics.operation("ecr create_repository", repo_name) as record:
+            try:
+                self.ecr_client.create_repository(
+                    repositoryName=repo_name, imageScanningConfiguration={"scanOnPush": True}
+                )
+            except self.ecr_client.exceptions.RepositoryAlreadyExistsException:
+                # another worker created it in the meantime
+                logger.info(f"ECR repository '{repo_name}' already exists.")
+                self._record_repository(repo_name)
+                return
+            # poll with backoff until the repository is visible instead of sleeping a fixed amount of time
+            if not wait_until(lambda: self._repository_ready(repo_name), timeout=self.readiness_timeout):
+                logger.info(f"ECR repository '{repo_name}' is not visible yet, continuing")
+                record["outcome"] = "failed"
+        logger.info(f"ECR repository '{repo_name}' created successfully.")
+        self._record_repository(repo_name)
+
+    # Start creating all missing repositories up front, create_repository waits for the one it needs
+    def create_repositories(self, repo_names: Iterable[str], max_workers: int = 8) -> None:
+        missing = [repo_name for repo_name in sorted(set(repo_names)) if not self.repository_exists(repo_name)]
+        if not missing:
+            return
+        logger.info(f"Creating {len(missing)} ECR repositories")
+        with self._creation_lock:
+            if self._creation_executor is None:
+                self._creation_executor = ThreadPoolExecutor(max_workers=max_workers)
+            for repo_name in missing:
+                if repo_name not in self._creations:
+                    self._creations[repo_name] = self._creation_executor.submit(self._create_repository, repo_name)
+
+    # Wait for the repositories still being created and stop the workers creating them
+    def close(self) -> None:
+        with self._creation_lock:
+            executor, self._creation_executor = self._creation_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
     # Create repository
     def create_repository(self, repo_name: str) -> None:
+        with self._creation_lock:
+            creation = self._creations.get(repo_name)
+        if creation is not None:
+            creation.result()
+            return
         logger.info(f"Checking if ECR repository '{repo_name}' exists...")
         if not self.repository_exists(repo_name):
-            logger.info(f"ECR repository '{repo_name}' does not exist. Creating...")
-            self.ecr_client.create_repository(repositoryName=repo_name, imageScanningConfiguration={"scanOnPush": True})
-            logger.info(f"ECR repository '{repo_name}' created successfully.")
-            time.sleep(2)
+            self._create_repository(repo_name)
         else:
             logger.info(f"ECR repository '{repo_name}' already exists.")
 
     # Check if image exists in ECR
     def image_exists(self, repo_name: str, image_tag: str) -> bool:
-        try:
-            response = self.ecr_client.batch_get_image(
-                repositoryName=repo_name,
-                imageIds=[{"imageTag": image_tag}],
-            )
-            return any(img["imageId"]["imageTag"] == image_tag for img in response.get("images", []))
-        except self.ecr_client.exceptions.ImageNotFoundException:
-            return False
-        except self.ecr_client.exceptions.RepositoryNotFoundException:
-            return False
+        with self._index_lock:
+            if self._index is not None:
+                if repo_name not in self._index:
+                    return False
+                tags = self._index[repo_name]
+                if tags is not None:
+                    return image_tag in tags
+        with metrics.operation("ecr batch_get_image"):
+            try:
+                response = self.ecr_client.batch_get_image(
+                    repositoryName=repo_name,
+                    imageIds=[{"imageTag": image_tag}],
+                )
+                return any(img["imageId"]["imageTag"] == image_tag for img in response.get("images", []))
+            except self.ecr_client.exceptions.ImageNotFoundException:
+                return False
+            except self.ecr_client.exceptions.RepositoryNotFoundException:
+                return False
+
+    # Digest of a tagged image, from the index unless refresh is requested
+    def image_digest(self, repo_name: str, image_tag: str, refresh: bool = False) -> Optional[str]:
+        if not refresh:
+            with self._index_lock:
+                tags = self._index.get(repo_name) if self._index is not None else None
+                if tags and tags.get(image_tag):
+                    return tags[image_tag]
+        with metrics.operation("ecr describe_images"):
+            try:
+                response = self.ecr_client.describe_images(repositoryName=repo_name, imageIds=[{"imageTag": image_tag}])
+            except (
+                self.ecr_client.exceptions.ImageNotFoundException,
+                self.ecr_client.exceptions.RepositoryNotFoundException,
+            ):
+                return None
+        digest: str = response["imageDetails"][0]["imageDigest"]
+        self.record_image(repo_name, image_tag, digest)
+        return digest
 
     def cleanup_ecr_repos(self, prefix: str) -> None:
         paginator = self.ecr_client.get_paginator("describe_repositories")
@@ -0,0 +1,79 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Chart values and images of every workload, reused while its definition does not change"""
+
+import copy
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import boto3
+
+from replication.logging import logger
+from replication.state import _split_s3_uri
+
+# bumped when the values or images computed for a workload change, which invalidates every cached entry
+FORMAT = 1
+
+
+def fingerprint(workload: Dict[str, Any], registry_prefix: str) -> str:
+    """Hashes everything the chart values and images of a workload are computed from
+
+    The merged workload definition names the chart version, the chart content of a version does not change.
+    """
+    content = json.dumps(
+        {"format": FORMAT, "registryPrefix": registry_prefix, "workload": workload}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ChartInfoCache:
+    """Maps every workload to the fingerprint of its definition and the chart values and images computed from it
+
+    The cache lives in a local file or, when `uri` starts with `s3://`, in an S3 object. Saving it keeps only
+    the workloads recorded by the run, so removed workloads are dropped.
+    """
+
+    def __init__(self, uri: str):
+        self.uri = uri
+        self.workloads: Dict[str, Dict[str, Any]] = {}
+        self._recorded: Dict[str, Dict[str, Any]] = {}
+
+    def load(self) -> "ChartInfoCache":
+        content = None
+        if self.uri.startswith("s3://"):
+            bucket, key = _split_s3_uri(self.uri)
+            s3_client = boto3.client("s3")
+            try:
+                content = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+            except s3_client.exceptions.NoSuchKey:
+                pass
+        elif os.path.isfile(self.uri):
+            with open(self.uri, "rb") as f:
+                content = f.read()
+        if content:
+            self.workloads = json.loads(content).get("workloads", {})
+        logger.info(f"Loaded chart info of {len(self.workloads)} workloads from {self.uri}")
+        return self
+
+    def get(self, workload: str, digest: str) -> Optional[Dict[str, Any]]:
+        """Returns `values` and `images` of `workload`, None when its definition changed since they were computed"""
+        entry = self.workloads.get(workload)
+        if not entry or entry.get("fingerprint") != digest:
+            return None
+        return copy.deepcopy(entry)
+
+    def record(self, workload: str, digest: str, values: Dict[str, Any], images: List[str]) -> None:
+        self._recorded[workload] = {"fingerprint": digest, "values": copy.deepcopy(values), "images": list(images)}
+
+    def save(self) -> None:
+        content = json.dumps({"workloads": self._recorded}, indent=2, sort_keys=True)
+        if self.uri.startswith("s3://"):
+            bucket, key = _split_s3_uri(self.uri)
+            boto3.client("s3").put_object(Bucket=bucket, Key=key, Body=content.encode("utf-8"))
+        else:
+            with open(self.uri, "w", encoding="utf-8") as f:
+                f.write(content)
+        logger.info(f"Saved chart info of {len(self._recorded)} workloads to {self.uri}")
@@ -0,0 +1,62 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Helm chart archive reader"""
+
+import io
+import tarfile
+from typing import IO, Any, Dict, Optional, Union
+
+import yaml
+
+
+def _open(source: Union[str, bytes, IO[bytes]]) -> tarfile.TarFile:
+    if isinstance(source, bytes):
+        return tarfile.open(fileobj=io.BytesIO(source), mode="r:gz")
+    if isinstance(source, str):
+        return tarfile.open(source, mode="r:gz")
+    return tarfile.open(fileobj=source, mode="r:gz")
+
+
+def _load_yaml(tar: tarfile.TarFile, members: Dict[str, tarfile.TarInfo], name: str) -> Any:
+    if name not in members:
+        return None
+    return yaml.safe_load(tar.extractfile(members[name]).read())  # type: ignore
+
+
+def _read(tar: tarfile.TarFile, members: Dict[str, tarfile.TarInfo], chart_dir: str) -> Dict[str, Any]:
+    return {
+        "chart": _load_yaml(tar, members, f"{chart_dir}/Chart.yaml"),
+        "values": _load_yaml(tar, members, f"{chart_dir}/values.yaml"),
+    }
+
+
+def read_chart(source: Union[str, bytes, IO[bytes]], subchart: Optional[str] = None) -> Dict[str, Any]:
+    """Reads chart and values of a chart archive, or of one of its subcharts, without extracting it
+
+    Args:
+        source (str, bytes or file): Path, content or stream of the chart `.tgz`
+        subchart (Optional(str)): Subchart name, either a `charts/<subchart>` directory or a packaged
+            `charts/<subchart>-<version>.tgz` dependency
+
+    Returns:
+        dict: Parsed `Chart.yaml` as `chart` and `values.yaml` as `values`, as `helm show` would print them
+    """
+    with _open(source) as tar:
+        members = {member.name: member for member in tar.getmembers() if member.isfile()}
+        if not members:
+            raise ValueError("Empty chart archive")
+        root = next(iter(members)).split("/", 1)[0]
+        if subchart is None:
+            return _read(tar, members, root)
+
+        subchart_dir = f"{root}/charts/{subchart}"
+        if f"{subchart_dir}/Chart.yaml" in members:
+            return _read(tar, members, subchart_dir)
+
+        for name, member in members.items():
+            if name.startswith(f"{subchart_dir}-") and name.endswith(".tgz"):
+                nested = read_chart(tar.extractfile(member).read())  # type: ignore
+                if nested["chart"] and nested["chart"].get("name") == subchart:
+                    return nested
+    raise KeyError(f"Subchart {subchart} not found in chart archive")
@@ -0,0 +1,149 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Content-addressed local cache of Helm chart archives"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from replication.logging import logger
+
+ARCHIVE = "chart.tgz"
+METADATA = "metadata.json"
+
+
+class ChartCache:
+    """Keeps every (repository URL, chart, version) archive once, along with the parsed output derived from it
+
+    Entries are directories named after the sha256 of the key. Least recently used entries are evicted once the
+    cache grows over `max_bytes`, entries not used for `max_age_days` are evicted regardless of size. Entries in
+    use through `pinned_archive` are never evicted.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 * 1024 * 1024, max_age_days: Optional[float] = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._locks: Dict[str, threading.RLock] = {}
+        self._guard = threading.Lock()
+        # readers of every entry in use, guarded by `_guard`
+        self._pins: Dict[str, int] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, default_dir: str) -> Optional["ChartCache"]:
+        """Builds the cache from `HELM_CHART_CACHE_*` variables, `HELM_CHART_CACHE_MAX_MB=0` disables it"""
+        max_mb = float(os.getenv("HELM_CHART_CACHE_MAX_MB", "1024"))
+        if max_mb <= 0:
+            return None
+        max_age = os.getenv("HELM_CHART_CACHE_MAX_AGE_DAYS")
+        return cls(
+            os.getenv("HELM_CHART_CACHE_DIR", default_dir),
+            max_bytes=int(max_mb * 1024 * 1024),
+            max_age_days=float(max_age) if max_age else None,
+        )
+
+    @staticmethod
+    def key(repo_url: str, chart: str, version: str) -> str:
+        return hashlib.sha256(f"{repo_url.rstrip('/')}|{chart}|{version}".encode("utf-8")).hexdigest()
+
+    def _lock(self, key: str) -> threading.RLock:
+        with self._guard:
+            # re-entrant: `compute` of `memoize` may fetch the archive of the same chart
+            return self._locks.setdefault(key, threading.RLock())
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def archive(self, repo_url: str, chart: str, version: str, fetch: Callable[[str], None]) -> str:
+        """Returns the path of the cached chart archive, calling `fetch(directory)` to download it when missing
+
+        Args:
+            repo_url (str): Helm repository URL
+            chart (str): Helm chart name
+            version (str): Helm chart version
+            fetch (Callable): Downloads the chart `.tgz` into the given directory
+
+        Returns:
+            str: Path of the cached archive
+        """
+        key = self.key(repo_url, chart, version)
+        entry = self._entry(key)
+        path = os.path.join(entry, ARCHIVE)
+        with self._lock(key):
+            if not os.path.isfile(path):
+                download_dir = tempfile.mkdtemp(dir=self.cache_dir)
+                try:
+                    fetch(download_dir)
+                    downloaded = glob.glob(os.path.join(download_dir, "*.tgz"))
+                    if not downloaded:
+                        raise FileNotFoundError(f"No chart archive downloaded for {chart} {version} from {repo_url}")
+                    os.makedirs(entry, exist_ok=True)
+                    os.replace(downloaded[0], path)
+                finally:
+                    shutil.rmtree(download_dir, ignore_errors=True)
+                logger.debug("Cached %s %s from %s", chart, version, repo_url)
+                self.evict(keep=key)
+            os.utime(entry)
+        return path
+
+    @contextmanager
+    def pinned_archive(self, repo_url: str, chart: str, version: str, fetch: Callable[[str], None]) -> Iterator[str]:
+        """Like `archive`, the archive is kept until the block exits even when another worker evicts entries"""
+        key = self.key(repo_url, chart, version)
+        with self._guard:
+            self._pins[key] = self._pins.get(key, 0) + 1
+        try:
+            yield self.archive(repo_url, chart, version, fetch)
+        finally:
+            with self._guard:
+                self._pins[key] -= 1
+                if not self._pins[key]:
+                    del self._pins[key]
+
+    def memoize(self, repo_url: str, chart: str, version: str, name: str, compute: Callable[[], Any]) -> Any:
+        """Returns the result of `compute` stored under `name` for the chart, computing it on first use"""
+        key = self.key(repo_url, chart, version)
+        metadata_path = os.path.join(self._entry(key), METADATA)
+        with self._lock(key):
+            metadata = {}
+            if os.path.isfile(metadata_path):
+                with open(metadata_path, encoding="utf-8") as f:
+                    metadata = json.load(f)
+            if name not in metadata:
+                metadata[name] = compute()
+                os.makedirs(self._entry(key), exist_ok=True)
+                with open(metadata_path, "w", encoding="utf-8") as f:
+                    json.dump(metadata, f)
+        return metadata[name]
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Removes expired entries, then least recently used entries until the cache fits in `max_bytes`"""
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry = self._entry(key)
+            if not os.path.isdir(entry) or not os.path.isfile(os.path.join(entry, ARCHIVE)):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+            entries.append((os.path.getmtime(entry), size, key))
+
+        total = sum(size for _, size, _ in entries)
+        expiry = time.time() - self.max_age_days * 86400 if self.max_age_days is not None else None
+        for used, size, key in sorted(entries):
+            if key == keep:
+                continue
+            if (expiry is not None and used < expiry) or total > self.max_bytes:
+                with self._guard:
+                    if key in self._pins:
+                        continue
+                    logger.debug("Evicting %s from the chart cache", key)
+                    shutil.rmtree(self._entry(key), ignore_errors=True)
+                total -= size
@@ -3,14 +3,24 @@
 
 """Helm commands"""
 
+import glob
 import os
 import shlex
 import shutil
 import subprocess  # nosec B404
-from typing import Any, Dict, Optional
+import tempfile
+import uuid
+from typing import Any, Dict, List, Optional
 
+import requests
 import yaml
 
+from replication.helm import archive
+from replication.helm.cache import ChartCache
+from replication.helm.repository import ChartRepositories, RepositoryError
+from replication.logging import logger
+from replication.metrics import metrics
+
 
 def _execute_command(command: str) -> str:
     """Executes arbitrary command
@@ -22,47 +32,127 @@ def _execute_command(command: str) -> str:
         str: Command execution result
     """
     cmd = shlex.split(command)
-    executed_command = subprocess.Popen(
-        cmd,
-        shell=False,  # nosec B603
-        text=True,
-        universal_newlines=True,
-        encoding="utf-8",
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-    )
-    stdout, _ = executed_command.communicate()
+    with metrics.operation(" ".join(cmd[:2])) as record:
+        executed_command = subprocess.Popen(
+            cmd,
+            shell=False,  # nosec B603
+            text=True,
+            universal_newlines=True,
+            encoding="utf-8",
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        stdout, _ = executed_command.communicate()
+        if executed_command.returncode:
+            record["outcome"] = "failed"
     return stdout
 
 
-def _unarchive_repo(project_path: str, repo: str, chart: str, version: str) -> None:
+def _unarchive_repo(untar_path: str, repo: str, chart: str, version: str) -> None:
     """Pulls and unarchives helm repository locally
 
 
     Args:
-        project_path (str): Path where to unarchive the helm repository
+        untar_path (str): Path where to unarchive the helm repository
         repo (str): Helm repository name
         chart (str): Helm chart name
         version (str): Helm chart version
     """
-    _execute_command(f"helm pull {repo}/{chart} --version {version} --untar --untardir {project_path}")
-
-
-def show(subcommand: str, chart: str, version: str) -> Any:
+    _execute_command(f"helm pull {repo}/{chart} --version {version} --untar --untardir {untar_path}")
+
+
+def _pull(repo: str, chart: str, version: str, destination: str) -> None:
+    """Pulls the chart archive into `destination`"""
+    _execute_command(f"helm pull {repo}/{chart} --version {version} --destination {destination}")
+
+
+def _fetch(
+    repo: str,
+    repo_url: Optional[str],
+    chart: str,
+    version: str,
+    destination: str,
+    repositories: Optional[ChartRepositories],
+) -> None:
+    """Downloads the chart archive into `destination` in-process, falling back to `helm pull`"""
+    if repositories and repo_url:
+        try:
+            repositories.download(repo_url, chart, version, destination)
+            return
+        except (RepositoryError, requests.RequestException) as e:
+            logger.info("Falling back to helm pull for %s %s: %s", chart, version, e)
+    _pull(repo, chart, version, destination)
+
+
+def _read_chart(
+    repo: str,
+    repo_url: str,
+    chart: str,
+    version: str,
+    subchart: Optional[str],
+    cache: Optional[ChartCache],
+    repositories: Optional[ChartRepositories],
+) -> Dict[str, Any]:
+    """Reads chart and values from the chart archive, taken from the cache or downloaded to a temporary directory"""
+    if cache:
+        with cache.pinned_archive(
+            repo_url,
+            chart,
+            version,
+            lambda destination: _fetch(repo, repo_url, chart, version, destination, repositories),
+        ) as path:
+            return archive.read_chart(path, subchart)
+
+    with tempfile.TemporaryDirectory() as destination:
+        _fetch(repo, repo_url, chart, version, destination, repositories)
+        downloaded = glob.glob(os.path.join(destination, "*.tgz"))
+        if not downloaded:
+            raise FileNotFoundError(f"No chart archive downloaded for {chart} {version} from {repo_url}")
+        return archive.read_chart(downloaded[0], subchart)
+
+
+def show(
+    subcommand: str,
+    chart: str,
+    version: str,
+    repo_url: Optional[str] = None,
+    cache: Optional[ChartCache] = None,
+    repositories: Optional[ChartRepositories] = None,
+) -> Any:
     """Shows helm values
 
     Args:
         subcommand (str): Helm show subcommand. Can be one of: all, chart, crds, readme, values
         chart (str): Helm chart name
         version (str): Helm chart version
+        repo_url (Optional(str)): Helm repository URL, required to read the chart in-process
+        cache (Optional(ChartCache)): Cache of chart archives, `chart` and `values` are then read from it
+        repositories (Optional(ChartRepositories)): Downloads chart archives without the helm CLI
 
     Returns:
         dict: Parsed helm show output
     """
+    if repo_url and (cache or repositories) and subcommand in ("chart", "values"):
+        repo, name = chart.split("/", 1)
+
+        def read() -> Any:
+            return _read_chart(repo, repo_url, name, version, None, cache, repositories)[subcommand]
+
+        return cache.memoize(repo_url, name, version, subcommand, read) if cache else read()
+
     return yaml.safe_load(_execute_command(f"helm show {subcommand} {chart} --version {version}"))
 
 
-def show_subchart(project_path: str, repo: str, chart: str, subchart: str, version: str) -> Dict[Any, Any]:
+def show_subchart(
+    project_path: str,
+    repo: str,
+    chart: str,
+    subchart: str,
+    version: str,
+    repo_url: Optional[str] = None,
+    cache: Optional[ChartCache] = None,
+    repositories: Optional[ChartRepositories] = None,
+) -> Dict[Any, Any]:
     """Shows helm values for subchart
 
     Args:
@@ -71,22 +161,34 @@ def show_subchart(project_path: str, repo: str, chart: str, subchart: str, versi
         chart (str): Helm subchart name
         subchart (str): Helm subchart name
         version (str): Helm subchart version
+        repo_url (Optional(str)): Helm repository URL, required to read the chart in-process
+        cache (Optional(ChartCache)): Cache of chart archives, the subchart is then read from the cached archive
+        repositories (Optional(ChartRepositories)): Downloads chart archives without the helm CLI
 
     Returns:
         dict: Parsed helm show output
     """
-    _unarchive_repo(project_path, repo, chart, version)
+    if repo_url and (cache or repositories):
+
+        def read() -> Any:
+            return _read_chart(repo, repo_url, chart, version, subchart, cache, repositories)
+
+        return cache.memoize(repo_url, chart, version, f"subchart:{subchart}", read) if cache else read()  # type: ignore
+
+    # every call gets its own directory, so subcharts of the same chart can be fetched concurrently
+    untar_path = os.path.join(project_path, f".{chart}-{uuid.uuid4().hex}")
+    _unarchive_repo(untar_path, repo, chart, version)
 
     result: Dict[Any, Any] = {}
     result["chart"] = yaml.safe_load(
-        _execute_command(f"helm show chart {os.path.join(project_path, chart, 'charts', subchart)}")
+        _execute_command(f"helm show chart {os.path.join(untar_path, chart, 'charts', subchart)}")
     )
 
     result["values"] = yaml.safe_load(
-        _execute_command(f"helm show values {os.path.join(project_path, chart, 'charts', subchart)}")
+        _execute_command(f"helm show values {os.path.join(untar_path, chart, 'charts', subchart)}")
     )
 
-    shutil.rmtree(f"{project_path}/{chart}")
+    shutil.rmtree(untar_path)
 
     return result
 
@@ -109,6 +211,10 @@ def add_repo(name: str, repo: str, username: Optional[str] = None, pwd: Optional
         _execute_command(f"helm repo add {name} {repo}")
 
 
-def update_repos() -> None:
-    """Updates information of available charts locally from chart repositories"""
-    _execute_command("helm repo update")
+def update_repos(names: Optional[List[str]] = None) -> None:
+    """Updates information of available charts locally from chart repositories
+
+    Args:
+        names (Optional(List(str))): Repositories to update, all repositories when not set
+    """
+    _execute_command(" ".join(["helm repo update", *(names or [])]))
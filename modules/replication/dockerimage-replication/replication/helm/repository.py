@@ -0,0 +1,231 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Helm chart repository client"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urljoin, urlparse
+
+import requests
+import yaml
+
+from replication.logging import logger
+from replication.metrics import metrics
+
+# libyaml parses large repository indexes an order of magnitude faster than the pure Python loader
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class RepositoryError(Exception):
+    """Raised when a chart cannot be resolved or downloaded from its repository"""
+
+
+def parse_index(content: bytes) -> Dict[str, List[Dict[str, Any]]]:
+    """Parses a repository `index.yaml`
+
+    Args:
+        content (bytes): Content of the index
+
+    Returns:
+        dict: Chart versions by chart name
+    """
+    index = yaml.load(content, Loader=_Loader)  # nosec B506
+    if not isinstance(index, dict) or not isinstance(index.get("entries"), dict):
+        raise RepositoryError("Invalid repository index")
+    return index["entries"]  # type: ignore
+
+
+def chart_entry(entries: Dict[str, List[Dict[str, Any]]], chart: str, version: str) -> Dict[str, Any]:
+    """Returns the index entry of a chart version"""
+    for entry in entries.get(chart, []):
+        if str(entry.get("version")) in (version, version.lstrip("v")):
+            return entry
+    raise RepositoryError(f"Chart {chart} {version} not found in repository index")
+
+
+def repository_names(repositories: Dict[str, str]) -> Dict[str, str]:
+    """Maps every workload to the local helm repository registered for its repository URL
+
+    Workloads sharing a repository URL share one repository, named after the first of them.
+
+    Args:
+        repositories (dict): Repository URL by workload
+
+    Returns:
+        dict: Local repository name by workload
+    """
+    names: Dict[str, str] = {}
+    by_url: Dict[str, str] = {}
+    for workload, repo_url in repositories.items():
+        names[workload] = by_url.setdefault(repo_url.rstrip("/"), workload)
+    return names
+
+
+class ChartRepositories:
+    """Reads Helm repository indexes and downloads chart archives over HTTP, without the helm CLI
+
+    Each index is loaded once per instance. With a `cache_dir`, indexes are kept between runs and only
+    downloaded again when the repository reports a change (ETag / Last-Modified). Credentials are only
+    sent to the repository host, as helm does unless `--pass-credentials` is set.
+    """
+
+    def __init__(
+        self,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        session_factory: Callable[[], Any] = requests.Session,
+        chunk_size: int = 1024 * 1024,
+        cache_dir: Optional[str] = None,
+    ):
+        self.username = username
+        self.password = password
+        self.session = session_factory()
+        self.chunk_size = chunk_size
+        self.cache_dir = cache_dir
+        self._indexes: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _auth(self, repo_url: str, url: str) -> Any:
+        if self.username is None or self.password is None:
+            return None
+        if urlparse(url).netloc != urlparse(repo_url).netloc:
+            return None
+        return (self.username, self.password)
+
+    def _get(self, repo_url: str, url: str, expected: Iterable[int] = (200,), **kwargs: Any) -> Any:
+        if urlparse(url).scheme not in ("http", "https"):
+            raise RepositoryError(f"Unsupported repository URL {url}")
+        response = self.session.get(url, auth=self._auth(repo_url, url), timeout=60, **kwargs)
+        if response.status_code not in expected:
+            response.close()
+            raise RepositoryError(f"GET {url} returned {response.status_code}")
+        return response
+
+    def _cache_path(self, repo_url: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"{hashlib.sha256(repo_url.encode('utf-8')).hexdigest()}.json")
+
+    def _read_cached(self, path: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not path or not os.path.isfile(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)  # type: ignore
+        except ValueError:
+            return None
+
+    def _write_cached(self, path: Optional[str], cached: Dict[str, Any]) -> None:
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # index entries carry timestamps, which are kept as strings
+            json.dump(cached, f, default=str)
+        os.replace(tmp_path, path)
+
+    def _load(self, repo_url: str) -> Dict[str, List[Dict[str, Any]]]:
+        path = self._cache_path(repo_url)
+        cached = self._read_cached(path)
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("lastModified"):
+            headers["If-Modified-Since"] = cached["lastModified"]
+
+        response = self._get(repo_url, f"{repo_url}/index.yaml", expected=(200, 304), headers=headers)
+        if response.status_code == 304 and cached:
+            logger.debug("Index of %s unchanged", repo_url)
+            return cached["entries"]  # type: ignore
+
+        logger.debug("Downloaded index of %s", repo_url)
+        entries = parse_index(response.content)
+        self._write_cached(
+            path,
+            {
+                "url": repo_url,
+                "etag": response.headers.get("ETag"),
+                "lastModified": response.headers.get("Last-Modified"),
+                "entries": entries,
+            },
+        )
+        return entries
+
+    def index(self, repo_url: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Returns the chart entries of the repository, loading its index on first use"""
+        repo_url = repo_url.rstrip("/")
+        with self._guard:
+            lock = self._locks.setdefault(repo_url, threading.Lock())
+        with lock:
+            if repo_url not in self._indexes:
+                self._indexes[repo_url] = self._load(repo_url)
+            return self._indexes[repo_url]
+
+    def load(self, repo_urls: Iterable[str], max_workers: int = 8) -> Dict[str, bool]:
+        """Loads the indexes of all distinct repositories in parallel
+
+        Args:
+            repo_urls (Iterable(str)): Helm repository URLs, duplicates are loaded once
+            max_workers (int): Maximum number of indexes downloaded at the same time
+
+        Returns:
+            dict: Whether the index of every distinct repository URL could be loaded
+        """
+        distinct = sorted({url.rstrip("/") for url in repo_urls if urlparse(url).scheme in ("http", "https")})
+
+        def load_one(repo_url: str) -> bool:
+            try:
+                self.index(repo_url)
+                return True
+            except (RepositoryError, requests.RequestException) as e:
+                logger.info("Could not load the index of %s: %s", repo_url, e)
+                return False
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            return dict(zip(distinct, executor.map(load_one, distinct)))
+
+    def chart_url(self, repo_url: str, chart: str, version: str) -> str:
+        """Returns the download URL of a chart version, relative URLs resolved against the repository"""
+        entry = chart_entry(self.index(repo_url), chart, version)
+        if not entry.get("urls"):
+            raise RepositoryError(f"Chart {chart} {version} has no download URL")
+        return urljoin(f"{repo_url.rstrip('/')}/", str(entry["urls"][0]))
+
+    def download(self, repo_url: str, chart: str, version: str, destination: str) -> str:
+        """Downloads a chart archive into `destination`, verifying its digest when the index has one
+
+        Args:
+            repo_url (str): Helm repository URL
+            chart (str): Helm chart name
+            version (str): Helm chart version
+            destination (str): Directory to download the archive into
+
+        Returns:
+            str: Path of the downloaded archive
+        """
+        entry = chart_entry(self.index(repo_url), chart, version)
+        url = self.chart_url(repo_url, chart, version)
+        path = os.path.join(destination, f"{chart}-{entry['version']}.tgz")
+        sha256 = hashlib.sha256()
+        with metrics.operation("helm download", f"{chart}:{version}") as record:
+            response = self._get(repo_url, url, stream=True)
+            try:
+                with open(path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        sha256.update(chunk)
+                        f.write(chunk)
+                        record["bytes"] += len(chunk)
+            finally:
+                response.close()
+
+        if entry.get("digest") and entry["digest"] != sha256.hexdigest():
+            os.remove(path)
+            raise RepositoryError(f"Digest mismatch for {chart} {version} downloaded from {url}")
+        return path
@@ -0,0 +1,174 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Timing and throughput of every operation of a replication run"""
+
+import csv
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from replication.logging import logger
+
+T = TypeVar("T")
+
+FIELDS = ["operation", "item", "start", "end", "duration", "bytes", "retries", "outcome"]
+# operations covering a whole image or chart, the summary ranks them
+ITEM_OPERATIONS = ("image", "chart")
+
+# jsonl or csv
+metrics_format = os.getenv("SEEDFARMER_PARAMETER_METRICS_FORMAT", "jsonl").lower()
+# number of slowest images and charts logged at the end of a run, 0 disables the summary
+metrics_summary = int(os.getenv("SEEDFARMER_PARAMETER_METRICS_SUMMARY", "10"))
+
+_current = threading.local()
+
+
+def current_item() -> Optional[str]:
+    """Image or chart the calling thread works on"""
+    return getattr(_current, "item", None)
+
+
+@contextmanager
+def item(name: Optional[str]) -> Iterator[None]:
+    """Attributes the operations of the calling thread to the image or chart `name`"""
+    previous = current_item()
+    _current.item = name
+    try:
+        yield
+    finally:
+        _current.item = previous
+
+
+def bind(fn: Callable[..., T]) -> Callable[..., T]:
+    """Wraps `fn` so it runs attributed to the item of the calling thread, for work handed to another thread"""
+    name = current_item()
+
+    def bound(*args: Any, **kwargs: Any) -> T:
+        with item(name):
+            return fn(*args, **kwargs)
+
+    return bound
+
+
+class Metrics:
+    """Collects the operations timed by all worker threads
+
+    Every record holds the operation, the image or chart it was run for, start and end timestamps, the bytes
+    transferred, the number of retries and the outcome (`ok`, `failed` or `error` when it raised).
+    """
+
+    def __init__(self) -> None:
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def operation(self, name: str, item: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Times the block, which can set `bytes`, `retries` and `outcome` on the yielded record"""
+        record: Dict[str, Any] = {
+            "operation": name,
+            "item": item or current_item(),
+            "start": time.time(),
+            "bytes": 0,
+            "retries": 0,
+            "outcome": "ok",
+        }
+        started = time.monotonic()
+        try:
+            yield record
+        except BaseException:
+            record["outcome"] = "error"
+            raise
+        finally:
+            record["end"] = time.time()
+            record["duration"] = round(time.monotonic() - started, 3)
+            with self._lock:
+                self.records.append(record)
+
+    def track(self, name: str, item_name: str, fn: Callable[..., bool], *args: Any) -> bool:
+        """Runs `fn` attributed to `item_name`, timed as a `name` operation that failed when `fn` returns False"""
+        with item(item_name), self.operation(name) as record:
+            succeeded = fn(*args)
+            if not succeeded:
+                record["outcome"] = "failed"
+            return succeeded
+
+    def write(self, path: str) -> None:
+        """Writes all records as JSON lines, or as CSV when `path` ends with `.csv`"""
+        with self._lock:
+            records = sorted(self.records, key=lambda record: record["start"])
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            if path.endswith(".csv"):
+                writer = csv.DictWriter(f, fieldnames=FIELDS)
+                writer.writeheader()
+                writer.writerows(records)
+            else:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+
+    def summary(self, top: int = 10) -> Dict[str, Any]:
+        """Ranks images and charts by duration and computes the aggregate throughput of the run
+
+        Returns:
+            dict: `slowest` images and charts with their duration, bytes and outcome, `bytes`, `seconds` and `mbps`
+        """
+        with self._lock:
+            records = list(self.records)
+        item_bytes: Dict[str, int] = {}
+        for record in records:
+            if record["item"]:
+                item_bytes[record["item"]] = item_bytes.get(record["item"], 0) + record["bytes"]
+        items = sorted(
+            (record for record in records if record["operation"] in ITEM_OPERATIONS),
+            key=lambda record: record["duration"],
+            reverse=True,
+        )
+        total = sum(record["bytes"] for record in records)
+        seconds = (
+            max(record["end"] for record in records) - min(record["start"] for record in records) if records else 0
+        )
+        return {
+            "slowest": [
+                {
+                    "item": record["item"],
+                    "operation": record["operation"],
+                    "duration": record["duration"],
+                    "bytes": item_bytes.get(record["item"], 0),
+                    "outcome": record["outcome"],
+                }
+                for record in items[:top]
+            ],
+            "bytes": total,
+            "seconds": round(seconds, 3),
+            "mbps": round(total / 1024 / 1024 / seconds, 2) if seconds else 0.0,
+        }
+
+    def log_summary(self, top: int = 10) -> None:
+        summary = self.summary(top)
+        logger.info(f"Slowest {len(summary['slowest'])} images and charts:")
+        logger.info(f"    {'seconds':>9} {'MB':>9} {'outcome':>8}  item")
+        for row in summary["slowest"]:
+            logger.info(
+                f"    {row['duration']:>9.1f} {row['bytes'] / 1024 / 1024:>9.1f} {row['outcome']:>8}  {row['item']}"
+            )
+        logger.info(f"Transferred {summary['bytes']} bytes in {summary['seconds']}s ({summary['mbps']} MB/s)")
+
+    def report(self, name: str) -> str:
+        """Writes `replication-metrics-<name>.<format>` and logs the summary when enabled
+
+        Returns:
+            str: Path of the report
+        """
+        path = f"replication-metrics-{name}.{'csv' if metrics_format == 'csv' else 'jsonl'}"
+        self.write(path)
+        logger.info(f"Metrics of {len(self.records)} operations written to {path}")
+        if metrics_summary > 0:
+            self.log_summary(metrics_summary)
+        return path
+
+
+# collector of the running script
+metrics = Metrics()
@@ -3,13 +3,62 @@
 
 """Parsing utilities"""
 
-import os
-from functools import reduce
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
 
-import yaml
+from replication.parser.versions import load_versions, thaw
 
-_parsed_file = {}
+
+class PathAccessor:
+    """Getter and setter of a `path` entry of the versions file, with its dot-separated path split once
+
+    Reads `path` from the `location` (chart or values) of the chart, or of its `subchart`, and prepends
+    `prefix`. Writes the value at `path` of the custom values, under `subchart` when set.
+    """
+
+    __slots__ = ("subchart", "location", "keys", "branch", "prefix")
+
+    def __init__(self, subchart: Optional[str], location: Optional[str], path: str, prefix: Optional[str]):
+        self.subchart = subchart
+        self.location = location
+        self.keys: Tuple[str, ...] = tuple(path.split("."))
+        self.branch: Tuple[str, ...] = self.keys if subchart is None else (subchart, *self.keys)
+        self.prefix = prefix
+
+    def get(self, chart: Dict[str, Any]) -> str:
+        value: Any = chart["subcharts"][self.subchart] if self.subchart is not None else chart
+        value = value[self.location]
+        for key in self.keys:
+            value = value[key]
+        if self.prefix is not None:
+            value = self.prefix + value
+        return value  # type: ignore
+
+    def set(self, tree: Dict[str, Any], value: str) -> Dict[str, Any]:
+        node = tree
+        for key in self.branch[:-1]:
+            if key not in node:
+                node[key] = {}
+            node = node[key]
+        node[self.branch[-1]] = value
+        return tree
+
+
+@lru_cache(maxsize=None)
+def _compile(subchart: Optional[str], location: Optional[str], path: str, prefix: Optional[str]) -> PathAccessor:
+    return PathAccessor(subchart, location, path, prefix)
+
+
+def compile_path(data: Dict[str, Any]) -> PathAccessor:
+    """Returns the accessor of a `path` entry, compiled once per distinct entry
+
+    Args:
+        data (dict): Entry with `path`, and optionally `location`, `subchart` and `prefix`
+
+    Returns:
+        PathAccessor: Accessor of the entry
+    """
+    return _compile(data.get("subchart"), data.get("location"), data["path"], data.get("prefix"))
 
 
 def _get_branch(data: dict) -> list:  # type: ignore
@@ -21,12 +70,7 @@ def _get_branch(data: dict) -> list:  # type: ignore
     Returns:
         list: Dictionary branches
     """
-    branch = data["path"].split(".")
-
-    if "subchart" in data:
-        branch = [data["subchart"]] + data["path"].split(".")
-
-    return branch  # type: ignore
+    return list(compile_path(data).branch)
 
 
 def _add_branch(tree: dict, branch: list, value: str) -> dict:  # type: ignore
@@ -40,8 +84,12 @@ def _add_branch(tree: dict, branch: list, value: str) -> dict:  # type: ignore
     Returns:
         dict: _description_
     """
-    key = branch[0]
-    tree[key] = value if len(branch) == 1 else _add_branch(tree[key] if key in tree else {}, branch[1:], value)
+    node = tree
+    for key in branch[:-1]:
+        if key not in node:
+            node[key] = {}
+        node = node[key]
+    node[branch[-1]] = value
     return tree
 
 
@@ -55,29 +103,10 @@ def _get_dictionary_value_by_dot_separated_key(dct: dict, key: str) -> str:  # t
     Returns:
         str: _description_
     """
-    return reduce(lambda c, k: c[k], key.split("."), dct)  # type: ignore
-
-
-def _parse_versions_file(versions_dir: str, eks_version: str) -> dict:  # type: ignore
-    """Parses versions file
-
-    Args:
-        versions_dir (str): Directory with versions files
-        eks_version (str): EKS version
-
-    Returns:
-        dict: Parsed versions file
-    """
-    if eks_version not in _parsed_file:
-        yaml_path = os.path.join(
-            versions_dir,
-            f"{eks_version}.yaml",
-        )
-
-        with open(yaml_path, encoding="utf-8") as yaml_file:
-            _parsed_file[eks_version] = yaml.safe_load(yaml_file)
-
-    return _parsed_file[eks_version]  # type: ignore
+    value = dct
+    for k in compile_path({"path": key}).keys:
+        value = value[k]
+    return value  # type: ignore
 
 
 def _needs_custom_replication(data: dict, image_name: str, type_of_value: str) -> bool:  # type: ignore
@@ -108,8 +137,7 @@ def add_branch_to_dict(dct: dict, data: dict, value: str) -> dict:  # type: igno
     Returns:
         dict: Updated dictionary
     """
-    branch = _get_branch(data)
-    return _add_branch(dct, branch, value)
+    return compile_path(data).set(dct, value)
 
 
 def get_ami_version(versions_dir: str, eks_version: str) -> str:
@@ -122,11 +150,7 @@ def get_ami_version(versions_dir: str, eks_version: str) -> str:
     Returns:
         str: AMI version string
     """
-    workload_versions = _parse_versions_file(versions_dir, eks_version)
-    if "ami" in workload_versions and "version" in workload_versions["ami"]:
-        return workload_versions["ami"]["version"]  # type: ignore
-
-    return ""
+    return load_versions(versions_dir, eks_version).ami.get("version", "")  # type: ignore
 
 
 def get_additional_images(versions_dir: str, eks_version: str) -> dict:  # type: ignore
@@ -139,47 +163,24 @@ def get_additional_images(versions_dir: str, eks_version: str) -> dict:  # type:
     Returns:
         dict: Dictionary of additional images
     """
-    workload_versions = _parse_versions_file(versions_dir, eks_version)
-    additional_images = {}  # type: ignore
-    if "additional_images" in workload_versions:
-        return workload_versions["additional_images"]  # type: ignore
-
-    return additional_images
+    return thaw(load_versions(versions_dir, eks_version).additional_images)  # type: ignore
 
 
 def get_docker_mappings(versions_dir: str, eks_version: str) -> dict:  # type: ignore
-    workload_versions = _parse_versions_file(versions_dir, eks_version)
-    docker_mappings = {}  # type: ignore
-    if "docker_mappings" in workload_versions:
-        return workload_versions["docker_mappings"]  # type: ignore
-
-    return docker_mappings
+    return thaw(load_versions(versions_dir, eks_version).docker_mappings)  # type: ignore
 
 
 def get_workloads(versions_dir: str, eks_version: str) -> dict:  # type: ignore
-    """Parses versions files
+    """Gets the charts of an EKS version that are not skipped, merged with their defaults
 
     Args:
         versions_dir (str): Directory with versions files
         eks_version (str): EKS version
 
     Returns:
-        dict: Parsed data
+        dict: Copy of the merged charts
     """
-    workload_versions = _parse_versions_file(versions_dir, eks_version)
-    workload_data = _parse_versions_file(versions_dir, "default")
-    for name, value in workload_versions["charts"].items():
-        if "skip" in value and value["skip"]:
-            workload_data["charts"].pop(name)
-            continue
-
-        if "version" in value:
-            workload_data["charts"][name]["version"] = value["version"]
-
-        if "replication" in value:
-            workload_data["charts"][name]["replication"] = value["replication"]
-
-    return workload_data["charts"]  # type: ignore
+    return load_versions(versions_dir, eks_version).workloads()
 
 
 def parse_value(
@@ -204,16 +205,4 @@ def parse_value(
     if _needs_custom_replication(values, image_name, value_name):
         return values["replication"][image_name][value_name]  # type: ignore
 
-    value = ""
-    if "subchart" in image_data:
-        value = _get_dictionary_value_by_dot_separated_key(
-            workload["subcharts"][image_data["subchart"]][image_data["location"]],
-            image_data["path"],
-        )
-    else:
-        value = _get_dictionary_value_by_dot_separated_key(workload[image_data["location"]], image_data["path"])
-
-    if "prefix" in image_data:
-        value = image_data["prefix"] + value
-
-    return value
+    return compile_path(image_data).get(workload)
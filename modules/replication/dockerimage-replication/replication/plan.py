@@ -0,0 +1,206 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Replication plan, computed without transferring anything and consumed by the replication scripts"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from replication.checkpoint import Checkpoint
+from replication.ecr.ecr_utils import ECRUtils, split_target_image
+from replication.logging import logger
+from replication.registry.copier import ImageCopier
+from replication.registry.registry_client import RegistryClients, RegistryError
+from replication.state import ReplicationState
+
+PLAN_FILE = "replication-plan.json"
+IMAGES_FILE = "updated_images.json"
+CHARTS_FILE = "replication-result.json"
+
+MISSING = "missing"
+CHANGED = "changed"
+CURRENT = "current"
+# the source could not be resolved over the registry API, the replication checks it again
+UNKNOWN = "unknown"
+
+# used until a replication run measured the actual throughput
+DEFAULT_THROUGHPUT = 20 * 1024 * 1024
+
+
+def chart_repository(chart: Dict[str, Any]) -> str:
+    """ECR repository name of a chart of `replication-result.json`"""
+    return str(chart["helm"]["repository"].replace("oci://", "").split("/", 1)[-1])
+
+
+def chart_reference(chart: Dict[str, Any]) -> str:
+    """`repository:version` of a chart in ECR, the key of its checkpoint entry"""
+    return f"{chart_repository(chart)}:{chart['helm']['version']}"
+
+
+def plan_images(
+    ecr_utils: ECRUtils,
+    image_data: List[Dict[str, str]],
+    sources: RegistryClients,
+    copier: Optional[ImageCopier] = None,
+    state: Optional[ReplicationState] = None,
+    max_workers: int = 8,
+    checkpoint: Optional[Checkpoint] = None,
+) -> List[Dict[str, Any]]:
+    """Compares every source image with its target, resolving source digests and manifests in parallel
+
+    Target tags and digests are answered from the ECR index, which must be loaded with tags. Images journaled
+    by an interrupted replication are current without any lookup.
+
+    Returns:
+        list: `src`, `target`, `status`, digests and blob bytes of every image, in the order of `image_data`
+    """
+
+    def plan_image(image_repl: Dict[str, str]) -> Dict[str, Any]:
+        src, target = image_repl["src"], image_repl["target"]
+        done = checkpoint.get("image", target) if checkpoint else None
+        if done and done.get("source") == src:
+            return {
+                "src": src,
+                "target": target,
+                "status": CURRENT,
+                "sourceDigest": done.get("sourceDigest"),
+                "targetDigest": done.get("targetDigest"),
+            }
+        target_repo, target_version = split_target_image(target, ecr_utils.aws_account_id)
+        source_digest = sources.resolve_digest(src)
+        exists = ecr_utils.image_exists(target_repo, target_version)
+        target_digest = ecr_utils.image_digest(target_repo, target_version) if exists else None
+
+        if source_digest is None:
+            status = UNKNOWN
+        elif not exists:
+            status = MISSING
+        elif state and state.get(target) and not state.is_current(target, source_digest, target_digest):
+            status = CHANGED
+        else:
+            status = CURRENT
+
+        entry: Dict[str, Any] = {
+            "src": src,
+            "target": target,
+            "status": status,
+            "sourceDigest": source_digest,
+            "targetDigest": target_digest,
+        }
+        if copier and status in (MISSING, CHANGED):
+            try:
+                entry["blobs"] = {blob["digest"]: blob.get("size", 0) for blob in copier.blobs(src)}
+            except (RegistryError, requests.RequestException) as e:
+                logger.info(f"Could not resolve the manifest of {src}: {e}")
+        return entry
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        return list(executor.map(plan_image, image_data))
+
+
+def plan_charts(
+    ecr_utils: ECRUtils, charts: Dict[str, Dict[str, Any]], checkpoint: Optional[Checkpoint] = None
+) -> List[Dict[str, Any]]:
+    """Checks which charts of `replication-result.json` are missing from ECR, unless they were journaled
+
+    Returns:
+        list: `key`, `name`, `version`, `repository` and `status` of every chart
+    """
+    return [
+        {
+            "key": key,
+            "name": chart["helm"]["name"],
+            "version": chart["helm"]["version"],
+            "repository": chart_repository(chart),
+            "status": CURRENT
+            if (checkpoint and checkpoint.get("chart", chart_reference(chart)))
+            or ecr_utils.image_exists(chart_repository(chart), chart["helm"]["version"])
+            else MISSING,
+        }
+        for key, chart in charts.items()
+    ]
+
+
+def summarize(
+    images: List[Dict[str, Any]], charts: List[Dict[str, Any]], throughput: Optional[float] = None
+) -> Dict[str, Any]:
+    """Counts images and charts by status and estimates the transfer duration of the blobs to move"""
+    unique: Dict[str, int] = {}
+    total = 0
+    for image in images:
+        for digest, size in image.get("blobs", {}).items():
+            unique[digest] = size
+            total += size
+    throughput = throughput or DEFAULT_THROUGHPUT
+
+    def count(entries: List[Dict[str, Any]]) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for entry in entries:
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
+
+    return {
+        "images": count(images),
+        "charts": count(charts),
+        "totalBytes": total,
+        "uniqueBytes": sum(unique.values()),
+        "throughputBytesPerSecond": throughput,
+        "estimatedSeconds": round(sum(unique.values()) / throughput, 1),
+    }
+
+
+def input_digests(paths: List[str]) -> Dict[str, Optional[str]]:
+    """sha256 of every file the plan is computed from, None for the files that do not exist"""
+    digests: Dict[str, Optional[str]] = {}
+    for path in paths:
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                digests[path] = hashlib.sha256(f.read()).hexdigest()
+        else:
+            digests[path] = None
+    return digests
+
+
+def write_plan(
+    path: str,
+    images: List[Dict[str, Any]],
+    charts: List[Dict[str, Any]],
+    summary: Dict[str, Any],
+    inputs: Dict[str, Optional[str]],
+) -> None:
+    """Writes the plan along with the digests of the input files it was computed from"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "generatedAt": datetime.now(timezone.utc).isoformat(),
+                "inputs": inputs,
+                "summary": summary,
+                "images": images,
+                "charts": charts,
+            },
+            f,
+            indent=2,
+        )
+
+
+def load_plan(path: str = PLAN_FILE) -> Optional[Dict[str, Any]]:
+    """Returns the plan written by the planning step, None when there is none
+
+    A plan computed from other input files than the current ones, such as the plan of a previous run, is not used.
+    """
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        plan: Dict[str, Any] = json.load(f)
+    inputs = plan.get("inputs")
+    if not inputs or input_digests(list(inputs)) != inputs:
+        logger.info(f"Ignoring the replication plan generated at {plan.get('generatedAt')}, its inputs changed")
+        return None
+    logger.info(f"Using the replication plan generated at {plan.get('generatedAt')}")
+    return plan
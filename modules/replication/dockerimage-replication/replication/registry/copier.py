@@ -0,0 +1,294 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Registry to registry image copy"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import requests
+
+from replication.checkpoint import Checkpoint
+from replication.logging import logger
+from replication.metrics import bind, metrics
+from replication.registry.registry_client import (
+    INDEX_MEDIA_TYPES,
+    MANIFEST_MEDIA_TYPES,
+    ImageReference,
+    RegistryClient,
+    RegistryClients,
+    RegistryError,
+)
+
+DEFAULT_PLATFORM = "linux/amd64"
+ALL_PLATFORMS = "all"
+
+
+def _platform(descriptor: Dict[str, Any]) -> str:
+    platform = descriptor.get("platform", {})
+    name = f"{platform.get('os')}/{platform.get('architecture')}"
+    return f"{name}/{platform['variant']}" if platform.get("variant") else name
+
+
+def parse_platforms(value: str) -> List[str]:
+    """Parses a comma separated list of platforms, `all` selects every platform of multi-platform images"""
+    platforms = [platform.strip() for platform in value.split(",") if platform.strip()]
+    return [ALL_PLATFORMS] if ALL_PLATFORMS in platforms else platforms or [DEFAULT_PLATFORM]
+
+
+def _is_attestation(descriptor: Dict[str, Any]) -> bool:
+    return bool(descriptor.get("annotations", {}).get("vnd.docker.reference.type") == "attestation-manifest")
+
+
+def _blobs(manifest: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Blobs of a resolved manifest, or of the platform manifests of a resolved index, that have to be copied"""
+    if manifest.get("children") is not None:
+        return [blob for child in manifest["children"] for blob in _blobs(child)]
+    document = json.loads(manifest["body"])
+    # non-distributable layers are fetched from their own URLs by the runtime
+    return [blob for blob in [document["config"]] + document.get("layers", []) if not blob.get("urls")]
+
+
+class ImageCopier:
+    """Copies images between registries over the distribution API, without a local Docker daemon
+
+    Blobs the target repository already has are skipped. Every other blob is uploaded once per run: the first
+    image needing it uploads it, images needing it concurrently wait for that upload and then mount the blob
+    from the repository it was uploaded to instead of uploading it again.
+
+    With a single platform, multi-platform images are copied as the manifest of that platform, as `docker pull`
+    does. With several platforms, or `all`, the index is copied with the selected platform manifests, which are
+    transferred concurrently.
+    """
+
+    def __init__(
+        self,
+        target: RegistryClient,
+        sources: RegistryClients,
+        platforms: Sequence[str] = (DEFAULT_PLATFORM,),
+        max_workers: int = 4,
+        checkpoint: Optional[Checkpoint] = None,
+    ):
+        self.target = target
+        self.sources = sources
+        self.platforms = list(platforms)
+        self.max_workers = max_workers
+        self.checkpoint = checkpoint
+        self.bytes_transferred = 0
+        self.bytes_mounted = 0
+        self.bytes_existing = 0
+        self._blob_locations: Dict[str, str] = {}
+        self._uploads: Dict[str, threading.Event] = {}
+        self._manifests: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def bytes_saved(self) -> int:
+        """Bytes not uploaded because the blob was mounted or already present in the target repository"""
+        return self.bytes_mounted + self.bytes_existing
+
+    def _add(self, counter: str, size: int) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + size)
+
+    def _copy_blob(self, source: RegistryClient, src: ImageReference, repository: str, blob: Dict[str, Any]) -> None:
+        digest = blob["digest"]
+        size = blob.get("size", 0)
+        with self._lock:
+            upload = self._uploads.get(digest)
+            owner = upload is None
+            if owner:
+                upload = self._uploads[digest] = threading.Event()
+        if not owner:
+            # another image is uploading this blob, mount it once it is there
+            upload.wait()  # type: ignore
+
+        copied = False
+        try:
+            with metrics.operation("blob existing") as record:
+                if self.target.blob_exists(repository, digest):
+                    logger.debug(f"Blob {digest} already present in {repository}")
+                    self._add("bytes_existing", size)
+                    copied = True
+                    return
+                with self._lock:
+                    mount_from = self._blob_locations.get(digest)
+                mounted, location = False, None
+                if mount_from and mount_from != repository:
+                    mounted, location = self.target.start_upload(repository, digest, mount_from)
+                    if mounted:
+                        logger.debug(f"Blob {digest} mounted from {mount_from} into {repository}")
+                        record["operation"] = "blob mount"
+                        self._add("bytes_mounted", size)
+                if not mounted:
+                    record["operation"] = "blob upload"
+                    if self.checkpoint and size > self.target.upload_chunk_size:
+                        record["bytes"] = self._resumable_upload(source, src, repository, blob, location)
+                    else:
+                        record["bytes"] = self.target.stream_blob(source, src.repository, repository, blob, location)
+                    self._add("bytes_transferred", record["bytes"])
+            copied = True
+        finally:
+            if copied:
+                with self._lock:
+                    self._blob_locations.setdefault(digest, repository)
+            if owner:
+                upload.set()  # type: ignore
+
+    def _resumable_upload(
+        self,
+        source: RegistryClient,
+        src: ImageReference,
+        repository: str,
+        blob: Dict[str, Any],
+        location: Optional[str],
+    ) -> int:
+        """Uploads a large blob in parts, journaling its progress so an interrupted run resumes the upload"""
+        key = f"{repository}@{blob['digest']}"
+        offset = 0
+        saved = self.checkpoint.get("upload", key) if self.checkpoint else None
+        if saved:
+            received = self.target.upload_offset(repository, saved["location"])
+            if received is not None:
+                logger.info(f"Resuming the upload of {key} at {received} of {blob.get('size')} bytes")
+                if location is not None:
+                    # the session opened by the failed mount is superseded by the saved one
+                    self.target.cancel_upload(repository, location)
+                location, offset = saved["location"], received
+        if location is None:
+            _, location = self.target.start_upload(repository)
+
+        def progress(upload_location: str, uploaded: int) -> None:
+            if self.checkpoint:
+                self.checkpoint.record("upload", key, location=upload_location, offset=uploaded)
+
+        return self.target.resume_blob(source, src.repository, repository, blob, str(location), offset, progress)
+
+    def _resolve_manifest(self, source: RegistryClient, src: ImageReference, reference: str) -> Dict[str, Any]:
+        body, media_type, digest = source.get_manifest(src.repository, reference)
+        if media_type not in MANIFEST_MEDIA_TYPES:
+            raise RegistryError(f"Unsupported manifest type {media_type} for {src.repository}@{reference}")
+        return {"body": body, "mediaType": media_type, "digest": digest}
+
+    def _resolve(self, source: RegistryClient, src: ImageReference) -> Dict[str, Any]:
+        body, media_type, digest = source.get_manifest(src.repository, src.reference)
+        if media_type not in INDEX_MEDIA_TYPES:
+            if media_type not in MANIFEST_MEDIA_TYPES:
+                raise RegistryError(f"Unsupported manifest type {media_type} for {src.repository}:{src.reference}")
+            return {"body": body, "mediaType": media_type, "digest": digest}
+
+        index = json.loads(body)
+        if len(self.platforms) == 1 and self.platforms[0] != ALL_PLATFORMS:
+            matches = [m for m in index.get("manifests", []) if _platform(m) == self.platforms[0]]
+            if not matches:
+                raise RegistryError(f"{src.repository}:{src.reference} has no {self.platforms[0]} manifest")
+            return self._resolve_manifest(source, src, matches[0]["digest"])
+
+        selected = index.get("manifests", [])
+        if ALL_PLATFORMS not in self.platforms:
+            kept = {m["digest"] for m in selected if not _is_attestation(m) and _platform(m) in self.platforms}
+            if not kept:
+                raise RegistryError(f"{src.repository}:{src.reference} has none of the {self.platforms} manifests")
+            # attestations describing a kept platform manifest are kept along with it
+            selected = [
+                m
+                for m in selected
+                if m["digest"] in kept
+                or (_is_attestation(m) and m["annotations"].get("vnd.docker.reference.digest") in kept)
+            ]
+            if len(selected) != len(index["manifests"]):
+                index["manifests"] = selected
+                body = json.dumps(index).encode("utf-8")
+        children = [self._resolve_manifest(source, src, m["digest"]) for m in selected]
+        return {"body": body, "mediaType": media_type, "digest": digest, "children": children}
+
+    def _manifest(self, src_image: str) -> Dict[str, Any]:
+        with self._lock:
+            manifest = self._manifests.get(src_image)
+        if manifest is None:
+            src = ImageReference.parse(src_image)
+            manifest = self._resolve(self.sources.get(src), src)
+            with self._lock:
+                self._manifests[src_image] = manifest
+        return manifest
+
+    def blobs(self, src_image: str) -> List[Dict[str, Any]]:
+        """Blobs copied for `src_image`, its manifest is resolved once per run"""
+        return _blobs(self._manifest(src_image))
+
+    def plan(self, images: Iterable[Tuple[str, str]], max_workers: int = 8) -> Dict[str, int]:
+        """Resolves the manifests of all images to copy and computes the blobs shared between them
+
+        Args:
+            images (Iterable(tuple)): Source and target image of every copy of the run
+            max_workers (int): Maximum number of manifests resolved at the same time
+
+        Returns:
+            dict: Number of images and unique blobs, bytes of all blobs and of the unique ones
+        """
+        sources = sorted({src_image for src_image, _ in images})
+
+        def resolve(src_image: str) -> Optional[List[Dict[str, Any]]]:
+            try:
+                return self.blobs(src_image)
+            except (RegistryError, requests.RequestException) as e:
+                logger.info(f"Could not resolve {src_image}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            resolved = [blobs for blobs in executor.map(resolve, sources) if blobs is not None]
+
+        sizes: Dict[str, int] = {}
+        total = 0
+        for blobs in resolved:
+            for blob in blobs:
+                sizes[blob["digest"]] = blob.get("size", 0)
+                total += blob.get("size", 0)
+        unique = sum(sizes.values())
+        logger.info(
+            f"Planned {len(resolved)} images: {len(sizes)} unique blobs, {unique} of {total} bytes"
+            f" ({total - unique} bytes shared between images)"
+        )
+        return {"images": len(resolved), "blobs": len(sizes), "totalBytes": total, "uniqueBytes": unique}
+
+    def _copy_manifest(
+        self, source: RegistryClient, src: ImageReference, repository: str, manifest: Dict[str, Any], reference: str
+    ) -> None:
+        for blob in _blobs(manifest):
+            self._copy_blob(source, src, repository, blob)
+        self.target.put_manifest(repository, reference, manifest["body"], manifest["mediaType"])
+
+    def copy(self, src_image: str, target_image: str) -> bool:
+        """Copies `src_image` to `target_image`, which must live in the target registry
+
+        Returns:
+            bool: True when the image was copied
+        """
+        try:
+            src = ImageReference.parse(src_image)
+            target = ImageReference.parse(target_image)
+            source = self.sources.get(src)
+            manifest = self._manifest(src_image)
+            children = manifest.get("children")
+            if children is not None:
+                # platform manifests must exist before the index referencing them is pushed
+                with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(children)))) as executor:
+                    futures = [
+                        executor.submit(
+                            bind(self._copy_manifest), source, src, target.repository, child, child["digest"]
+                        )
+                        for child in children
+                    ]
+                    for future in futures:
+                        future.result()
+                logger.info(f"Pushing index {target_image} ({len(children)} manifests)")
+                self.target.put_manifest(target.repository, target.reference, manifest["body"], manifest["mediaType"])
+            else:
+                logger.info(f"Pushing manifest {target_image}")
+                self._copy_manifest(source, src, target.repository, manifest, target.reference)
+            return True
+        except (RegistryError, requests.RequestException) as e:
+            logger.info(f"Error copying {src_image} to {target_image}: {e}")
+            return False
@@ -0,0 +1,423 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Minimal OCI distribution API client"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import IO, Any, Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+
+from replication.logging import logger
+from replication.retry import RETRYABLE_STATUSES, backoff, retry_attempts, retry_max_delay, throttle
+
+DOCKER_HUB = "docker.io"
+DOCKER_HUB_API = "registry-1.docker.io"
+
+MEDIA_TYPE_DOCKER_MANIFEST = "application/vnd.docker.distribution.manifest.v2+json"
+MEDIA_TYPE_DOCKER_MANIFEST_LIST = "application/vnd.docker.distribution.manifest.list.v2+json"
+MEDIA_TYPE_OCI_MANIFEST = "application/vnd.oci.image.manifest.v1+json"
+MEDIA_TYPE_OCI_INDEX = "application/vnd.oci.image.index.v1+json"
+
+INDEX_MEDIA_TYPES = (MEDIA_TYPE_DOCKER_MANIFEST_LIST, MEDIA_TYPE_OCI_INDEX)
+MANIFEST_MEDIA_TYPES = (MEDIA_TYPE_DOCKER_MANIFEST, MEDIA_TYPE_OCI_MANIFEST)
+ACCEPT_MANIFEST = ", ".join(INDEX_MEDIA_TYPES + MANIFEST_MEDIA_TYPES)
+
+_CHALLENGE_PARAM = re.compile(r'(\w+)="([^"]*)"')
+
+
+class RegistryError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class ImageReference:
+    registry: str
+    repository: str
+    reference: str
+
+    @classmethod
+    def parse(cls, image: str) -> "ImageReference":
+        """Parses `[registry/]repository[:tag][@digest]`, defaulting to Docker Hub like `docker pull` does"""
+        name, _, digest = image.partition("@")
+        tag = "latest"
+        last_component = name.rsplit("/", 1)[-1]
+        if ":" in last_component:
+            name, tag = name.rsplit(":", 1)
+
+        registry = DOCKER_HUB
+        first, _, rest = name.partition("/")
+        if rest and ("." in first or ":" in first or first == "localhost"):
+            registry, name = first, rest
+        if registry == DOCKER_HUB and "/" not in name:
+            name = f"library/{name}"
+        return cls(registry=registry, repository=name, reference=digest or tag)
+
+    @property
+    def api_host(self) -> str:
+        return DOCKER_HUB_API if self.registry == DOCKER_HUB else self.registry
+
+
+class _SizedStream:
+    """File-like wrapper exposing a length, so requests sends Content-Length instead of chunked encoding"""
+
+    def __init__(self, chunks: Iterator[bytes], size: int):
+        self._chunks = chunks
+        # bytes read from the chunks and not returned yet, deleting from the front of a bytearray does not copy
+        self._buffer = bytearray()
+        self._size = size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def read(self, amount: int = -1) -> bytes:
+        if amount < 0:
+            data = bytes(self._buffer) + b"".join(self._chunks)
+            self._buffer.clear()
+            return data
+        while len(self._buffer) < amount:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        data = bytes(self._buffer[:amount])
+        del self._buffer[:amount]
+        return data
+
+
+def digest_of(data: bytes) -> str:
+    return f"sha256:{hashlib.sha256(data).hexdigest()}"
+
+
+class RegistryClient:
+    """Talks to a single registry, handling Basic and Bearer token challenges"""
+
+    def __init__(
+        self,
+        host: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        scheme: str = "https",
+        chunk_size: int = 1024 * 1024,
+        upload_chunk_size: int = 32 * 1024 * 1024,
+    ):
+        self.host = host
+        self.base_url = f"{scheme}://{host}"
+        self.username = username
+        self.password = password
+        self.session = session if session is not None else requests.Session()
+        self.chunk_size = chunk_size
+        # size of the parts of resumable uploads, ECR requires at least 5 MiB per part
+        self.upload_chunk_size = upload_chunk_size
+        self._basic = False
+        self._tokens: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _url(self, repository: str, path: str) -> str:
+        return f"{self.base_url}/v2/{repository}/{path}"
+
+    def _send(self, method: str, url: str, scope: str, headers: Dict[str, str], **kwargs: Any) -> requests.Response:
+        if self._basic:
+            kwargs["auth"] = (self.username, self.password)
+        else:
+            with self._lock:
+                token = self._tokens.get(scope)
+            if token:
+                headers = {**headers, "Authorization": f"Bearer {token}"}
+        return self.session.request(method, url, headers=headers, timeout=300, **kwargs)
+
+    def _authenticate(self, challenge: str, scope: str) -> None:
+        scheme, _, params = challenge.partition(" ")
+        if scheme.lower() == "basic":
+            if not (self.username and self.password):
+                raise RegistryError(f"{self.host} requires credentials")
+            self._basic = True
+            return
+        if scheme.lower() != "bearer":
+            raise RegistryError(f"Unsupported authentication challenge from {self.host}: {scheme}")
+
+        values = dict(_CHALLENGE_PARAM.findall(params))
+        query = {"service": values.get("service", self.host), "scope": values.get("scope", scope)}
+        auth = (self.username, self.password) if self.username and self.password else None
+        response = self.session.request("GET", values["realm"], params=query, auth=auth, timeout=60)
+        if response.status_code != 200:
+            raise RegistryError(f"Failed to obtain a token from {values['realm']}: {response.status_code}")
+        body = response.json()
+        with self._lock:
+            self._tokens[scope] = body.get("token") or body.get("access_token")
+
+    def request(
+        self, method: str, url: str, scope: str, headers: Optional[Dict[str, str]] = None, **kwargs: Any
+    ) -> requests.Response:
+        """Sends a request, answering an authentication challenge once
+
+        Throttled (429) and failed (5xx) requests are retried with jittered exponential backoff, or after the
+        `Retry-After` the registry asked for, unless their body is a stream that cannot be sent again.
+        """
+        replayable = not hasattr(kwargs.get("data"), "read")
+        attempt = 0
+        while True:
+            response = self._send(method, url, scope, headers or {}, **kwargs)
+            if response.status_code == 401:
+                self._authenticate(response.headers.get("WWW-Authenticate", ""), scope)
+                response = self._send(method, url, scope, headers or {}, **kwargs)
+            if response.status_code not in RETRYABLE_STATUSES or not replayable or attempt + 1 >= retry_attempts:
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            delay = min(float(retry_after), retry_max_delay) if retry_after.isdigit() else backoff(attempt)
+            response.close()
+            logger.info(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def get_manifest(self, repository: str, reference: str) -> Tuple[bytes, str, str]:
+        """Fetches a manifest or index
+
+        Returns:
+            tuple: raw manifest, media type and digest
+        """
+        # registries count manifest downloads as pulls
+        throttle(self.host)
+        response = self.request(
+            "GET",
+            self._url(repository, f"manifests/{reference}"),
+            f"repository:{repository}:pull",
+            headers={"Accept": ACCEPT_MANIFEST},
+        )
+        if response.status_code != 200:
+            raise RegistryError(f"GET manifest {self.host}/{repository}:{reference} returned {response.status_code}")
+        body = response.content
+        media_type = response.headers.get("Content-Type", "").split(";")[0] or json.loads(body).get("mediaType", "")
+        return body, media_type, response.headers.get("Docker-Content-Digest") or digest_of(body)
+
+    def head_manifest(self, repository: str, reference: str) -> Optional[str]:
+        """Resolves a tag to its digest without downloading the manifest"""
+        response = self.request(
+            "HEAD",
+            self._url(repository, f"manifests/{reference}"),
+            f"repository:{repository}:pull",
+            headers={"Accept": ACCEPT_MANIFEST},
+        )
+        if response.status_code != 200:
+            return None
+        return response.headers.get("Docker-Content-Digest")
+
+    def put_manifest(self, repository: str, reference: str, body: bytes, media_type: str) -> None:
+        response = self.request(
+            "PUT",
+            self._url(repository, f"manifests/{reference}"),
+            f"repository:{repository}:pull,push",
+            headers={"Content-Type": media_type},
+            data=body,
+        )
+        if response.status_code not in (200, 201):
+            raise RegistryError(f"PUT manifest {self.host}/{repository}:{reference} returned {response.status_code}")
+
+    def blob_exists(self, repository: str, digest: str) -> bool:
+        response = self.request("HEAD", self._url(repository, f"blobs/{digest}"), f"repository:{repository}:pull")
+        return response.status_code == 200
+
+    def get_blob(self, repository: str, digest: str, offset: int = 0) -> requests.Response:
+        """Streams a blob, from `offset` when the registry supports ranges (206), from the start otherwise (200)"""
+        response = self.request(
+            "GET",
+            self._url(repository, f"blobs/{digest}"),
+            f"repository:{repository}:pull",
+            headers={"Range": f"bytes={offset}-"} if offset else None,
+            stream=True,
+        )
+        if response.status_code not in ((200, 206) if offset else (200,)):
+            raise RegistryError(f"GET blob {self.host}/{repository}@{digest} returned {response.status_code}")
+        return response
+
+    def start_upload(
+        self, repository: str, digest: Optional[str] = None, mount_from: Optional[str] = None
+    ) -> Tuple[bool, Optional[str]]:
+        """Starts a blob upload, optionally trying to mount the blob from another repository first
+
+        Returns:
+            tuple: whether the blob was mounted and the upload location otherwise
+        """
+        params = {"mount": digest, "from": mount_from} if digest and mount_from else None
+        scope = f"repository:{repository}:pull,push"
+        if mount_from:
+            scope += f" repository:{mount_from}:pull"
+        response = self.request("POST", self._url(repository, "blobs/uploads/"), scope, params=params)
+        if response.status_code == 201:
+            return True, None
+        if response.status_code != 202:
+            raise RegistryError(f"POST blob upload to {self.host}/{repository} returned {response.status_code}")
+        return False, urljoin(self.base_url, response.headers["Location"])
+
+    def upload_blob(self, repository: str, location: str, digest: str, size: int, data: IO[bytes]) -> None:
+        """Completes a monolithic upload started with `start_upload`, streaming `data`"""
+        separator = "&" if "?" in location else "?"
+        response = self.request(
+            "PUT",
+            f"{location}{separator}digest={digest}",
+            f"repository:{repository}:pull,push",
+            headers={"Content-Type": "application/octet-stream", "Content-Length": str(size)},
+            data=data,
+        )
+        if response.status_code not in (201, 204):
+            raise RegistryError(f"PUT blob {self.host}/{repository}@{digest} returned {response.status_code}")
+
+    def upload_offset(self, repository: str, location: str) -> Optional[int]:
+        """Number of bytes an upload session received, None when the registry no longer knows the session"""
+        response = self.request("GET", location, f"repository:{repository}:pull,push")
+        if response.status_code != 204:
+            return None
+        received = response.headers.get("Range", "")
+        return int(received.rsplit("-", 1)[-1]) + 1 if "-" in received else 0
+
+    def cancel_upload(self, repository: str, location: str) -> None:
+        """Cancels an upload session that will not be used, registries otherwise keep it until it expires"""
+        response = self.request("DELETE", location, f"repository:{repository}:pull,push")
+        if response.status_code not in (204, 404):
+            logger.debug(f"DELETE blob upload {location} returned {response.status_code}")
+
+    def upload_chunk(self, repository: str, location: str, offset: int, data: bytes) -> str:
+        """Appends `data` at `offset` to an upload session
+
+        Returns:
+            str: Location of the next part of the upload
+        """
+        response = self.request(
+            "PATCH",
+            location,
+            f"repository:{repository}:pull,push",
+            headers={
+                "Content-Type": "application/octet-stream",
+                "Content-Range": f"{offset}-{offset + len(data) - 1}",
+                "Content-Length": str(len(data)),
+            },
+            data=data,
+        )
+        if response.status_code != 202:
+            raise RegistryError(f"PATCH blob upload to {self.host}/{repository} returned {response.status_code}")
+        return urljoin(self.base_url, response.headers.get("Location", location))
+
+    def resume_blob(
+        self,
+        source: "RegistryClient",
+        source_repository: str,
+        repository: str,
+        blob: Dict[str, Any],
+        location: str,
+        offset: int = 0,
+        progress: Optional[Callable[[str, int], None]] = None,
+    ) -> int:
+        """Streams a blob from `source` in parts of `upload_chunk_size`, starting at `offset` of the upload
+
+        Args:
+            source (RegistryClient): Registry holding the blob
+            source_repository (str): Repository holding the blob in the source registry
+            repository (str): Target repository
+            blob (dict): Blob descriptor with `digest` and `size`
+            location (str): Location of the upload session
+            offset (int): Bytes the upload session already received
+            progress (Optional(Callable)): Called with the location and offset of the upload after every part
+
+        Returns:
+            int: number of bytes transferred
+        """
+        start = offset
+        response = source.get_blob(source_repository, blob["digest"], offset)
+        try:
+            # registries ignoring the range send the whole blob
+            skip = offset if response.status_code == 200 else 0
+            # parts are cut from the front of a bytearray, appending and deleting do not copy the whole buffer
+            buffer = bytearray()
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                if skip:
+                    chunk, skip = chunk[skip:], max(0, skip - len(chunk))
+                buffer += chunk
+                while len(buffer) >= self.upload_chunk_size:
+                    part = bytes(buffer[: self.upload_chunk_size])
+                    del buffer[: self.upload_chunk_size]
+                    location = self.upload_chunk(repository, location, offset, part)
+                    offset += len(part)
+                    if progress:
+                        progress(location, offset)
+            if buffer:
+                location = self.upload_chunk(repository, location, offset, bytes(buffer))
+                offset += len(buffer)
+        finally:
+            response.close()
+
+        separator = "&" if "?" in location else "?"
+        completed = self.request(
+            "PUT",
+            f"{location}{separator}digest={blob['digest']}",
+            f"repository:{repository}:pull,push",
+            headers={"Content-Length": "0"},
+        )
+        if completed.status_code not in (201, 204):
+            raise RegistryError(f"PUT blob {self.host}/{repository}@{blob['digest']} returned {completed.status_code}")
+        return offset - start
+
+    def stream_blob(
+        self,
+        source: "RegistryClient",
+        source_repository: str,
+        repository: str,
+        blob: Dict[str, Any],
+        location: Optional[str] = None,
+    ) -> int:
+        """Streams a blob from `source` into this registry without buffering it on disk
+
+        Args:
+            source (RegistryClient): Registry holding the blob
+            source_repository (str): Repository holding the blob in the source registry
+            repository (str): Target repository
+            blob (dict): Blob descriptor with `digest` and `size`
+            location (Optional(str)): Upload location already obtained from `start_upload`
+
+        Returns:
+            int: number of bytes transferred
+        """
+        if location is None:
+            _, location = self.start_upload(repository)
+        response = source.get_blob(source_repository, blob["digest"])
+        try:
+            stream = _SizedStream(response.iter_content(chunk_size=self.chunk_size), blob["size"])
+            self.upload_blob(repository, location, blob["digest"], blob["size"], stream)  # type: ignore
+        finally:
+            response.close()
+        return int(blob["size"])
+
+
+class RegistryClients:
+    """Clients for the source registries, one per registry host, sharing the same credentials"""
+
+    def __init__(
+        self, username: Optional[str] = None, password: Optional[str] = None, session_factory: Any = requests.Session
+    ):
+        self.username = username
+        self.password = password
+        self.session_factory = session_factory
+        self._clients: Dict[str, RegistryClient] = {}
+        self._lock = threading.Lock()
+
+    def get(self, reference: ImageReference) -> RegistryClient:
+        with self._lock:
+            if reference.api_host not in self._clients:
+                self._clients[reference.api_host] = RegistryClient(
+                    reference.api_host, self.username, self.password, session=self.session_factory()
+                )
+            return self._clients[reference.api_host]
+
+    def resolve_digest(self, image: str) -> Optional[str]:
+        """Resolves an image to the digest of its manifest (or index) with a single HEAD request"""
+        reference = ImageReference.parse(image)
+        try:
+            return self.get(reference).head_manifest(reference.repository, reference.reference)
+        except (RegistryError, requests.RequestException):
+            return None
@@ -0,0 +1,117 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Retries with jittered exponential backoff and per-registry rate limiting"""
+
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from replication.logging import logger
+
+# Docker Hub answers on several hosts, they share the pull limits of docker.io
+_REGISTRY_ALIASES = {"registry-1.docker.io": "docker.io", "index.docker.io": "docker.io"}
+
+# errors of the docker and helm CLIs, and registry responses, that go away when retried later
+RETRYABLE = re.compile(
+    r"\b(429|500|502|503|504)\b|toomanyrequests|too many requests|rate limit|throttl|service unavailable"
+    r"|bad gateway|gateway time-?out|timed out|timeout|connection reset|connection refused|unexpected eof"
+    r"|tls handshake|temporary failure",
+    re.IGNORECASE,
+)
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+# attempts of every command and registry request, 1 disables retries
+retry_attempts = max(1, int(os.getenv("SEEDFARMER_PARAMETER_RETRY_ATTEMPTS", "4")))
+retry_base_delay = 1.0
+retry_max_delay = 30.0
+
+
+def parse_rate_limits(value: str) -> Dict[str, float]:
+    """Parses `registry=pulls per minute` pairs, `none` disables rate limiting"""
+    limits: Dict[str, float] = {}
+    for pair in value.split(","):
+        registry, _, rate = pair.strip().partition("=")
+        if registry and rate:
+            limits[registry_key(registry)] = float(rate)
+    return limits
+
+
+def registry_key(host: str) -> str:
+    """Registry host, or URL of a helm repository, as the name its rate limit is configured with"""
+    if "://" in host:
+        host = urlparse(host).netloc
+    host = host.split("/", 1)[0].lower()
+    return _REGISTRY_ALIASES.get(host, host)
+
+
+# pulls per minute allowed per source registry
+rate_limits = parse_rate_limits(os.getenv("SEEDFARMER_PARAMETER_REGISTRY_RATE_LIMITS", "docker.io=60,quay.io=120"))
+
+
+def is_retryable(output: Optional[str]) -> bool:
+    """Whether the output of a failed command reports a transient error such as throttling"""
+    return bool(output and RETRYABLE.search(output))
+
+
+def backoff(attempt: int, base_delay: float = retry_base_delay, max_delay: float = retry_max_delay) -> float:
+    """Delay before retry number `attempt` (0 based), exponential with full jitter so workers spread out"""
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))  # nosec B311
+
+
+class TokenBucket:
+    """Allows `rate` operations per second on average, in bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Takes a token, waiting for one when the bucket is empty
+
+        Returns:
+            float: Seconds waited
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def throttle(registry: Optional[str]) -> None:
+    """Waits until the rate limit of `registry` allows another pull, registries without a limit never wait"""
+    if not registry:
+        return
+    key = registry_key(registry)
+    if key not in rate_limits:
+        return
+    with _buckets_lock:
+        if key not in _buckets:
+            per_minute = rate_limits[key]
+            _buckets[key] = TokenBucket(per_minute / 60, capacity=max(1.0, per_minute / 6))
+        bucket = _buckets[key]
+    waited = bucket.acquire()
+    if waited:
+        logger.debug(f"Waited {waited:.1f}s for the rate limit of {key}")
@@ -0,0 +1,79 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Replication state persisted between runs"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+
+from replication.logging import logger
+
+
+def _split_s3_uri(uri: str) -> Tuple[str, str]:
+    bucket, _, key = uri[len("s3://") :].partition("/")
+    return bucket, key
+
+
+class ReplicationState:
+    """Maps every replicated target image to the source and target digests it was replicated with
+
+    The state lives in a local file or, when `uri` starts with `s3://`, in an S3 object.
+    """
+
+    def __init__(self, uri: str):
+        self.uri = uri
+        self.images: Dict[str, Dict[str, Any]] = {}
+        # bytes per second measured by the last run that transferred data, used to estimate plans
+        self.throughput: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> "ReplicationState":
+        content = None
+        if self.uri.startswith("s3://"):
+            bucket, key = _split_s3_uri(self.uri)
+            s3_client = boto3.client("s3")
+            try:
+                content = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+            except s3_client.exceptions.NoSuchKey:
+                pass
+        elif os.path.isfile(self.uri):
+            with open(self.uri, "rb") as f:
+                content = f.read()
+        if content:
+            loaded = json.loads(content)
+            self.images = loaded.get("images", {})
+            self.throughput = loaded.get("throughput")
+        logger.info(f"Loaded replication state for {len(self.images)} images from {self.uri}")
+        return self
+
+    def save(self) -> None:
+        with self._lock:
+            content = json.dumps({"images": self.images, "throughput": self.throughput}, indent=2, sort_keys=True)
+        if self.uri.startswith("s3://"):
+            bucket, key = _split_s3_uri(self.uri)
+            boto3.client("s3").put_object(Bucket=bucket, Key=key, Body=content.encode("utf-8"))
+        else:
+            with open(self.uri, "w", encoding="utf-8") as f:
+                f.write(content)
+        logger.info(f"Saved replication state for {len(self.images)} images to {self.uri}")
+
+    def get(self, target: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.images.get(target)
+
+    def record(self, target: str, source: str, source_digest: str, target_digest: Optional[str]) -> None:
+        with self._lock:
+            self.images[target] = {"source": source, "sourceDigest": source_digest, "targetDigest": target_digest}
+
+    def is_current(self, target: str, source_digest: str, target_digest: Optional[str]) -> bool:
+        """Whether `target` was replicated from `source_digest` and still holds what was pushed"""
+        recorded = self.get(target)
+        return bool(
+            recorded
+            and recorded["sourceDigest"] == source_digest
+            and (target_digest is None or recorded.get("targetDigest") in (None, target_digest))
+        )
@@ -3,14 +3,17 @@
 
 import json
 import subprocess
+import time
 from copy import deepcopy
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import boto3
 from botocore.exceptions import ClientError
 from deepmerge import always_merger
 
 from replication.logging import logger
+from replication.metrics import metrics
+from replication.retry import backoff, is_retryable, retry_attempts, throttle
 
 USER = "username"
 PWD = "password"
@@ -72,24 +75,70 @@ def run_command(
     capture_output: Optional[bool] = True,
     shell: Optional[bool] = False,
     error_indicator: Optional[str] = "ERROR",
+    registry: Optional[str] = None,
+    transferred_bytes: int = 0,
 ) -> bool:
-    """Run a shell command."""
-    try:
-        result = subprocess.run(command, input=input, shell=shell, check=True, text=True, capture_output=capture_output)  # type: ignore
-        if error_indicator in result.stderr:
-            # Security: mask_sensitive_data() sanitizes passwords by replacing them with '******'
-            # before logging, so no sensitive data is exposed. See mask_sensitive_data() above.
-            logger.info(f"Error occurred executing command {mask_sensitive_data(command)}")  # type: ignore  # nosec
-            return False
-        else:
+    """Run a shell command, timed as the operation named after the command and its subcommand
+
+    Failures reporting a transient error (throttling, 5xx, timeouts) are retried with jittered exponential
+    backoff. With a `registry`, every attempt first waits for the rate limit of that registry.
+    `transferred_bytes` is recorded as the bytes of the operation when the command succeeds.
+    """
+    words = command.split() if isinstance(command, str) else command
+    with metrics.operation(" ".join(words[:2])) as record:
+        for attempt in range(retry_attempts):
+            throttle(registry)
+            try:
+                result = subprocess.run(
+                    command,
+                    input=input,
+                    shell=shell,  # type: ignore
+                    check=True,
+                    text=True,
+                    capture_output=capture_output,  # type: ignore
+                )
+                if error_indicator not in result.stderr:
+                    record["bytes"] = transferred_bytes
+                    return True
+                output = result.stderr
+                # Security: mask_sensitive_data() sanitizes passwords by replacing them with '******'
+                # before logging, so no sensitive data is exposed. See mask_sensitive_data() above.
+                message = f"Error occurred executing command {mask_sensitive_data(command)}"  # type: ignore
+            except subprocess.CalledProcessError as e:
+                output = e.stderr
+                # Security: mask_sensitive_data() sanitizes passwords by replacing them with '******'
+                # before logging, so no sensitive data is exposed. See mask_sensitive_data() above.
+                # Do not log stderr as it may contain sensitive information such as credentials
+                message = f"Error running command: {mask_sensitive_data(command)}"  # type: ignore
+            if attempt + 1 == retry_attempts or not is_retryable(output):
+                logger.info(message)  # nosec
+                record["outcome"] = "failed"
+                return False
+            delay = backoff(attempt)
+            logger.info(f"{message}, transient error, retrying in {delay:.1f}s")  # nosec
+            record["retries"] += 1
+            time.sleep(delay)
+    return False
+
+
+def wait_until(
+    condition: Callable[[], bool], timeout: float = 30.0, initial_delay: float = 0.25, max_delay: float = 4.0
+) -> bool:
+    """Polls `condition` with exponential backoff until it holds or `timeout` seconds elapsed
+
+    Returns:
+        bool: Whether the condition held before the timeout
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        if condition():
             return True
-    except subprocess.CalledProcessError:
-        # Security: mask_sensitive_data() sanitizes passwords by replacing them with '******'
-        # before logging, so no sensitive data is exposed. See mask_sensitive_data() above.
-        sanitized_command = mask_sensitive_data(command)  # type: ignore
-        # Do not log stderr as it may contain sensitive information such as credentials
-        logger.info(f"Error running command: {sanitized_command}")  # nosec
-        return False
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
 
 
 def export_results(message: str, replication_result: Dict[str, str]) -> None:
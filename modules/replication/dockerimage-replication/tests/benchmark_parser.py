@@ -0,0 +1,89 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Micro-benchmark of the compiled path accessors against splitting every path on every call
+
+Run from the module directory with `python -m tests.benchmark_parser [workloads] [images per workload]`.
+"""
+
+import sys
+import timeit
+from functools import reduce
+from typing import Any, Callable, Dict, List, Tuple
+
+from replication.parser import parser
+
+
+def _legacy_get(workload: Dict[str, Any], image_data: Dict[str, Any]) -> str:
+    if "subchart" in image_data:
+        source = workload["subcharts"][image_data["subchart"]][image_data["location"]]
+    else:
+        source = workload[image_data["location"]]
+    value = reduce(lambda c, k: c[k], image_data["path"].split("."), source)
+    if "prefix" in image_data:
+        value = image_data["prefix"] + value
+    return value  # type: ignore
+
+
+def _legacy_add(tree: Dict[str, Any], branch: List[str], value: str) -> Dict[str, Any]:
+    key = branch[0]
+    tree[key] = value if len(branch) == 1 else _legacy_add(tree[key] if key in tree else {}, branch[1:], value)
+    return tree
+
+
+def _legacy_set(tree: Dict[str, Any], data: Dict[str, Any], value: str) -> Dict[str, Any]:
+    branch = data["path"].split(".")
+    if "subchart" in data:
+        branch = [data["subchart"]] + branch
+    return _legacy_add(tree, branch, value)
+
+
+def versions(workloads: int, images: int) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Synthetic charts with deeply nested image values, and the `path` entries of their images"""
+    data = []
+    for w in range(workloads):
+        chart: Dict[str, Any] = {"values": {}, "subcharts": {"sub": {"values": {}}}}
+        entries = []
+        for i in range(images):
+            path = f"components.c{i}.containers.main.image"
+            for root, entry in (
+                (chart["values"], {"location": "values", "path": f"{path}.repository"}),
+                (chart["subcharts"]["sub"]["values"], {"subchart": "sub", "location": "values", "path": f"{path}.tag"}),
+            ):
+                parser._add_branch(root, entry["path"].split("."), f"workload{w}/image{i}")
+                entries.append(entry)
+        data.append((chart, entries))
+    return data
+
+
+def run(
+    data: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+    getter: Callable[[Dict[str, Any], Dict[str, Any]], str],
+    setter: Callable[[Dict[str, Any], Dict[str, Any], str], Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    trees = []
+    for chart, entries in data:
+        tree: Dict[str, Any] = {}
+        for entry in entries:
+            tree = setter(tree, entry, getter(chart, entry))
+        trees.append(tree)
+    return trees
+
+
+def main(workloads: int = 500, images: int = 8, repeat: int = 5) -> None:
+    data = versions(workloads, images)
+
+    def compiled_get(chart: Dict[str, Any], entry: Dict[str, Any]) -> str:
+        return parser.compile_path(entry).get(chart)
+
+    assert run(data, _legacy_get, _legacy_set) == run(data, compiled_get, parser.add_branch_to_dict)
+    legacy = min(timeit.repeat(lambda: run(data, _legacy_get, _legacy_set), number=1, repeat=repeat))
+    compiled = min(timeit.repeat(lambda: run(data, compiled_get, parser.add_branch_to_dict), number=1, repeat=repeat))
+    lookups = workloads * images * 2
+    print(f"{lookups} lookups and insertions")
+    print(f"    split per call: {legacy * 1000:8.1f} ms")
+    print(f"    compiled:       {compiled * 1000:8.1f} ms ({legacy / compiled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,41 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import tarfile
+
+import pytest
+import yaml
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limits(monkeypatch):
+    """Registry rate limits would slow down tests pulling many manifests"""
+    monkeypatch.setattr("replication.retry.rate_limits", {})
+    monkeypatch.setattr("replication.retry._buckets", {})
+
+
+def _add_file(tar, name, content):
+    info = tarfile.TarInfo(name)
+    info.size = len(content)
+    tar.addfile(info, io.BytesIO(content))
+
+
+def build_chart_archive(name, version, values=None, subcharts=None, packaged_subcharts=None):
+    """Builds a chart `.tgz` the way `helm package` lays it out"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        _add_file(tar, f"{name}/Chart.yaml", yaml.safe_dump({"name": name, "version": version}).encode())
+        _add_file(tar, f"{name}/values.yaml", yaml.safe_dump(values or {}).encode())
+        for subchart, subchart_values in (subcharts or {}).items():
+            _add_file(tar, f"{name}/charts/{subchart}/Chart.yaml", yaml.safe_dump({"name": subchart}).encode())
+            _add_file(tar, f"{name}/charts/{subchart}/values.yaml", yaml.safe_dump(subchart_values).encode())
+        for subchart, subchart_values in (packaged_subcharts or {}).items():
+            nested = build_chart_archive(subchart, "1.0.0", subchart_values)
+            _add_file(tar, f"{name}/charts/{subchart}-1.0.0.tgz", nested)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def chart_archive():
+    return build_chart_archive
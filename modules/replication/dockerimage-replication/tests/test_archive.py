@@ -0,0 +1,34 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+
+import pytest
+
+from replication.helm import archive
+
+
+def test_read_chart(chart_archive, tmp_path):
+    content = chart_archive("policy-reporter", "2.24.2", {"image": {"tag": "2.20.1"}})
+    path = tmp_path / "policy-reporter-2.24.2.tgz"
+    path.write_bytes(content)
+
+    expected = {"chart": {"name": "policy-reporter", "version": "2.24.2"}, "values": {"image": {"tag": "2.20.1"}}}
+    assert archive.read_chart(content) == expected
+    assert archive.read_chart(str(path)) == expected
+    assert archive.read_chart(io.BytesIO(content)) == expected
+
+
+def test_read_subchart(chart_archive):
+    content = chart_archive(
+        "policy-reporter",
+        "2.24.2",
+        subcharts={"ui": {"image": {"repository": "ui"}}},
+        packaged_subcharts={"kyvernoPlugin": {"image": {"repository": "plugin"}}, "kyverno": {"image": {}}},
+    )
+
+    assert archive.read_chart(content, "ui")["values"] == {"image": {"repository": "ui"}}
+    assert archive.read_chart(content, "kyvernoPlugin")["values"] == {"image": {"repository": "plugin"}}
+    assert archive.read_chart(content, "kyverno")["chart"]["name"] == "kyverno"
+    with pytest.raises(KeyError):
+        archive.read_chart(content, "missing")
@@ -13,6 +13,14 @@ class TestArguments(unittest.TestCase):
         self.assertEqual(parser.versions_dir, "tests_versions")
         self.assertEqual(parser.registry_prefix, "000000")
         self.assertFalse(parser.update_helm)
+        self.assertEqual(parser.concurrency, 8)
+
+        parser = parse_args(["-e", "1.30", "-d", "tests_versions", "-p", "000000", "--concurrency", "2"])
+        self.assertEqual(parser.concurrency, 2)
+        self.assertIsNone(parser.chart_info_cache)
+
+        parser = parse_args(["-e", "1.30", "-d", "tests_versions", "-p", "000000", "--chart-info-cache", "cache.json"])
+        self.assertEqual(parser.chart_info_cache, "cache.json")
 
     def test_help(self):
         with self.assertRaises(SystemExit) as cm:
@@ -0,0 +1,98 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from replication.helm.cache import ChartCache
+
+
+def _fetch(content):
+    def fetch(directory):
+        with open(os.path.join(directory, "chart-1.0.0.tgz"), "wb") as f:
+            f.write(content)
+
+    return MagicMock(side_effect=fetch)
+
+
+def test_archive_is_fetched_once(tmp_path):
+    cache = ChartCache(str(tmp_path))
+    fetch = _fetch(b"archive")
+
+    path = cache.archive("https://charts.example.com/", "chart", "1.0.0", fetch)
+    assert cache.archive("https://charts.example.com", "chart", "1.0.0", fetch) == path
+    assert open(path, "rb").read() == b"archive"
+    fetch.assert_called_once()
+
+    # a new cache on the same directory reuses the archive
+    ChartCache(str(tmp_path)).archive("https://charts.example.com", "chart", "1.0.0", fetch)
+    fetch.assert_called_once()
+
+
+def test_archive_fetch_failure(tmp_path):
+    cache = ChartCache(str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        cache.archive("https://charts.example.com", "chart", "1.0.0", lambda directory: None)
+    assert os.listdir(tmp_path) == []
+
+
+def test_memoize(tmp_path):
+    cache = ChartCache(str(tmp_path))
+    cache.archive("https://charts.example.com", "chart", "1.0.0", _fetch(b"archive"))
+    compute = MagicMock(return_value={"image": {"tag": "1.0.0"}})
+
+    assert cache.memoize("https://charts.example.com", "chart", "1.0.0", "values", compute) == {
+        "image": {"tag": "1.0.0"}
+    }
+    assert ChartCache(str(tmp_path)).memoize("https://charts.example.com", "chart", "1.0.0", "values", compute) == {
+        "image": {"tag": "1.0.0"}
+    }
+    compute.assert_called_once()
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = ChartCache(str(tmp_path), max_bytes=250)
+    paths = [cache.archive("https://charts.example.com", f"chart-{i}", "1.0.0", _fetch(b"x" * 100)) for i in range(2)]
+    os.utime(os.path.dirname(paths[0]), (time.time() - 60, time.time() - 60))
+
+    third = cache.archive("https://charts.example.com", "chart-2", "1.0.0", _fetch(b"x" * 100))
+    assert not os.path.exists(paths[0])
+    assert os.path.exists(paths[1])
+    assert os.path.exists(third)
+
+
+def test_evict_expired(tmp_path):
+    cache = ChartCache(str(tmp_path), max_age_days=1)
+    path = cache.archive("https://charts.example.com", "chart", "1.0.0", _fetch(b"x"))
+    os.utime(os.path.dirname(path), (time.time() - 2 * 86400, time.time() - 2 * 86400))
+
+    cache.evict()
+    assert not os.path.exists(path)
+
+
+def test_pinned_archive_is_not_evicted(tmp_path):
+    cache = ChartCache(str(tmp_path), max_bytes=150)
+    with cache.pinned_archive("https://charts.example.com", "chart-0", "1.0.0", _fetch(b"x" * 100)) as path:
+        os.utime(os.path.dirname(path), (time.time() - 60, time.time() - 60))
+        # another worker caching a chart while the first archive is being read
+        other = cache.archive("https://charts.example.com", "chart-1", "1.0.0", _fetch(b"x" * 100))
+        assert os.path.exists(path)
+        assert os.path.exists(other)
+
+    cache.evict(keep=cache.key("https://charts.example.com", "chart-1", "1.0.0"))
+    assert not os.path.exists(path)
+
+
+def test_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("HELM_CHART_CACHE_MAX_MB", "0")
+    assert ChartCache.from_env(str(tmp_path)) is None
+
+    monkeypatch.setenv("HELM_CHART_CACHE_MAX_MB", "2")
+    monkeypatch.setenv("HELM_CHART_CACHE_MAX_AGE_DAYS", "7")
+    cache = ChartCache.from_env(str(tmp_path))
+    assert cache.max_bytes == 2 * 1024 * 1024
+    assert cache.max_age_days == 7
+    assert cache.cache_dir == str(tmp_path)
@@ -0,0 +1,70 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+
+from replication.checkpoint import Checkpoint
+
+
+def test_checkpoint_local_journal(tmp_path):
+    uri = str(tmp_path / "checkpoint-images.jsonl")
+    checkpoint = Checkpoint(uri).load()
+    assert checkpoint.get("image", "target:v1") is None
+
+    checkpoint.record("image", "target:v1", source="source:v1", sourceDigest="sha256:a")
+    checkpoint.record("upload", "repo@sha256:b", location="https://registry/upload/1", offset=10)
+    checkpoint.record("upload", "repo@sha256:b", location="https://registry/upload/2", offset=20)
+    # a line cut short when the run was interrupted
+    with open(uri, "a") as f:
+        f.write('{"kind": "image", "key": "tar')
+
+    resumed = Checkpoint(uri).load()
+    assert resumed.get("image", "target:v1") == {
+        "kind": "image",
+        "key": "target:v1",
+        "source": "source:v1",
+        "sourceDigest": "sha256:a",
+    }
+    assert resumed.get("upload", "repo@sha256:b")["offset"] == 20
+
+    resumed.clear()
+    assert Checkpoint(uri).load().entries == {}
+
+
+@patch("replication.checkpoint.boto3.client")
+def test_checkpoint_s3(mock_client):
+    s3_client = mock_client.return_value
+    s3_client.exceptions.NoSuchKey = KeyError
+    s3_client.get_object.side_effect = KeyError
+
+    checkpoint = Checkpoint("s3://bucket/checkpoint-charts.jsonl", flush_interval=60).load()
+    checkpoint.record("chart", "project-helm/chart:1.0.0")
+    # uploads are batched
+    s3_client.put_object.assert_not_called()
+
+    checkpoint.record("chart", "project-helm/other:2.0.0")
+    checkpoint.flush()
+    body = s3_client.put_object.call_args.kwargs["Body"].decode()
+    assert [json.loads(line)["key"] for line in body.splitlines()] == [
+        "project-helm/chart:1.0.0",
+        "project-helm/other:2.0.0",
+    ]
+
+    checkpoint.clear()
+    s3_client.delete_object.assert_called_once_with(Bucket="bucket", Key="checkpoint-charts.jsonl")
+
+
+@patch("replication.checkpoint.boto3.client")
+def test_checkpoint_s3_clear_failure(mock_client):
+    mock_client.return_value.delete_object.side_effect = ClientError(
+        {"Error": {"Code": "AccessDenied"}}, "DeleteObject"
+    )
+    checkpoint = Checkpoint("s3://bucket/checkpoint-images.jsonl")
+    checkpoint.record("image", "target:v1")
+
+    # the run completed, a journal that cannot be removed does not fail it
+    checkpoint.clear()
+    assert checkpoint.entries == {}
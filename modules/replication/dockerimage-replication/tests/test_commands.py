@@ -1,11 +1,15 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import os
+import tempfile
 import unittest
 from unittest import mock
 from unittest.mock import mock_open
 
 from replication.helm import commands
+from replication.helm.cache import ChartCache
+from replication.helm.repository import RepositoryError
 
 
 class TestCommands(unittest.TestCase):
@@ -74,6 +78,78 @@ class TestCommands(unittest.TestCase):
         commands.show_subchart("project_path", "repo", "subcommand", "chart", "version")
         self.assertTrue(mock_subproc_popen.called)
 
+    @mock.patch("replication.helm.commands._execute_command")
+    def test_show_with_cache(self, mock_execute_command):
+        from tests.conftest import build_chart_archive
+
+        def pull(command):
+            destination = command.split("--destination ")[1]
+            with open(os.path.join(destination, "policy-reporter-2.24.2.tgz"), "wb") as f:
+                f.write(
+                    build_chart_archive(
+                        "policy-reporter", "2.24.2", {"image": {"tag": "2.20.1"}}, {"ui": {"image": {"tag": "1"}}}
+                    )
+                )
+            return ""
+
+        mock_execute_command.side_effect = pull
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ChartCache(cache_dir)
+            repo_url = "https://kyverno.github.io/policy-reporter/"
+
+            chart = commands.show("chart", "reporter/policy-reporter", "2.24.2", repo_url, cache)
+            values = commands.show("values", "reporter/policy-reporter", "2.24.2", repo_url, cache)
+            subchart = commands.show_subchart(
+                "project_path", "reporter", "policy-reporter", "ui", "2.24.2", repo_url, cache
+            )
+
+        self.assertEqual(chart, {"name": "policy-reporter", "version": "2.24.2"})
+        self.assertEqual(values, {"image": {"tag": "2.20.1"}})
+        self.assertEqual(subchart, {"chart": {"name": "ui"}, "values": {"image": {"tag": "1"}}})
+        mock_execute_command.assert_called_once()
+
+    @mock.patch("replication.helm.commands._execute_command")
+    def test_show_in_process(self, mock_execute_command):
+        from tests.conftest import build_chart_archive
+
+        def download(repo_url, chart, version, destination):
+            with open(os.path.join(destination, f"{chart}-{version}.tgz"), "wb") as f:
+                f.write(build_chart_archive(chart, version, {"image": {"tag": "2.20.1"}}, {"ui": {"image": {}}}))
+
+        repositories = mock.Mock()
+        repositories.download.side_effect = download
+        repo_url = "https://kyverno.github.io/policy-reporter/"
+
+        values = commands.show("values", "reporter/policy-reporter", "2.24.2", repo_url, repositories=repositories)
+        subchart = commands.show_subchart(
+            "project_path", "reporter", "policy-reporter", "ui", "2.24.2", repo_url, repositories=repositories
+        )
+
+        self.assertEqual(values, {"image": {"tag": "2.20.1"}})
+        self.assertEqual(subchart["values"], {"image": {}})
+        mock_execute_command.assert_not_called()
+
+    @mock.patch("replication.helm.commands._execute_command")
+    def test_show_falls_back_to_helm_pull(self, mock_execute_command):
+        from tests.conftest import build_chart_archive
+
+        def pull(command):
+            destination = command.split("--destination ")[1]
+            with open(os.path.join(destination, "karpenter-1.0.0.tgz"), "wb") as f:
+                f.write(build_chart_archive("karpenter", "1.0.0"))
+            return ""
+
+        mock_execute_command.side_effect = pull
+        repositories = mock.Mock()
+        repositories.download.side_effect = RepositoryError("Unsupported repository URL")
+
+        chart = commands.show(
+            "chart", "karpenter/karpenter", "1.0.0", "oci://public.ecr.aws/karpenter", repositories=repositories
+        )
+
+        self.assertEqual(chart, {"name": "karpenter", "version": "1.0.0"})
+        mock_execute_command.assert_called_once()
+
     @mock.patch("subprocess.Popen")
     def test_update_repos(self, mock_subproc_popen):
         process_mock = mock.Mock()
@@ -86,6 +162,11 @@ class TestCommands(unittest.TestCase):
         commands.update_repos()
         self.assertTrue(mock_subproc_popen.called)
 
+    @mock.patch("replication.helm.commands._execute_command")
+    def test_update_named_repos(self, mock_execute_command):
+        commands.update_repos(["eks", "kyverno"])
+        mock_execute_command.assert_called_once_with("helm repo update eks kyverno")
+
 
 if __name__ == "__main__":
     unittest.main()
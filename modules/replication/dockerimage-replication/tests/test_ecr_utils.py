@@ -1,6 +1,7 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import base64
 import subprocess
 from unittest.mock import MagicMock, patch
 
@@ -132,12 +133,21 @@ def test_create_repository(mock_boto_client, ecr_utils):
         pass
 
     mock_boto_client.exceptions.RepositoryNotFoundException = RepositoryNotFoundException
-    mock_boto_client.describe_repositories.side_effect = RepositoryNotFoundException
-    ecr_utils.create_repository("new-repo-new")
+    # missing, then missing right after creation, then visible
+    mock_boto_client.describe_repositories.side_effect = [
+        RepositoryNotFoundException,
+        RepositoryNotFoundException,
+        {},
+    ]
+    with patch("replication.utils.time.sleep") as mock_sleep:
+        ecr_utils.create_repository("new-repo-new")
     # Assert create_repository was called
     mock_boto_client.create_repository.assert_called_once_with(
         repositoryName="new-repo-new", imageScanningConfiguration={"scanOnPush": True}
     )
+    # readiness was polled instead of sleeping a fixed time
+    assert mock_boto_client.describe_repositories.call_count == 3
+    mock_sleep.assert_called_once()
 
     # Simulate repository exists
     mock_boto_client.describe_repositories.side_effect = None
@@ -173,3 +183,93 @@ def test_cleanup_ecr_repos(mock_boto_client, ecr_utils):
     mock_boto_client.delete_repository.assert_any_call(repositoryName="test-prefix-repo1", force=True)
     mock_boto_client.delete_repository.assert_any_call(repositoryName="test-prefix-repo2", force=True)
     assert mock_boto_client.delete_repository.call_count == 2
+
+
+def test_get_registry_credentials(mock_boto_client, ecr_utils):
+    mock_boto_client.get_authorization_token.return_value = {
+        "authorizationData": [{"authorizationToken": base64.b64encode(b"AWS:token:with:colons").decode()}]
+    }
+    assert ecr_utils.get_registry_credentials() == ("AWS", "token:with:colons")
+    assert ecr_utils.registry == "123456789012.dkr.ecr.us-west-2.amazonaws.com"
+
+
+def test_load_index(mock_boto_client, ecr_utils):
+    def paginator(name):
+        pages = {
+            "describe_repositories": [
+                {"repositories": [{"repositoryName": "repo-a"}]},
+                {"repositories": [{"repositoryName": "repo-b"}]},
+            ],
+            "list_images": [{"imageIds": [{"imageTag": "v1", "imageDigest": "sha256:1"}]}],
+        }
+        mock_paginator = MagicMock()
+        mock_paginator.paginate.return_value = pages[name]
+        return mock_paginator
+
+    mock_boto_client.get_paginator.side_effect = paginator
+    ecr_utils.load_index(["repo-a", "repo-new"])
+
+    # answered from the index
+    assert ecr_utils.repository_exists("repo-b") is True
+    assert ecr_utils.repository_exists("repo-new") is False
+    assert ecr_utils.image_exists("repo-a", "v1") is True
+    assert ecr_utils.image_exists("repo-a", "v2") is False
+    assert ecr_utils.image_exists("repo-new", "v1") is False
+    mock_boto_client.describe_repositories.assert_not_called()
+    mock_boto_client.batch_get_image.assert_not_called()
+
+    # repo-b tags were not indexed, fall back to the API
+    mock_boto_client.batch_get_image.return_value = {"images": [{"imageId": {"imageTag": "v1"}}]}
+    assert ecr_utils.image_exists("repo-b", "v1") is True
+
+    # repositories created and images pushed during the run update the index
+    ecr_utils.create_repository("repo-new")
+    mock_boto_client.create_repository.assert_called_once()
+    ecr_utils.create_repository("repo-new")
+    mock_boto_client.create_repository.assert_called_once()
+    ecr_utils.record_image("repo-new", "v1", "sha256:2")
+    assert ecr_utils.image_exists("repo-new", "v1") is True
+
+
+def test_create_repositories(mock_boto_client, ecr_utils):
+    class RepositoryNotFoundException(Exception):
+        pass
+
+    mock_boto_client.exceptions.RepositoryNotFoundException = RepositoryNotFoundException
+    mock_boto_client.get_paginator.return_value.paginate.return_value = [
+        {"repositories": [{"repositoryName": "repo-a"}]}
+    ]
+    ecr_utils.load_index([])
+
+    ecr_utils.create_repositories(["repo-a", "repo-b", "repo-c", "repo-b"])
+    ecr_utils.create_repository("repo-b")
+    ecr_utils.create_repository("repo-c")
+    ecr_utils.create_repository("repo-a")
+
+    created = sorted(call.kwargs["repositoryName"] for call in mock_boto_client.create_repository.call_args_list)
+    assert created == ["repo-b", "repo-c"]
+    assert ecr_utils.repository_exists("repo-c") is True
+
+    # closing waits for the creations and shuts the workers down
+    executor = ecr_utils._creation_executor
+    ecr_utils.close()
+    assert executor._shutdown
+    assert ecr_utils._creation_executor is None
+    ecr_utils.close()
+
+
+def test_image_digest(mock_boto_client, ecr_utils):
+    class ImageNotFoundException(Exception):
+        pass
+
+    class RepositoryNotFoundException(Exception):
+        pass
+
+    mock_boto_client.exceptions.ImageNotFoundException = ImageNotFoundException
+    mock_boto_client.exceptions.RepositoryNotFoundException = RepositoryNotFoundException
+    mock_boto_client.describe_images.return_value = {"imageDetails": [{"imageDigest": "sha256:1"}]}
+    assert ecr_utils.image_digest("repo", "v1") == "sha256:1"
+    mock_boto_client.describe_images.assert_called_once_with(repositoryName="repo", imageIds=[{"imageTag": "v1"}])
+
+    mock_boto_client.describe_images.side_effect = ImageNotFoundException
+    assert ecr_utils.image_digest("repo", "v2") is None
@@ -0,0 +1,69 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import json
+from unittest.mock import patch
+
+from replication.fingerprint import ChartInfoCache, fingerprint
+
+WORKLOAD = {
+    "name": "aws-load-balancer-controller",
+    "repository": "https://aws.github.io/eks-charts",
+    "version": "1.4.8",
+    "images": {"image": {"repository": {"location": "values", "path": "image.repository"}}},
+}
+
+
+def test_fingerprint():
+    digest = fingerprint(WORKLOAD, "prefix-")
+    # key order of the versions files does not matter
+    assert fingerprint(dict(reversed(list(WORKLOAD.items()))), "prefix-") == digest
+    assert fingerprint({**WORKLOAD, "version": "1.4.9"}, "prefix-") != digest
+    assert fingerprint({**WORKLOAD, "images": {}}, "prefix-") != digest
+    assert fingerprint(WORKLOAD, "other-") != digest
+
+
+def test_chart_info_cache_local_roundtrip(tmp_path):
+    uri = str(tmp_path / "chart-info.json")
+    cache = ChartInfoCache(uri).load()
+    assert cache.get("alb", "abc") is None
+
+    values = {"helm": {"version": "1.4.8"}, "values": {"image": {"repository": "prefix-alb"}}}
+    cache.record("alb", "abc", values, ["alb:v1"])
+    cache.save()
+    # recorded values are copied, later changes do not leak into the cache
+    values["values"] = {}
+
+    loaded = ChartInfoCache(uri).load()
+    assert loaded.get("alb", "abc") == {
+        "fingerprint": "abc",
+        "values": {"helm": {"version": "1.4.8"}, "values": {"image": {"repository": "prefix-alb"}}},
+        "images": ["alb:v1"],
+    }
+    assert loaded.get("alb", "def") is None
+
+    # workloads not recorded again are dropped
+    loaded.record("csi", "def", {}, [])
+    loaded.save()
+    assert ChartInfoCache(uri).load().workloads.keys() == {"csi"}
+
+
+@patch("replication.fingerprint.boto3.client")
+def test_chart_info_cache_s3(mock_client):
+    s3_client = mock_client.return_value
+    s3_client.exceptions.NoSuchKey = KeyError
+    entry = {"fingerprint": "abc", "values": {}, "images": ["alb:v1"]}
+    s3_client.get_object.return_value = {"Body": io.BytesIO(json.dumps({"workloads": {"alb": entry}}).encode())}
+
+    cache = ChartInfoCache("s3://bucket/path/chart-info.json").load()
+    s3_client.get_object.assert_called_once_with(Bucket="bucket", Key="path/chart-info.json")
+    assert cache.get("alb", "abc") == entry
+
+    cache.record("alb", "abc", {}, ["alb:v1"])
+    cache.save()
+    assert s3_client.put_object.call_args.kwargs["Key"] == "path/chart-info.json"
+    assert json.loads(s3_client.put_object.call_args.kwargs["Body"]) == {"workloads": {"alb": entry}}
+
+    s3_client.get_object.side_effect = KeyError
+    assert ChartInfoCache("s3://bucket/missing.json").load().workloads == {}
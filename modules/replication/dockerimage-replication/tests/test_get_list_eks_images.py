@@ -21,7 +21,7 @@ def mock_workloads_data():
         return json.load(workload_file)
 
 
-def mock_helm_show(command, chart_name, version):
+def mock_helm_show(command, chart_name, version, **kwargs):
     data = {}
     show_subchart_path = "tests/test_payloads/parsed_charts_data.json"
     with open(show_subchart_path, encoding="utf-8") as subchart_file:
@@ -33,7 +33,7 @@ def mock_helm_show(command, chart_name, version):
     return {}
 
 
-def mock_show_subchart(project_path, workload, name, subchart, version):
+def mock_show_subchart(project_path, workload, name, subchart, version, **kwargs):
     data = {}
     show_subchart_path = "tests/test_payloads/parsed_charts_data.json"
     with open(show_subchart_path, encoding="utf-8") as subchart_file:
@@ -54,6 +54,23 @@ def test_fetch_chart_info(mock_show_subchart, mock_helm_show, mock_workloads_dat
     assert result == test_case_result
 
 
+@patch("get_list_eks_images.helm.show", side_effect=mock_helm_show)
+@patch("get_list_eks_images.helm.show_subchart", side_effect=mock_show_subchart)
+def test_fetch_chart_info_dedupes_identical_charts(mock_show_subchart, mock_helm_show, mock_workloads_data):
+    workloads_data = {
+        "first": mock_workloads_data["kyverno_policy_reporter"],
+        "second": mock_workloads_data["kyverno_policy_reporter"],
+        "no_images": {"name": "aws-vpc-cni", "repository": "https://aws.github.io/eks-charts", "version": "1.0.0"},
+    }
+
+    result = fetch_chart_info(workloads_data, max_workers=4)
+
+    assert result["first"] == result["second"]
+    assert result["no_images"] == {}
+    assert mock_helm_show.call_count == 2
+    assert mock_show_subchart.call_count == len(workloads_data["first"]["subcharts"])
+
+
 @patch("get_list_eks_images.helm.add_repo")
 @patch("get_list_eks_images.helm.update_repos")
 @patch("get_list_eks_images.get_credentials")
@@ -73,7 +90,24 @@ def test_update_helm(mock_get_credentials, mock_update_repos, mock_add_repo, moc
     assert mock_add_repo.call_count == len(mock_workloads_data)
 
     # Assert that helm.update_repos was called once
-    mock_update_repos.assert_called_once()
+    mock_update_repos.assert_called_once_with(["kyverno_policy_reporter"])
+
+
+@patch("get_list_eks_images.helm.add_repo")
+@patch("get_list_eks_images.helm.update_repos")
+@patch("get_list_eks_images.get_credentials", return_value=(None, None))
+def test_update_helm_dedupes_repositories(mock_get_credentials, mock_update_repos, mock_add_repo):
+    workloads_data = {
+        "alb_controller": {"repository": "https://aws.github.io/eks-charts"},
+        "fluentbit": {"repository": "https://aws.github.io/eks-charts/"},
+        "cert_manager": {"repository": "https://charts.jetstack.io"},
+    }
+
+    update_helm(True, workloads_data)
+
+    assert mock_add_repo.call_count == 2
+    mock_add_repo.assert_any_call("alb_controller", "https://aws.github.io/eks-charts", None, None)
+    mock_update_repos.assert_called_once_with(["alb_controller", "cert_manager"])
 
 
 def test_update_helm_no_update(mock_workloads_data):
@@ -114,3 +148,71 @@ def test_apply_image_mapping():
         apply_image_mapping("docker.io/grafana/grafana:latest", mappings)
         == "somedns/docker-remote-hub-docker-com/grafana/grafana:latest"
     )
+
+
+@patch("get_list_eks_images.metrics.report")
+@patch("get_list_eks_images.ChartRepositories")
+@patch("get_list_eks_images.ChartCache.from_env", return_value=None)
+@patch("get_list_eks_images.get_credentials", return_value=(None, None))
+@patch("get_list_eks_images.update_helm")
+@patch("get_list_eks_images.fetch_chart_info")
+@patch("get_list_eks_images.parser.get_ami_version", return_value="1.30.0")
+@patch("get_list_eks_images.parser.get_docker_mappings", return_value={})
+@patch("get_list_eks_images.parser.get_additional_images", return_value={})
+@patch("get_list_eks_images.parser.get_workloads")
+def test_main_reuses_chart_info_of_unchanged_workloads(
+    mock_get_workloads,
+    mock_get_additional_images,
+    mock_get_docker_mappings,
+    mock_get_ami_version,
+    mock_fetch_chart_info,
+    mock_update_helm,
+    mock_get_credentials,
+    mock_from_env,
+    mock_repositories,
+    mock_report,
+    mock_workloads_data,
+    tmp_path,
+    monkeypatch,
+):
+    import get_list_eks_images
+
+    with open("tests/test_payloads/parsed_charts_data.json", encoding="utf-8") as parsed_charts_file:
+        parsed_charts_data = json.load(parsed_charts_file)
+    workloads_data = {
+        **mock_workloads_data,
+        "other_reporter": {**mock_workloads_data["kyverno_policy_reporter"], "version": "2.24.3"},
+    }
+    mock_get_workloads.side_effect = lambda *args: json.loads(json.dumps(workloads_data))
+    mock_fetch_chart_info.side_effect = lambda workloads, *args: {
+        workload: parsed_charts_data["kyverno_policy_reporter"] for workload in workloads
+    }
+    monkeypatch.setattr(get_list_eks_images, "project_path", str(tmp_path))
+    cache_uri = str(tmp_path / "chart-info.json")
+    argv = ["get_list_eks_images.py", "-e", "1.30", "-d", "versions", "-p", "prefix-", "--chart-info-cache", cache_uri]
+    monkeypatch.setattr("sys.argv", argv)
+
+    def outputs():
+        with open(tmp_path / "replication-result.json", encoding="utf-8") as f:
+            result = json.load(f)
+        with open(tmp_path / "updated_images.json", encoding="utf-8") as f:
+            return result, json.load(f)
+
+    get_list_eks_images.main()
+    assert list(mock_fetch_chart_info.call_args.args[0]) == ["kyverno_policy_reporter", "other_reporter"]
+    first = outputs()
+
+    # nothing changed, no chart is fetched and the outputs are identical
+    mock_fetch_chart_info.reset_mock()
+    get_list_eks_images.main()
+    mock_fetch_chart_info.assert_not_called()
+    assert outputs() == first
+
+    # only the workload whose version changed is fetched again
+    workloads_data["other_reporter"]["version"] = "2.24.4"
+    get_list_eks_images.main()
+    assert list(mock_fetch_chart_info.call_args.args[0]) == ["other_reporter"]
+    result, images = outputs()
+    assert result["charts"]["kyverno_policy_reporter"] == first[0]["charts"]["kyverno_policy_reporter"]
+    assert result["charts"]["other_reporter"]["helm"]["version"] == "2.24.4"
+    assert images == first[1]
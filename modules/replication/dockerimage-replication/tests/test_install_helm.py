@@ -1,109 +1,139 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import hashlib
+import io
+import os
+import tarfile
 from unittest.mock import MagicMock, patch
 
 import pytest
+import urllib3
 
+import install_helm as installer
 
-@pytest.fixture(scope="function")
-def mock_env_vars(request):
-    env_vars = {
-        "SEEDFARMER_PARAMETER_HELM_DISTRO_URL": "https://test.com/helm.tar.gz",
-        "SEEDFARMER_PARAMETER_HELM_DISTRO_SECRET_NAME": "test_secret",
-        "SEEDFARMER_PARAMETER_HELM_DISTRO_SECRET_KEY": "test_key",
-    }
-    if request.node.get_closest_marker("null_url"):
-        del env_vars["SEEDFARMER_PARAMETER_HELM_DISTRO_SECRET_NAME"]
-    with patch.dict("os.environ", env_vars, clear=True):
-        yield
+HELM_BINARY = b"#!/bin/sh\necho helm\n" * 1000
 
 
-@pytest.fixture(scope="function")
-def mock_credentials(request):
-    with patch("replication.utils.get_credentials") as mock_get_credentials:
-        if request.param == "no_creds":
-            mock_get_credentials.return_value = (None, None)
-        else:
-            mock_get_credentials.return_value = ("user", "pwd")
-        yield mock_get_credentials
+def _tarball():
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name, content in (("linux-amd64/LICENSE", b"license"), ("linux-amd64/helm", HELM_BINARY)):
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
 
 
-@pytest.fixture(scope="function", autouse=False)
-def mock_requests_get():
-    with patch("requests.get") as mock_get:
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.iter_content.return_value = [b"test_content"]
-        mock_get.return_value = mock_response
-        yield mock_get
+TARBALL = _tarball()
 
 
-@pytest.fixture(scope="function", autouse=False)
-def mock_tarfile():
-    with patch("tarfile.open") as mock_tar:
-        mock_tar_instance = MagicMock()
-        mock_tar.return_value.__enter__.return_value = mock_tar_instance
-        yield mock_tar_instance
+class FlakyRaw(io.BytesIO):
+    """Response body failing once after `fail_at` bytes"""
 
+    def __init__(self, content, fail_at=None):
+        super().__init__(content)
+        self.fail_at = fail_at
 
-@pytest.fixture(scope="function", autouse=False)
-def mock_shutil():
-    with patch("shutil.move") as mock_move, patch("shutil.rmtree") as mock_rmtree:
-        yield mock_move, mock_rmtree
+    def read(self, size=-1):
+        if self.fail_at is not None and self.tell() >= self.fail_at:
+            self.fail_at = None
+            raise urllib3.exceptions.ProtocolError("Connection broken")
+        return super().read(size)
 
 
-@pytest.fixture(scope="function", autouse=False)
-def mock_os():
-    with patch("os.remove") as mock_remove:
-        yield mock_remove
+def _response(status_code, content=b"", fail_at=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.text = content.decode("utf-8", errors="ignore")
+    response.raw = FlakyRaw(content, fail_at)
+    return response
 
 
-@pytest.fixture(scope="function", autouse=False)
-def mock_logger():
-    with patch("replication.logging.logger") as mock_logger:
-        yield mock_logger
+@pytest.fixture
+def distro(monkeypatch, tmp_path):
+    monkeypatch.setattr(installer, "distro_url", "https://test.com/helm.tar.gz")
+    monkeypatch.setattr(installer, "distro_secret", None)
+    monkeypatch.setattr(installer, "distro_sha256", None)
+    monkeypatch.setattr(installer, "cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(installer, "dest_path", str(tmp_path / "helm"))
+    monkeypatch.setattr(installer, "chunk_size", 1024)
+    checksum = f"{hashlib.sha256(TARBALL).hexdigest()}  helm.tar.gz\n".encode()
 
+    def get(url, stream=True, auth=None, headers=None):
+        if url.endswith(".sha256sum"):
+            return _response(200, checksum)
+        if headers and "Range" in headers:
+            return _response(206, TARBALL[int(headers["Range"][len("bytes=") : -1]) :])
+        return _response(200, TARBALL)
 
-@pytest.mark.parametrize("mock_credentials", ["no_creds", "creds"], indirect=True)
-def test_install_helm_success(
-    mock_env_vars, mock_credentials, mock_requests_get, mock_tarfile, mock_shutil, mock_os, mock_logger
-):
-    from install_helm import install_helm
+    with patch("install_helm.requests.get", side_effect=get) as mock_get:
+        yield mock_get, tmp_path
 
-    # Call the function under test
-    install_helm()
 
-    # Validate HTTP request
-    if mock_credentials == "no_creds":
-        mock_requests_get.assert_called_once_with("https://test.com/helm.tar.gz", stream=True, auth=(("user", "pwd")))
-    else:
-        mock_requests_get.assert_called_once_with("https://test.com/helm.tar.gz", stream=True)
+def test_install_helm(distro):
+    mock_get, tmp_path = distro
 
-    # Validate tar extraction
-    mock_tarfile.extractall.assert_called_once()
+    installer.install_helm()
 
-    # Validate file move
-    mock_shutil[0].assert_called_once_with("linux-amd64/helm", "/usr/local/bin/helm")
+    assert (tmp_path / "helm").read_bytes() == HELM_BINARY
+    assert os.access(tmp_path / "helm", os.X_OK)
+    mock_get.assert_any_call("https://test.com/helm.tar.gz", stream=True)
+    # only the binary is kept, no tarball nor extracted directory is left behind
+    entries = list((tmp_path / "cache").iterdir())
+    assert len(entries) == 1
+    assert sorted(os.listdir(entries[0])) == ["helm", "metadata.json"]
 
-    # Validate cleanup
-    mock_shutil[1].assert_called_once_with("linux-amd64")  # shutil.rmtree
-    mock_os.assert_called_once_with("helm.tar.gz")  # os.remove
 
+def test_install_helm_uses_cache(distro):
+    mock_get, tmp_path = distro
 
-@pytest.mark.parametrize("mock_credentials", ["no_creds", "creds"], indirect=True)
-@pytest.mark.null_url
-def test_install_helm_no_url(
-    mock_env_vars, mock_credentials, mock_requests_get, mock_tarfile, mock_shutil, mock_os, mock_logger
-):
-    from install_helm import install_helm
+    installer.install_helm()
+    calls = mock_get.call_count
+    os.remove(tmp_path / "helm")
+    installer.install_helm()
 
-    # Call the function under test
-    install_helm()
+    assert mock_get.call_count == calls
+    assert (tmp_path / "helm").read_bytes() == HELM_BINARY
 
-    # Validate HTTP request and other mocks
-    mock_requests_get.assert_called_once_with("https://test.com/helm.tar.gz", stream=True)
-    mock_tarfile.extractall.assert_called_once()
-    mock_shutil[0].assert_called_once_with("linux-amd64/helm", "/usr/local/bin/helm")
-    mock_shutil[1].assert_called_once_with("linux-amd64")
-    mock_os.assert_called_once_with("helm.tar.gz")
+
+def test_install_helm_with_credentials(distro, monkeypatch):
+    mock_get, _ = distro
+    monkeypatch.setattr(installer, "distro_secret", "test_secret")
+
+    with patch("install_helm.get_credentials", return_value=("user", "pwd")):
+        installer.install_helm()
+
+    mock_get.assert_any_call("https://test.com/helm.tar.gz", stream=True, auth=("user", "pwd"))
+
+
+def test_install_helm_resumes(distro):
+    mock_get, tmp_path = distro
+    flaky = _response(200, TARBALL, fail_at=len(TARBALL) // 2)
+    get = mock_get.side_effect
+    mock_get.side_effect = lambda url, **kwargs: (
+        flaky if url == "https://test.com/helm.tar.gz" and not kwargs.get("headers") else get(url, **kwargs)
+    )
+
+    installer.install_helm()
+
+    assert (tmp_path / "helm").read_bytes() == HELM_BINARY
+    assert any("Range" in (call.kwargs.get("headers") or {}) for call in mock_get.call_args_list)
+
+
+def test_install_helm_checksum_mismatch(distro, monkeypatch):
+    _, tmp_path = distro
+    monkeypatch.setattr(installer, "distro_sha256", "0" * 64)
+
+    with pytest.raises(Exception, match="Checksum mismatch"):
+        installer.install_helm()
+    assert not (tmp_path / "helm").exists()
+    assert os.listdir(tmp_path / "cache") == []
+
+
+def test_install_helm_download_failure(distro):
+    mock_get, _ = distro
+    mock_get.side_effect = lambda url, **kwargs: _response(404)
+
+    with pytest.raises(Exception, match="Failed to download file: 404"):
+        installer.install_helm()
@@ -0,0 +1,80 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import csv
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from replication.metrics import FIELDS, Metrics, bind, current_item, item
+
+
+def test_operation_records():
+    metrics = Metrics()
+    with metrics.operation("docker pull", "image:v1") as record:
+        record["bytes"] = 100
+    with pytest.raises(ValueError):
+        with metrics.operation("docker push", "image:v1"):
+            raise ValueError("boom")
+
+    assert [(r["operation"], r["item"], r["bytes"], r["outcome"]) for r in metrics.records] == [
+        ("docker pull", "image:v1", 100, "ok"),
+        ("docker push", "image:v1", 0, "error"),
+    ]
+    assert all(r["end"] >= r["start"] and r["duration"] >= 0 for r in metrics.records)
+
+
+def test_items_are_attributed_across_threads():
+    metrics = Metrics()
+
+    def upload():
+        with metrics.operation("blob upload") as record:
+            record["bytes"] = 10
+
+    def replicate():
+        thread = threading.Thread(target=bind(upload))
+        thread.start()
+        thread.join()
+        return False
+
+    assert metrics.track("image", "target:v1", replicate) is False
+    assert current_item() is None
+    assert [(r["operation"], r["item"], r["outcome"]) for r in metrics.records] == [
+        ("blob upload", "target:v1", "ok"),
+        ("image", "target:v1", "failed"),
+    ]
+
+
+def test_summary_and_reports(tmp_path, monkeypatch):
+    metrics = Metrics()
+    for name, duration, size in (("fast:v1", 1, 1024 * 1024), ("slow:v1", 5, 3 * 1024 * 1024)):
+        with item(name):
+            with metrics.operation("blob upload") as record:
+                record["bytes"] = size
+            with metrics.operation("image"):
+                pass
+        metrics.records[-1]["duration"] = duration
+    metrics.records[0]["start"] -= 2
+
+    summary = metrics.summary(top=1)
+    assert summary["slowest"] == [
+        {"item": "slow:v1", "operation": "image", "duration": 5, "bytes": 3 * 1024 * 1024, "outcome": "ok"}
+    ]
+    assert summary["bytes"] == 4 * 1024 * 1024
+    assert summary["mbps"] == pytest.approx(2, rel=0.05)
+
+    jsonl = str(tmp_path / "metrics.jsonl")
+    metrics.write(jsonl)
+    with open(jsonl) as f:
+        assert [json.loads(line)["item"] for line in f] == ["fast:v1", "fast:v1", "slow:v1", "slow:v1"]
+
+    with patch("replication.metrics.metrics_format", "csv"), patch("replication.metrics.metrics_summary", 1):
+        monkeypatch.chdir(tmp_path)
+        path = metrics.report("images")
+    assert path == "replication-metrics-images.csv"
+    with open(tmp_path / path) as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == FIELDS
+    assert len(rows) == 4
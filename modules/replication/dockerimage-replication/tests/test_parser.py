@@ -33,27 +33,6 @@ class TestParser(unittest.TestCase):
         result = parser._get_dictionary_value_by_dot_separated_key(test_dict, key)
         self.assertEqual(result, "1.0.0")
 
-    def test__parse_versions_file(self):
-        versions_dir = "tests/test_versions"
-        eks_version = "1.21"
-
-        result = parser._parse_versions_file(versions_dir, eks_version)
-        self.assertEqual(
-            result,
-            {
-                "ami": {"version": "1.21.14-20230217"},
-                "charts": {
-                    "alb_controller": {"version": "1.3.3"},
-                    "cluster_autoscaler": {"replication": {"cluster_autoscaler": {"tag": "v1.26.2"}}},
-                    "kyverno": {"skip": True},
-                },
-                "additional_images": {
-                    "cloudwatch_agent": "public.ecr.aws/cloudwatch-agent/cloudwatch-agent:1.247358.0b252413",
-                    "secrets_store_csi_driver_provider_aws": "public.ecr.aws/aws-secrets-manager/secrets-store-csi-driver-provider-aws:1.0.r2-2021.08.13.20.34-linux-amd64",  # noqa: E501
-                },
-            },
-        )
-
     def test__needs_custom_replication(self):
         # Test true
         data = {"replication": {"cluster_autoscaler": "image.repository"}}
@@ -93,6 +72,26 @@ class TestParser(unittest.TestCase):
         result = parser.add_branch_to_dict(test_dict, test_data, value)
         self.assertEqual(result, {"image": {"repository": "test", "tag": "1.0.0"}})
 
+    def test_compile_path(self):
+        accessor = parser.compile_path({"subchart": "ui", "location": "values", "path": "image.tag", "prefix": "v"})
+        self.assertIs(
+            accessor, parser.compile_path({"location": "values", "path": "image.tag", "prefix": "v", "subchart": "ui"})
+        )
+        self.assertEqual(accessor.branch, ("ui", "image", "tag"))
+        self.assertEqual(accessor.get({"subcharts": {"ui": {"values": {"image": {"tag": "1.0.0"}}}}}), "v1.0.0")
+
+        tree = {"ui": {"image": {"repository": "test"}}}
+        self.assertIs(accessor.set(tree, "1.0.0"), tree)
+        self.assertEqual(tree, {"ui": {"image": {"repository": "test", "tag": "1.0.0"}}})
+
+        # an empty prefix is still a prefix
+        self.assertEqual(
+            parser.compile_path({"location": "chart", "path": "appVersion", "prefix": ""}).get(
+                {"chart": {"appVersion": "2.0.0"}}
+            ),
+            "2.0.0",
+        )
+
     def test_get_ami_version(self):
         versions_dir = "tests/test_versions"
         eks_version = "1.21"
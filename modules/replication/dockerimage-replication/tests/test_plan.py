@@ -0,0 +1,99 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from unittest.mock import MagicMock
+
+from replication.plan import (
+    CHANGED,
+    CURRENT,
+    DEFAULT_THROUGHPUT,
+    MISSING,
+    UNKNOWN,
+    input_digests,
+    load_plan,
+    plan_charts,
+    plan_images,
+    summarize,
+    write_plan,
+)
+from replication.state import ReplicationState
+
+REGISTRY = "123456789012.dkr.ecr.us-west-2.amazonaws.com"
+
+
+def make_ecr_utils(tags):
+    ecr_utils = MagicMock()
+    ecr_utils.aws_account_id = "123456789012"
+    ecr_utils.image_exists.side_effect = lambda repo, tag: (repo, tag) in tags
+    ecr_utils.image_digest.side_effect = lambda repo, tag: tags.get((repo, tag))
+    return ecr_utils
+
+
+def test_plan_images(tmp_path):
+    ecr_utils = make_ecr_utils({("current", "v1"): "sha256:t1", ("changed", "v1"): "sha256:t2"})
+    sources = MagicMock()
+    sources.resolve_digest.side_effect = lambda src: None if src.startswith("unknown") else f"sha256:{src}"
+    copier = MagicMock()
+    copier.blobs.return_value = [{"digest": "sha256:layer", "size": 10}, {"digest": "sha256:config", "size": 2}]
+    state = ReplicationState(str(tmp_path / "state.json"))
+    state.record(f"{REGISTRY}/changed:v1", "changed:v1", "sha256:old", "sha256:t2")
+
+    image_data = [
+        {"src": f"{name}:v1", "target": f"{REGISTRY}/{name}:v1"}
+        for name in ("current", "changed", "missing", "unknown")
+    ]
+    images = plan_images(ecr_utils, image_data, sources, copier, state)
+
+    assert [image["status"] for image in images] == [CURRENT, CHANGED, MISSING, UNKNOWN]
+    assert images[0]["targetDigest"] == "sha256:t1"
+    assert images[2]["sourceDigest"] == "sha256:missing:v1"
+    assert images[2]["targetDigest"] is None
+    assert images[2]["blobs"] == {"sha256:layer": 10, "sha256:config": 2}
+    assert "blobs" not in images[0]
+    assert "blobs" not in images[3]
+
+
+def test_plan_charts():
+    ecr_utils = make_ecr_utils({("project-helm/chart-a", "1.0.0"): "sha256:c"})
+    charts = {
+        key: {"helm": {"name": key, "version": "1.0.0", "repository": f"oci://{REGISTRY}/project-helm/{key}"}}
+        for key in ("chart-a", "chart-b")
+    }
+    assert [(chart["key"], chart["status"]) for chart in plan_charts(ecr_utils, charts)] == [
+        ("chart-a", CURRENT),
+        ("chart-b", MISSING),
+    ]
+
+
+def test_summarize_and_roundtrip(tmp_path):
+    images = [
+        {"status": MISSING, "blobs": {"sha256:shared": 100, "sha256:a": 50}},
+        {"status": CHANGED, "blobs": {"sha256:shared": 100}},
+        {"status": CURRENT},
+    ]
+    charts = [{"status": MISSING}]
+
+    summary = summarize(images, charts, throughput=50)
+    assert summary["images"] == {MISSING: 1, CHANGED: 1, CURRENT: 1}
+    assert summary["charts"] == {MISSING: 1}
+    assert summary["totalBytes"] == 250
+    assert summary["uniqueBytes"] == 150
+    assert summary["estimatedSeconds"] == 3.0
+    assert summarize(images, charts)["throughputBytesPerSecond"] == DEFAULT_THROUGHPUT
+
+    path = str(tmp_path / "plan.json")
+    images_file = tmp_path / "updated_images.json"
+    images_file.write_text("[]")
+    inputs = input_digests([str(images_file), str(tmp_path / "replication-result.json")])
+    assert inputs[str(tmp_path / "replication-result.json")] is None
+
+    assert load_plan(path) is None
+    write_plan(path, images, charts, summary, inputs)
+    plan = load_plan(path)
+    assert plan["images"] == images
+    assert plan["summary"] == summary
+    assert plan["generatedAt"]
+
+    # a plan computed from other images is stale
+    images_file.write_text('[{"src": "a", "target": "b"}]')
+    assert load_plan(path) is None
@@ -0,0 +1,95 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from replication.plan import CURRENT, MISSING, PLAN_FILE, load_plan
+
+TARGET = "123456789012.dkr.ecr.us-west-2.amazonaws.com/project-calico/node"
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("plan_replication.aws_account_id", "123456789012")
+    images = [
+        {"src": "docker.io/calico/node:v3.26.1", "target": f"{TARGET}:v3.26.1"},
+        {"src": "docker.io/calico/node:v3.26.0", "target": f"{TARGET}:v3.26.0"},
+    ]
+    (tmp_path / "updated_images.json").write_text(json.dumps(images))
+    charts = {
+        "calico": {"helm": {"name": "tigera-operator", "version": "1.0.0", "repository": "oci://x/charts/calico"}}
+    }
+    (tmp_path / "replication-result.json").write_text(json.dumps({"charts": charts}))
+    return tmp_path
+
+
+@pytest.fixture
+def ecr_utils():
+    with patch("plan_replication.ECRUtils") as MockECRUtils:
+        ecr_utils = MockECRUtils.return_value
+        ecr_utils.aws_account_id = "123456789012"
+        # the v3.26.0 image and the chart are already in ECR
+        ecr_utils.image_exists.side_effect = lambda repo, tag: tag in ("v3.26.0", "1.0.0")
+        ecr_utils.image_digest.return_value = "sha256:target"
+        yield ecr_utils
+
+
+@pytest.fixture(autouse=True)
+def sources():
+    with (
+        patch("plan_replication.get_credentials", return_value=(None, None)),
+        patch("plan_replication.RegistryClients") as MockRegistryClients,
+    ):
+        MockRegistryClients.return_value.resolve_digest.return_value = "sha256:source"
+        yield MockRegistryClients.return_value
+
+
+def test_main_docker_backend(workdir, ecr_utils, monkeypatch):
+    import plan_replication
+
+    monkeypatch.setattr(plan_replication, "transfer_backend", "docker")
+    with patch("plan_replication.ImageCopier") as MockImageCopier:
+        plan_replication.main()
+    # manifests are not fetched for the docker backend, which pulls the images itself
+    MockImageCopier.assert_not_called()
+
+    plan = load_plan()
+    assert [(image["target"], image["status"]) for image in plan["images"]] == [
+        (f"{TARGET}:v3.26.1", MISSING),
+        (f"{TARGET}:v3.26.0", CURRENT),
+    ]
+    assert "blobs" not in plan["images"][0]
+    assert plan["charts"][0]["status"] == CURRENT
+    assert plan["summary"]["uniqueBytes"] == 0
+
+    # the plan is only used for the images it was computed from
+    (workdir / "updated_images.json").write_text("[]")
+    assert load_plan() is None
+
+
+def test_main_registry_backend(workdir, ecr_utils, monkeypatch):
+    import plan_replication
+
+    monkeypatch.setattr(plan_replication, "transfer_backend", "registry")
+    with patch("plan_replication.ImageCopier") as MockImageCopier:
+        MockImageCopier.return_value.blobs.return_value = [{"digest": "sha256:layer", "size": 1024}]
+        plan_replication.main()
+
+    # only the manifest of the missing image is resolved
+    MockImageCopier.return_value.blobs.assert_called_once_with("docker.io/calico/node:v3.26.1")
+    plan = load_plan()
+    assert plan["images"][0]["blobs"] == {"sha256:layer": 1024}
+    assert plan["summary"]["uniqueBytes"] == 1024
+
+
+def test_main_without_images(tmp_path, monkeypatch):
+    import plan_replication
+
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit):
+        plan_replication.main()
+    assert not (tmp_path / PLAN_FILE).exists()
@@ -0,0 +1,357 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import pytest
+
+from replication.checkpoint import Checkpoint
+from replication.registry.copier import ImageCopier, _platform, parse_platforms
+from replication.registry.registry_client import (
+    MEDIA_TYPE_DOCKER_MANIFEST,
+    MEDIA_TYPE_OCI_INDEX,
+    ImageReference,
+    RegistryClient,
+    RegistryClients,
+    _SizedStream,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i : i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeRegistry:
+    """In-memory stand-in for an OCI distribution registry, usable as a requests session"""
+
+    def __init__(self, host, token_required=False):
+        self.host = host
+        self.token_required = token_required
+        self.blobs = {}  # repository -> {digest: bytes}
+        self.manifests = {}  # repository -> {reference: (body, media type)}
+        self.uploads = {}
+        self.calls = []
+
+    def add_blob(self, repository, data):
+        digest = f"sha256:{hashlib.sha256(data).hexdigest()}"
+        self.blobs.setdefault(repository, {})[digest] = data
+        return {"digest": digest, "size": len(data)}
+
+    def add_manifest(self, repository, reference, document, media_type=MEDIA_TYPE_DOCKER_MANIFEST):
+        body = json.dumps(document).encode()
+        digest = f"sha256:{hashlib.sha256(body).hexdigest()}"
+        self.manifests.setdefault(repository, {})[reference] = (body, media_type)
+        self.manifests[repository][digest] = (body, media_type)
+        return {"digest": digest, "size": len(body), "mediaType": media_type}
+
+    def request(self, method, url, headers=None, params=None, data=None, **kwargs):
+        parsed = urlparse(url)
+        self.calls.append((method, parsed.path, params))
+        if parsed.path == "/token":
+            return FakeResponse(200, json.dumps({"token": "secret"}).encode())
+        if self.token_required and (headers or {}).get("Authorization") != "Bearer secret":
+            return FakeResponse(401, headers={"WWW-Authenticate": f'Bearer realm="https://{self.host}/token"'})
+
+        path = parsed.path[len("/v2/") :]
+        if "/manifests/" in path:
+            repository, reference = path.split("/manifests/")
+            if method == "PUT":
+                self.manifests.setdefault(repository, {})[reference] = (data, headers["Content-Type"])
+                return FakeResponse(201)
+            if reference not in self.manifests.get(repository, {}):
+                return FakeResponse(404)
+            body, media_type = self.manifests[repository][reference]
+            digest = f"sha256:{hashlib.sha256(body).hexdigest()}"
+            return FakeResponse(200, body, {"Content-Type": media_type, "Docker-Content-Digest": digest})
+        if "/blobs/uploads/" in path:
+            repository = path.split("/blobs/uploads/")[0]
+            if method == "POST":
+                if params and params.get("from") in self.blobs and params["mount"] in self.blobs[params["from"]]:
+                    self.blobs.setdefault(repository, {})[params["mount"]] = self.blobs[params["from"]][params["mount"]]
+                    return FakeResponse(201)
+                session = str(len(self.uploads))
+                self.uploads[session] = b""
+                return FakeResponse(202, headers={"Location": f"/v2/{repository}/blobs/uploads/{session}?state=x"})
+            session = path.split("/blobs/uploads/")[1]
+            if session not in self.uploads:
+                return FakeResponse(404)
+            if method == "GET":
+                return FakeResponse(204, headers={"Range": f"0-{len(self.uploads[session]) - 1}"})
+            if method == "DELETE":
+                del self.uploads[session]
+                return FakeResponse(204)
+            if method == "PATCH":
+                assert headers["Content-Range"].startswith(f"{len(self.uploads[session])}-")
+                self.uploads[session] += data
+                return FakeResponse(202, headers={"Location": f"/v2/{repository}/blobs/uploads/{session}?state=y"})
+            digest = parsed.query.split("digest=")[1]
+            body = self.uploads.pop(session) + (data.read() if data is not None else b"")
+            assert digest == f"sha256:{hashlib.sha256(body).hexdigest()}"
+            self.blobs.setdefault(repository, {})[digest] = body
+            return FakeResponse(201)
+        repository, digest = path.split("/blobs/")
+        if digest not in self.blobs.get(repository, {}):
+            return FakeResponse(404)
+        offset = int((headers or {}).get("Range", "bytes=0-")[len("bytes=") : -1])
+        return FakeResponse(206 if offset else 200, self.blobs[repository][digest][offset:])
+
+
+def _image(registry, repository, tag, layers):
+    config = registry.add_blob(repository, json.dumps({"repository": repository}).encode())
+    layer_descriptors = [registry.add_blob(repository, layer) for layer in layers]
+    return registry.add_manifest(repository, tag, {"schemaVersion": 2, "config": config, "layers": layer_descriptors})
+
+
+@pytest.fixture
+def registries():
+    source = FakeRegistry("quay.io", token_required=True)
+    target = FakeRegistry("123456789012.dkr.ecr.us-west-2.amazonaws.com")
+    copier = ImageCopier(RegistryClient(target.host, session=target), RegistryClients(session_factory=lambda: source))
+    return source, target, copier
+
+
+@pytest.mark.parametrize(
+    "image,expected",
+    [
+        ("nginx", ("docker.io", "library/nginx", "latest")),
+        ("calico/node:v3.25.1", ("docker.io", "calico/node", "v3.25.1")),
+        (
+            "quay.io/jetstack/cert-manager-controller:v1.16.2",
+            ("quay.io", "jetstack/cert-manager-controller", "v1.16.2"),
+        ),
+        ("localhost:5000/app:1", ("localhost:5000", "app", "1")),
+        ("registry.k8s.io/pause@sha256:abc", ("registry.k8s.io", "pause", "sha256:abc")),
+    ],
+)
+def test_image_reference_parse(image, expected):
+    reference = ImageReference.parse(image)
+    assert (reference.registry, reference.repository, reference.reference) == expected
+
+
+def test_sized_stream():
+    data = bytes(range(256)) * 100
+    chunks = [data[i : i + 1000] for i in range(0, len(data), 1000)]
+
+    stream = _SizedStream(iter(chunks), len(data))
+    assert len(stream) == len(data)
+    # read in smaller pieces than the chunks, as http.client does
+    parts = iter(lambda: stream.read(333), b"")
+    assert b"".join(parts) == data
+
+    stream = _SizedStream(iter(chunks), len(data))
+    assert stream.read(10) == data[:10]
+    assert stream.read() == data[10:]
+    assert stream.read(10) == b""
+
+
+def test_image_reference_api_host():
+    assert ImageReference.parse("calico/node:v1").api_host == "registry-1.docker.io"
+    assert ImageReference.parse("quay.io/calico/node:v1").api_host == "quay.io"
+
+
+def test_copy_streams_blobs_and_manifest(registries):
+    source, target, copier = registries
+    _image(source, "calico/node", "v3.25.1", [b"layer-1", b"layer-2"])
+
+    assert copier.copy("quay.io/calico/node:v3.25.1", f"{target.host}/proj-quay.io/calico/node:v3.25.1")
+
+    repository = "proj-quay.io/calico/node"
+    assert set(target.blobs[repository].values()) >= {b"layer-1", b"layer-2"}
+    assert target.manifests[repository]["v3.25.1"][0] == source.manifests["calico/node"]["v3.25.1"][0]
+    assert copier.bytes_transferred > len(b"layer-1layer-2")
+
+
+def test_copy_skips_existing_and_mounts_shared_blobs(registries):
+    source, target, copier = registries
+    _image(source, "calico/node", "v1", [b"base", b"node"])
+    _image(source, "calico/typha", "v1", [b"base", b"typha"])
+    existing = target.add_blob("proj-calico/typha", b"typha")
+
+    assert copier.copy("quay.io/calico/node:v1", f"{target.host}/proj-calico/node:v1")
+    transferred = copier.bytes_transferred
+    assert copier.copy("quay.io/calico/typha:v1", f"{target.host}/proj-calico/typha:v1")
+
+    # only the typha config was uploaded: the shared base layer was mounted and the typha layer already existed
+    source_blob_gets = [c for c in source.calls if c[0] == "GET" and "/blobs/" in c[1]]
+    assert len(source_blob_gets) == 4
+    assert existing["digest"] in target.blobs["proj-calico/typha"]
+    assert copier.bytes_transferred - transferred == len(json.dumps({"repository": "calico/typha"}))
+
+
+def test_copy_resolves_index_to_platform(registries):
+    source, target, copier = registries
+    amd64 = _image(source, "app", "amd64", [b"amd64"])
+    arm64 = _image(source, "app", "arm64", [b"arm64"])
+    source.add_manifest(
+        "app",
+        "v1",
+        {
+            "schemaVersion": 2,
+            "manifests": [
+                {**arm64, "platform": {"os": "linux", "architecture": "arm64"}},
+                {**amd64, "platform": {"os": "linux", "architecture": "amd64"}},
+            ],
+        },
+        MEDIA_TYPE_OCI_INDEX,
+    )
+
+    assert copier.copy("quay.io/app:v1", f"{target.host}/proj-app:v1")
+    assert b"amd64" in target.blobs["proj-app"].values()
+    assert b"arm64" not in target.blobs["proj-app"].values()
+
+
+def test_copy_failure(registries):
+    source, target, copier = registries
+    assert copier.copy("quay.io/missing:v1", f"{target.host}/proj-missing:v1") is False
+
+
+def test_resolve_digest(registries):
+    source, target, copier = registries
+    descriptor = _image(source, "calico/node", "v1", [b"node"])
+
+    assert copier.sources.resolve_digest("quay.io/calico/node:v1") == descriptor["digest"]
+    assert copier.sources.resolve_digest("quay.io/calico/node:v2") is None
+
+
+def test_request_retries_throttled_requests(registries, monkeypatch):
+    source, target, copier = registries
+    descriptor = _image(source, "calico/node", "v1", [b"node"])
+    sleeps = []
+    monkeypatch.setattr("replication.registry.registry_client.time.sleep", sleeps.append)
+    responses = [FakeResponse(429, headers={"Retry-After": "2"}), FakeResponse(503)]
+    request = source.request
+    source.request = lambda *args, **kwargs: responses.pop(0) if responses else request(*args, **kwargs)
+
+    assert copier.sources.resolve_digest("quay.io/calico/node:v1") == descriptor["digest"]
+    assert sleeps[0] == 2
+    assert len(sleeps) == 2
+
+
+def test_resumable_upload(registries, tmp_path):
+    source, target, _ = registries
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.jsonl"))
+    client = RegistryClient(target.host, session=target, upload_chunk_size=4)
+    copier = ImageCopier(client, RegistryClients(session_factory=lambda: source), checkpoint=checkpoint)
+    layer = b"0123456789abcdef-layer"
+    descriptor = _image(source, "calico/node", "v1", [layer])
+    manifest = json.loads(source.manifests["calico/node"][descriptor["digest"]][0])
+    digest = f"sha256:{hashlib.sha256(layer).hexdigest()}"
+
+    # an interrupted run left an upload session holding the first 8 bytes
+    _, location = client.start_upload("proj-node")
+    location = client.upload_chunk("proj-node", location, 0, layer[:4])
+    location = client.upload_chunk("proj-node", location, 4, layer[4:8])
+    checkpoint.record("upload", f"proj-node@{digest}", location=location, offset=4)
+    # the layer was recorded in a repository it cannot be mounted from, the mount opens an upload session
+    copier._blob_locations[digest] = "proj-other"
+
+    assert copier.copy("quay.io/calico/node:v1", f"{target.host}/proj-node:v1")
+    assert target.blobs["proj-node"][digest] == layer
+    # the session of the failed mount was cancelled in favour of the saved one
+    assert target.uploads == {}
+    # the upload resumed at the offset the registry reported, not the journaled one
+    assert copier.bytes_transferred == len(layer) - 8 + manifest["config"]["size"]
+    assert Checkpoint(checkpoint.uri).load().get("upload", f"proj-node@{digest}")["offset"] == 20
+
+
+def test_plan_counts_shared_blobs(registries):
+    source, target, copier = registries
+    for name in ("node", "typha", "kube-controllers"):
+        _image(source, f"calico/{name}", "v1", [b"base-layer", name.encode()])
+
+    plan = copier.plan([(f"quay.io/calico/{name}:v1", "") for name in ("node", "typha", "kube-controllers")])
+
+    base = len(b"base-layer")
+    assert plan["images"] == 3
+    assert plan["blobs"] == 3 + 3 + 1  # configs, own layers and the shared base layer
+    assert plan["totalBytes"] - plan["uniqueBytes"] == 2 * base
+
+
+def test_concurrent_copies_upload_shared_blobs_once(registries):
+    source, target, copier = registries
+    names = ("node", "typha", "kube-controllers", "cni")
+    for name in names:
+        _image(source, f"calico/{name}", "v1", [b"base-layer", name.encode()])
+    images = [(f"quay.io/calico/{name}:v1", f"{target.host}/proj-calico/{name}:v1") for name in names]
+    copier.plan(images)
+
+    with ThreadPoolExecutor(max_workers=len(names)) as executor:
+        assert all(executor.map(lambda image: copier.copy(*image), images))
+
+    source_blob_gets = [c for c in source.calls if c[0] == "GET" and "/blobs/" in c[1]]
+    # every config and own layer is fetched once, the base layer once for all images
+    assert len(source_blob_gets) == 2 * len(names) + 1
+    assert copier.bytes_mounted == (len(names) - 1) * len(b"base-layer")
+    assert copier.bytes_saved == copier.bytes_mounted
+    for name in names:
+        assert b"base-layer" in target.blobs[f"proj-calico/{name}"].values()
+
+
+def _multi_platform_image(registry, repository, tag):
+    descriptors = []
+    for architecture in ("amd64", "arm64"):
+        descriptor = _image(registry, repository, architecture, [f"{architecture}-layer".encode()])
+        descriptors.append({**descriptor, "platform": {"os": "linux", "architecture": architecture}})
+    attestation = _image(registry, repository, "attestation", [b"provenance"])
+    descriptors.append(
+        {
+            **attestation,
+            "platform": {"os": "unknown", "architecture": "unknown"},
+            "annotations": {
+                "vnd.docker.reference.type": "attestation-manifest",
+                "vnd.docker.reference.digest": descriptors[1]["digest"],
+            },
+        }
+    )
+    return registry.add_manifest(repository, tag, {"schemaVersion": 2, "manifests": descriptors}, MEDIA_TYPE_OCI_INDEX)
+
+
+@pytest.mark.parametrize("platforms", [["all"], ["linux/amd64", "linux/arm64"]])
+def test_copy_all_platforms(registries, platforms):
+    source, target, copier = registries
+    copier.platforms = platforms
+    index = _multi_platform_image(source, "app", "v1")
+
+    assert copier.copy("quay.io/app:v1", f"{target.host}/proj-app:v1")
+
+    blobs = target.blobs["proj-app"].values()
+    assert {b"amd64-layer", b"arm64-layer", b"provenance"} <= set(blobs)
+    body, media_type = target.manifests["proj-app"]["v1"]
+    assert media_type == MEDIA_TYPE_OCI_INDEX
+    assert body == source.manifests["app"][index["digest"]][0]
+    for descriptor in json.loads(body)["manifests"]:
+        assert descriptor["digest"] in target.manifests["proj-app"]
+
+
+def test_copy_platform_subset(registries):
+    source, target, copier = registries
+    copier.platforms = ["linux/amd64", "linux/s390x"]
+    _multi_platform_image(source, "app", "v1")
+
+    assert copier.copy("quay.io/app:v1", f"{target.host}/proj-app:v1")
+
+    index = json.loads(target.manifests["proj-app"]["v1"][0])
+    assert [_platform(descriptor) for descriptor in index["manifests"]] == ["linux/amd64"]
+    assert b"arm64-layer" not in target.blobs["proj-app"].values()
+
+
+def test_parse_platforms():
+    assert parse_platforms("") == ["linux/amd64"]
+    assert parse_platforms("linux/amd64, linux/arm64") == ["linux/amd64", "linux/arm64"]
+    assert parse_platforms("linux/amd64,all") == ["all"]
@@ -1,7 +1,8 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-from unittest.mock import mock_open, patch
+import os
+from unittest.mock import MagicMock, mock_open, patch
 
 import pytest
 
@@ -15,6 +16,15 @@ def mock_environment_variables(monkeypatch):
     monkeypatch.setenv("SEEDFARMER_PARAMETER_HELM_REPO_SECRET_KEY", "secret_key")
 
 
+def mock_helm(command, shell=False, **kwargs):
+    # `helm pull` writes the chart package into its destination
+    if command[:2] == ["helm", "pull"]:
+        name = command[2].split("/")[-1]
+        with open(os.path.join(command[command.index("--destination") + 1], f"{name}-1.0.0.tgz"), "wb") as f:
+            f.write(b"chart")
+    return True
+
+
 # Mock logger to avoid logging during tests
 @patch("replication.logging.logger")
 def test_process_chart(mock_logger, mock_environment_variables):
@@ -37,33 +47,107 @@ def test_process_chart(mock_logger, mock_environment_variables):
         ecr_utils_mock.login_to_ecr.return_value = True
 
         # Mock run_command
-        with (
-            patch("replicate_charts.run_command") as mock_run_command,
-            patch("replicate_charts.get_credentials") as mock_get_credentials,
-        ):
-            mock_run_command.return_value = True
-            mock_get_credentials.return_value = ("username", "password")
-
+        with patch("replicate_charts.run_command", side_effect=mock_helm) as mock_run_command:
             # Call process_chart
             from replicate_charts import process_chart
 
-            process_chart(ecr_utils_mock, chart_key, chart_data)
+            assert process_chart(ecr_utils_mock, chart_key, chart_data, "username", "password")
 
             # Assertions
             ecr_utils_mock.image_exists.assert_called_once_with("target-repo", "1.0.0")
             ecr_utils_mock.create_repository.assert_called_once_with("target-repo")
+            ecr_utils_mock.image_digest.assert_called_with("target-repo", "1.0.0", refresh=True)
             mock_run_command.assert_any_call(
                 ("helm registry login oci://source-repo --username username --password password").split(), shell=False
             )
-            mock_run_command.assert_any_call(("helm pull test-chart/example --version 1.0.0").split(), shell=False)
-            mock_run_command.assert_any_call(("helm push example-1.0.0.tgz oci://target-repo").split(), shell=False)
-            mock_run_command.assert_any_call(("rm -f example-1.0.0.tgz").split(), shell=False)
+            commands = [call.args[0] for call in mock_run_command.call_args_list]
+            pull = next(command for command in commands if command[:2] == ["helm", "pull"])
+            push = next(command for command in commands if command[:2] == ["helm", "push"])
+            work_dir = pull[-1]
+            assert pull[:-1] == "helm pull test-chart/example --version 1.0.0 --destination".split()
+            assert push == ["helm", "push", os.path.join(work_dir, "example-1.0.0.tgz"), "oci://target-repo"]
+            # the working directory is removed with the chart package
+            assert not os.path.exists(work_dir)
 
             # Check logs
             mock_logger.info.assert_any_call("Processing chart: test-chart ")
             mock_logger.info.assert_any_call("Pushing chart: example-1.0.0.tgz to oci://target-repo")
 
 
+@patch("replicate_charts.run_command", side_effect=mock_helm)
+def test_replicate(mock_run_command, mock_environment_variables):
+    from replicate_charts import replicate
+
+    charts = {
+        "alb_controller": {
+            "helm": {
+                "name": "aws-load-balancer-controller",
+                "version": "1.0.0",
+                "srcRepository": "https://aws.github.io/eks-charts",
+                "repository": "oci://target/eks-charts/aws-load-balancer-controller",
+            }
+        },
+        "fluentbit": {
+            "helm": {
+                "name": "aws-for-fluent-bit",
+                "version": "1.0.0",
+                "srcRepository": "https://aws.github.io/eks-charts",
+                "repository": "oci://target/eks-charts/aws-for-fluent-bit",
+            }
+        },
+        "missing": {
+            "helm": {
+                "name": "missing",
+                "version": "1.0.0",
+                "srcRepository": "https://charts.example.com",
+                "repository": "oci://target/example/missing",
+            }
+        },
+    }
+    ecr_utils = MagicMock()
+    ecr_utils.image_exists.return_value = False
+    ecr_utils.create_repository.side_effect = lambda repo_name: repo_name != "example/missing" or 1 / 0
+
+    successful, failed = replicate(ecr_utils, charts, max_workers=3)
+
+    assert successful == ["aws-load-balancer-controller", "aws-for-fluent-bit"]
+    assert failed == ["missing"]
+    # charts sharing a repository URL are pulled from the single helm repository registered for it
+    pulls = [call.args[0][2] for call in mock_run_command.call_args_list if call.args[0][:2] == ["helm", "pull"]]
+    assert sorted(pulls) == [
+        "alb_controller/aws-for-fluent-bit",
+        "alb_controller/aws-load-balancer-controller",
+        "missing/missing",
+    ]
+
+
+@patch("replicate_charts.run_command", side_effect=mock_helm)
+def test_replicate_with_plan(mock_run_command, mock_environment_variables):
+    from replicate_charts import replicate
+
+    charts = {
+        name: {
+            "helm": {
+                "name": name,
+                "version": "1.0.0",
+                "srcRepository": "https://charts.example.com",
+                "repository": f"oci://target/example/{name}",
+            }
+        }
+        for name in ("current", "missing")
+    }
+    ecr_utils = MagicMock()
+
+    successful, failed = replicate(ecr_utils, charts, plan={"current": "current", "missing": "missing"})
+
+    assert successful == ["current", "missing"]
+    assert failed == []
+    # the plan already looked both charts up
+    ecr_utils.image_exists.assert_not_called()
+    pulls = [call.args[0][2] for call in mock_run_command.call_args_list if call.args[0][:2] == ["helm", "pull"]]
+    assert pulls == ["current/missing"]
+
+
 @patch("replicate_charts.ECRUtils")
 @patch("boto3.client")
 @patch("os.path.isfile")
@@ -87,9 +171,15 @@ def test_process_chart(mock_logger, mock_environment_variables):
 )
 @patch("replicate_charts.get_credentials")
 @patch("replicate_charts.export_results")
+@patch("replicate_charts.run_command", side_effect=mock_helm)
+@patch("replicate_charts.glob.glob", return_value=["example-1.0.0.tgz"])
 @patch("replication.logging.logger")
+@patch("replicate_charts.load_plan", return_value=None)
 def test_main(
+    mock_load_plan,
     mock_logger,
+    mock_glob,
+    mock_run_command,
     mock_export_results,
     mock_get_credentials,
     mock_open,
@@ -120,7 +210,6 @@ def test_main(
 
     # Assertions
     ecr_utils_mock.login_to_ecr.assert_called_once_with("helm")
-    # mock_export_results.assert_any_call(
-    #     "Successfully replicated charts",[]
-    # )
-    # mock_export_results.assert_any_call("FAILED replicated charts", ['example'])
+    mock_get_credentials.assert_called_once()
+    mock_export_results.assert_any_call("Successfully replicated charts", ["example"])
+    mock_export_results.assert_any_call("FAILED replicated charts", [])
@@ -1,9 +1,12 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-from unittest.mock import mock_open, patch
+import io
+import json
+from unittest.mock import MagicMock, mock_open, patch
 
 import pytest
+from botocore.exceptions import ClientError
 
 
 @pytest.fixture
@@ -15,9 +18,10 @@ def mock_environment_variables(monkeypatch):
     monkeypatch.setenv("SEEDFARMER_PARAMETER_HELM_REPO_SECRET_KEY", "secret_key")
 
 
+@patch("replicate_images.image_size", return_value=1024)
 @patch("replication.utils.run_command")
 @patch("replication.logging.logger")
-def test_pull_and_push_image(mock_logger, mock_run_command):
+def test_pull_and_push_image(mock_logger, mock_run_command, mock_image_size):
     from replicate_images import pull_and_push_image
 
     # Mock run_command responses
@@ -38,7 +42,7 @@ def test_pull_and_push_image(mock_logger, mock_run_command):
         ["docker", "login", "-u", "testuser", "-p", "testpassword", "source-repo"],
         shell=False,
     )
-    mock_run_command.assert_any_call(["docker", "pull", "source-image:latest"], shell=False)
+    mock_run_command.assert_any_call(["docker", "pull", "source-image:latest"], shell=False, registry="docker.io")
     mock_run_command.assert_any_call(
         [
             "docker",
@@ -55,8 +59,29 @@ def test_pull_and_push_image(mock_logger, mock_run_command):
             "123456789012.dkr.ecr.us-west-2.amazonaws.com/target-image:latest",
         ],
         shell=False,
+        transferred_bytes=1024,
     )
     mock_run_command.assert_any_call(["docker", "rmi", "source-image:latest"], shell=False)
+    mock_image_size.assert_called_once_with("source-image:latest")
+
+
+@patch("subprocess.run")
+def test_image_size(mock_run):
+    from replicate_images import image_size
+
+    mock_run.return_value = MagicMock(returncode=0, stdout="52428800\n")
+    assert image_size("source-image:latest") == 52428800
+    mock_run.assert_called_once_with(
+        ["docker", "image", "inspect", "--format", "{{.Size}}", "source-image:latest"],
+        shell=False,
+        capture_output=True,
+        text=True,
+    )
+
+    mock_run.return_value = MagicMock(returncode=1, stdout="")
+    assert image_size("missing:latest") == 0
+    mock_run.side_effect = FileNotFoundError
+    assert image_size("source-image:latest") == 0
 
 
 @patch("replication.ecr.ecr_utils.ECRUtils")
@@ -81,7 +106,7 @@ def test_create(mock_logger, mock_run_command, MockECRUtils, mock_environment_va
         }
 
         # Call the function
-        create(ecr_utils_mock, image_repl, "testuser", "testpassword")
+        assert create(ecr_utils_mock, image_repl, "testuser", "testpassword") is True
 
         # Assertions
         ecr_utils_mock.create_repository.assert_called_once_with(
@@ -99,6 +124,128 @@ def test_create(mock_logger, mock_run_command, MockECRUtils, mock_environment_va
         )
 
 
+@patch("replication.logging.logger")
+def test_create_failure(mock_logger, mock_environment_variables):
+    from replicate_images import create
+
+    with (
+        patch("replicate_images.ECRUtils") as MockECRUtils,
+        patch("replicate_images.pull_and_push_image") as mock_pull_and_push,
+    ):
+        ecr_utils_mock = MockECRUtils.return_value
+        ecr_utils_mock.image_exists.return_value = False
+        mock_pull_and_push.return_value = False
+
+        assert create(ecr_utils_mock, {"src": "source-image:latest", "target": "target-image:latest"}) is False
+
+        mock_pull_and_push.side_effect = Exception("boom")
+        assert create(ecr_utils_mock, {"src": "source-image:latest", "target": "target-image:latest"}) is False
+
+
+@patch("replication.logging.logger")
+def test_create_with_copier(mock_logger, mock_environment_variables):
+    from replicate_images import create
+
+    with (
+        patch("replicate_images.ECRUtils") as MockECRUtils,
+        patch("replicate_images.pull_and_push_image") as mock_pull_and_push,
+    ):
+        ecr_utils_mock = MockECRUtils.return_value
+        ecr_utils_mock.image_exists.return_value = False
+        copier = MagicMock()
+        copier.copy.return_value = True
+
+        assert create(ecr_utils_mock, {"src": "source-image:latest", "target": "target-image:latest"}, copier=copier)
+        copier.copy.assert_called_once_with("source-image:latest", "target-image:latest")
+        mock_pull_and_push.assert_not_called()
+
+
+@patch("replication.logging.logger")
+def test_create_with_state(mock_logger, mock_environment_variables, tmp_path):
+    from replicate_images import create
+    from replication.state import ReplicationState
+
+    image_repl = {"src": "source-image:latest", "target": "target-image:latest"}
+    state = ReplicationState(str(tmp_path / "state.json"))
+    sources = MagicMock()
+    sources.resolve_digest.return_value = "sha256:source-1"
+
+    with (
+        patch("replicate_images.ECRUtils") as MockECRUtils,
+        patch("replicate_images.pull_and_push_image") as mock_pull_and_push,
+    ):
+        ecr_utils_mock = MockECRUtils.return_value
+        ecr_utils_mock.image_exists.return_value = True
+        ecr_utils_mock.image_digest.return_value = "sha256:target-1"
+        mock_pull_and_push.return_value = True
+
+        # existing image without state is adopted
+        assert create(ecr_utils_mock, image_repl, state=state, sources=sources)
+        assert state.get("target-image:latest")["sourceDigest"] == "sha256:source-1"
+        mock_pull_and_push.assert_not_called()
+
+        # unchanged source digest skips the image
+        assert create(ecr_utils_mock, image_repl, state=state, sources=sources)
+        mock_pull_and_push.assert_not_called()
+
+        # re-pushed upstream tag is replicated again
+        sources.resolve_digest.return_value = "sha256:source-2"
+        ecr_utils_mock.image_digest.side_effect = ["sha256:target-1", "sha256:target-2"]
+        assert create(ecr_utils_mock, image_repl, state=state, sources=sources)
+        mock_pull_and_push.assert_called_once()
+        assert state.get("target-image:latest") == {
+            "source": "source-image:latest",
+            "sourceDigest": "sha256:source-2",
+            "targetDigest": "sha256:target-2",
+        }
+
+
+@patch("replication.logging.logger")
+def test_create_with_plan(mock_logger, mock_environment_variables, tmp_path):
+    from replicate_images import create
+    from replication.state import ReplicationState
+
+    image_repl = {"src": "source-image:latest", "target": "target-image:latest"}
+    state = ReplicationState(str(tmp_path / "state.json"))
+    sources = MagicMock()
+    ecr_utils_mock = MagicMock()
+    ecr_utils_mock.image_digest.return_value = "sha256:target-2"
+    copier = MagicMock()
+    copier.copy.return_value = True
+
+    # current images are adopted without any lookup
+    planned = {"status": "current", "sourceDigest": "sha256:source-1", "targetDigest": "sha256:target-1"}
+    assert create(ecr_utils_mock, image_repl, copier=copier, state=state, sources=sources, planned=planned)
+    assert state.get("target-image:latest")["targetDigest"] == "sha256:target-1"
+    ecr_utils_mock.create_repository.assert_not_called()
+    copier.copy.assert_not_called()
+
+    # changed images are copied without checking the source and target again
+    planned = {"status": "changed", "sourceDigest": "sha256:source-2", "targetDigest": "sha256:target-1"}
+    assert create(ecr_utils_mock, image_repl, copier=copier, state=state, sources=sources, planned=planned)
+    copier.copy.assert_called_once_with("source-image:latest", "target-image:latest")
+    sources.resolve_digest.assert_not_called()
+    ecr_utils_mock.image_exists.assert_not_called()
+    assert state.get("target-image:latest")["sourceDigest"] == "sha256:source-2"
+
+
+@patch("replication.logging.logger")
+def test_replicate_keeps_order_and_splits_results(mock_logger, mock_environment_variables):
+    from replicate_images import replicate
+
+    image_data = [{"src": f"source-image-{i}:latest", "target": f"target-image-{i}:latest"} for i in range(10)]
+
+    with patch("replicate_images.create") as mock_create:
+        mock_create.side_effect = lambda ecr_utils, image_repl, *args: (
+            not image_repl["src"].startswith("source-image-3")
+        )
+        successful, failed = replicate(object(), image_data, "user", "pwd", max_workers=4)
+
+    assert mock_create.call_count == 10
+    assert failed == [image_data[3]]
+    assert successful == [image for image in image_data if image is not image_data[3]]
+
+
 @patch("replicate_images.ECRUtils")
 @patch("boto3.client")  # Mock boto3 client
 @patch("os.path.isfile")
@@ -113,12 +260,16 @@ def test_create(mock_logger, mock_run_command, MockECRUtils, mock_environment_va
         ]
         """,
 )
-@patch("replication.utils.get_credentials")
+@patch("replicate_images.get_credentials")
+@patch("replicate_images.pull_and_push_image")
 @patch("replicate_images.export_results")
 @patch("replication.logging.logger")
+@patch("replicate_images.load_plan", return_value=None)
 def test_main(
+    mock_load_plan,
     mock_logger,
     mock_export_results,
+    mock_pull_and_push,
     mock_get_credentials,
     mock_open,
     mock_isfile,
@@ -142,6 +293,7 @@ def test_main(
 
     # Mock get_credentials
     mock_get_credentials.return_value = ("testuser", "testpassword")
+    mock_pull_and_push.return_value = True
 
     # Call the main function
     main()
@@ -154,7 +306,81 @@ def test_main(
         "Successfully replicated images",
         [{"src": "source-image:latest", "target": "123456789012.dkr.ecr.us-west-2.amazonaws.com/target-image:latest"}],
     )
-    mock_export_results.assert_any_call(
-        "FAILED replicated image",
-        [{"src": "source-image:latest", "target": "123456789012.dkr.ecr.us-west-2.amazonaws.com/target-image:latest"}],
-    )
+    mock_export_results.assert_any_call("FAILED replicated image", [])
+
+
+@patch("replicate_images.ECRUtils")
+@patch("replication.checkpoint.boto3.client")
+@patch("replicate_images.get_credentials", return_value=("testuser", "testpassword"))
+@patch("replicate_images.pull_and_push_image", return_value=True)
+@patch("replicate_images.export_results")
+@patch("replicate_images.load_plan", return_value=None)
+@patch("replicate_images.checkpoint_prefix", "s3://bucket/replication-checkpoint")
+def test_main_with_s3_checkpoint(
+    mock_load_plan,
+    mock_export_results,
+    mock_pull_and_push,
+    mock_get_credentials,
+    mock_s3_client,
+    MockECRUtils,
+    mock_environment_variables,
+    tmp_path,
+    monkeypatch,
+):
+    from replicate_images import main
+
+    monkeypatch.chdir(tmp_path)
+    images = [{"src": f"source-image-{i}:latest", "target": f"target-image-{i}:latest"} for i in range(2)]
+    (tmp_path / "updated_images.json").write_text(json.dumps(images))
+    MockECRUtils.return_value.login_to_ecr.return_value = True
+    MockECRUtils.return_value.image_exists.return_value = False
+    s3_client = mock_s3_client.return_value
+    # an interrupted run journaled the first image
+    journal = json.dumps({"kind": "image", "key": "target-image-0:latest", "source": "source-image-0:latest"})
+    s3_client.get_object.return_value = {"Body": io.BytesIO(journal.encode())}
+    # removing the journal is denied, the completed run still reports its results
+    s3_client.delete_object.side_effect = ClientError({"Error": {"Code": "AccessDenied"}}, "DeleteObject")
+
+    main()
+
+    mock_pull_and_push.assert_called_once()
+    assert mock_pull_and_push.call_args.args[1] == "source-image-1:latest"
+    s3_client.get_object.assert_called_once_with(Bucket="bucket", Key="replication-checkpoint-images.jsonl")
+    body = s3_client.put_object.call_args.kwargs["Body"].decode()
+    assert [json.loads(line)["key"] for line in body.splitlines()] == ["target-image-0:latest", "target-image-1:latest"]
+    s3_client.delete_object.assert_called_once_with(Bucket="bucket", Key="replication-checkpoint-images.jsonl")
+    mock_export_results.assert_any_call("Successfully replicated images", images)
+
+
+@patch("replication.logging.logger")
+def test_replicate_resumes_from_checkpoint(mock_logger, mock_environment_variables, tmp_path):
+    from replicate_images import replicate, resume
+    from replication.checkpoint import Checkpoint
+
+    image_data = [{"src": f"source-image-{i}:latest", "target": f"target-image-{i}:latest"} for i in range(3)]
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint-images.jsonl"))
+    checkpoint.record("image", "target-image-0:latest", source="source-image-0:latest")
+    # journaled from another source, replicated again
+    checkpoint.record("image", "target-image-1:latest", source="other-image:latest")
+
+    planned = resume({}, image_data, checkpoint)
+    assert planned == {
+        "target-image-0:latest": {
+            "kind": "image",
+            "key": "target-image-0:latest",
+            "source": "source-image-0:latest",
+            "status": "current",
+        }
+    }
+
+    ecr_utils = MagicMock()
+    ecr_utils.image_exists.return_value = False
+    with patch("replicate_images.pull_and_push_image", return_value=True) as mock_pull_and_push:
+        successful, failed = replicate(ecr_utils, image_data, plan=planned, checkpoint=checkpoint)
+
+    assert successful == image_data
+    assert sorted(call.args[1] for call in mock_pull_and_push.call_args_list) == [
+        "source-image-1:latest",
+        "source-image-2:latest",
+    ]
+    assert Checkpoint(checkpoint.uri).load().get("image", "target-image-2:latest")["source"] == "source-image-2:latest"
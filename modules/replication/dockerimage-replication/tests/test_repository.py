@@ -0,0 +1,166 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import hashlib
+
+import pytest
+import yaml
+
+from replication.helm.repository import ChartRepositories, RepositoryError, parse_index, repository_names
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i : i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, files):
+        self.files = files
+        self.calls = []
+
+    def get(self, url, auth=None, headers=None, **kwargs):
+        self.calls.append((url, auth))
+        if url not in self.files:
+            return FakeResponse(404)
+        etag = f'"{hashlib.sha256(self.files[url]).hexdigest()}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, self.files[url], {"ETag": etag})
+
+
+@pytest.fixture
+def repository(chart_archive):
+    content = chart_archive("aws-load-balancer-controller", "1.7.1")
+    index = {
+        "apiVersion": "v1",
+        "entries": {
+            "aws-load-balancer-controller": [
+                {
+                    "version": "1.7.1",
+                    "urls": ["aws-load-balancer-controller-1.7.1.tgz"],
+                    "digest": hashlib.sha256(content).hexdigest(),
+                },
+                {"version": "1.7.0", "urls": ["https://mirror.example.com/aws-load-balancer-controller-1.7.0.tgz"]},
+            ]
+        },
+    }
+    session = FakeSession(
+        {
+            "https://aws.github.io/eks-charts/index.yaml": yaml.safe_dump(index).encode(),
+            "https://aws.github.io/eks-charts/aws-load-balancer-controller-1.7.1.tgz": content,
+            "https://mirror.example.com/aws-load-balancer-controller-1.7.0.tgz": b"corrupted",
+        }
+    )
+    return ChartRepositories("user", "pwd", session_factory=lambda: session), session, content
+
+
+def test_parse_index():
+    assert parse_index(b"apiVersion: v1\nentries:\n  chart: []\n") == {"chart": []}
+    with pytest.raises(RepositoryError):
+        parse_index(b"<html></html>")
+
+
+def test_chart_url(repository):
+    repositories, session, _ = repository
+
+    assert (
+        repositories.chart_url("https://aws.github.io/eks-charts/", "aws-load-balancer-controller", "v1.7.1")
+        == "https://aws.github.io/eks-charts/aws-load-balancer-controller-1.7.1.tgz"
+    )
+    assert (
+        repositories.chart_url("https://aws.github.io/eks-charts", "aws-load-balancer-controller", "1.7.0")
+        == "https://mirror.example.com/aws-load-balancer-controller-1.7.0.tgz"
+    )
+    with pytest.raises(RepositoryError):
+        repositories.chart_url("https://aws.github.io/eks-charts", "aws-load-balancer-controller", "2.0.0")
+    # the index is downloaded once
+    assert len(session.calls) == 1
+
+
+def test_download(repository, tmp_path):
+    repositories, session, content = repository
+
+    path = repositories.download("https://aws.github.io/eks-charts", "aws-load-balancer-controller", "1.7.1", tmp_path)
+
+    assert open(path, "rb").read() == content
+    assert session.calls[-1] == (
+        "https://aws.github.io/eks-charts/aws-load-balancer-controller-1.7.1.tgz",
+        ("user", "pwd"),
+    )
+
+
+def test_download_failures(repository, tmp_path):
+    repositories, session, _ = repository
+
+    # credentials are not sent to other hosts, the archive has no digest to verify
+    repositories.download("https://aws.github.io/eks-charts", "aws-load-balancer-controller", "1.7.0", tmp_path)
+    assert session.calls[-1][1] is None
+
+    with pytest.raises(RepositoryError):
+        repositories.download("oci://public.ecr.aws/karpenter", "karpenter", "1.0.0", tmp_path)
+    with pytest.raises(RepositoryError):
+        repositories.download("https://charts.example.com", "chart", "1.0.0", tmp_path)
+
+
+def test_download_digest_mismatch(repository, tmp_path):
+    repositories, session, _ = repository
+    session.files["https://aws.github.io/eks-charts/aws-load-balancer-controller-1.7.1.tgz"] = b"corrupted"
+
+    with pytest.raises(RepositoryError):
+        repositories.download("https://aws.github.io/eks-charts", "aws-load-balancer-controller", "1.7.1", tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_index_cached_between_runs(repository, tmp_path):
+    _, session, _ = repository
+    repo_url = "https://aws.github.io/eks-charts"
+    first = ChartRepositories(session_factory=lambda: session, cache_dir=str(tmp_path))
+    second = ChartRepositories(session_factory=lambda: session, cache_dir=str(tmp_path))
+
+    entries = first.index(repo_url)
+    assert second.index(repo_url) == entries
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # a changed index is downloaded again
+    session.files[f"{repo_url}/index.yaml"] = b"apiVersion: v1\nentries:\n  chart: []\n"
+    assert ChartRepositories(session_factory=lambda: session, cache_dir=str(tmp_path)).index(repo_url) == {"chart": []}
+
+
+def test_load(repository):
+    repositories, session, _ = repository
+
+    loaded = repositories.load(
+        [
+            "https://aws.github.io/eks-charts",
+            "https://aws.github.io/eks-charts/",
+            "https://charts.example.com",
+            "oci://public.ecr.aws/karpenter",
+        ]
+    )
+
+    assert loaded == {"https://aws.github.io/eks-charts": True, "https://charts.example.com": False}
+    assert [url for url, _ in session.calls].count("https://aws.github.io/eks-charts/index.yaml") == 1
+
+
+def test_repository_names():
+    repositories = {
+        "alb_controller": "https://aws.github.io/eks-charts",
+        "cert_manager": "https://charts.jetstack.io",
+        "fluentbit": "https://aws.github.io/eks-charts/",
+    }
+
+    assert repository_names(repositories) == {
+        "alb_controller": "alb_controller",
+        "cert_manager": "cert_manager",
+        "fluentbit": "alb_controller",
+    }
@@ -0,0 +1,79 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import subprocess
+from unittest.mock import MagicMock, patch
+
+from replication.retry import TokenBucket, backoff, is_retryable, parse_rate_limits, registry_key, throttle
+
+
+def test_is_retryable():
+    assert is_retryable("toomanyrequests: You have reached your pull rate limit")
+    assert is_retryable("Error response from daemon: received unexpected HTTP status: 503 Service Unavailable")
+    assert is_retryable("net/http: TLS handshake timeout")
+    assert is_retryable("ThrottlingException: Rate exceeded")
+    assert not is_retryable("manifest for nginx:missing not found: manifest unknown")
+    assert not is_retryable("unauthorized: authentication required")
+    assert not is_retryable(None)
+
+
+def test_backoff():
+    with patch("replication.retry.random.uniform", side_effect=lambda low, high: high):
+        assert [backoff(attempt, base_delay=1, max_delay=5) for attempt in range(5)] == [1, 2, 4, 5, 5]
+
+
+def test_rate_limits():
+    assert parse_rate_limits("docker.io=60, quay.io=120") == {"docker.io": 60, "quay.io": 120}
+    assert parse_rate_limits("none") == {}
+    assert registry_key("registry-1.docker.io") == "docker.io"
+    assert registry_key("oci://Quay.io/org/charts") == "quay.io"
+    assert registry_key("https://charts.example.com/stable") == "charts.example.com"
+
+
+def test_token_bucket():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(delay):
+        sleeps.append(delay)
+        now[0] += delay
+
+    with (
+        patch("replication.retry.time.monotonic", side_effect=lambda: now[0]),
+        patch("replication.retry.time.sleep", side_effect=sleep),
+    ):
+        bucket = TokenBucket(rate=2, capacity=2)
+        assert [bucket.acquire() for _ in range(4)] == [0, 0, 0.5, 0.5]
+        assert sleeps == [0.5, 0.5]
+
+
+def test_throttle(monkeypatch):
+    bucket = MagicMock()
+    bucket.acquire.return_value = 0
+    monkeypatch.setattr("replication.retry.rate_limits", {"docker.io": 60})
+    monkeypatch.setattr("replication.retry._buckets", {"docker.io": bucket})
+
+    throttle("registry-1.docker.io")
+    throttle("quay.io")
+    throttle(None)
+    bucket.acquire.assert_called_once()
+
+
+@patch("replication.utils.time.sleep")
+@patch("replication.utils.subprocess.run")
+def test_run_command_retries_transient_errors(mock_run, mock_sleep):
+    from replication.metrics import metrics
+    from replication.utils import run_command
+
+    throttled = subprocess.CalledProcessError(1, "docker pull", stderr="toomanyrequests: rate limit")
+    mock_run.side_effect = [throttled, throttled, MagicMock(stderr="")]
+    assert run_command(["docker", "pull", "nginx:latest"], registry="docker.io")
+    assert mock_run.call_count == 3
+    assert mock_sleep.call_count == 2
+    assert metrics.records[-1]["retries"] == 2
+
+    mock_run.reset_mock()
+    mock_run.side_effect = subprocess.CalledProcessError(1, "docker pull", stderr="manifest unknown")
+    assert not run_command(["docker", "pull", "nginx:missing"])
+    assert mock_run.call_count == 1
+    assert metrics.records[-1]["outcome"] == "failed"
@@ -0,0 +1,52 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import json
+from unittest.mock import patch
+
+from replication.state import ReplicationState
+
+
+def test_state_local_roundtrip(tmp_path):
+    uri = str(tmp_path / "replication-state.json")
+    state = ReplicationState(uri).load()
+    assert state.images == {}
+
+    state.record("target:v1", "source:v1", "sha256:src", "sha256:dst")
+    state.save()
+
+    loaded = ReplicationState(uri).load()
+    assert loaded.get("target:v1") == {
+        "source": "source:v1",
+        "sourceDigest": "sha256:src",
+        "targetDigest": "sha256:dst",
+    }
+    assert loaded.is_current("target:v1", "sha256:src", "sha256:dst")
+    assert loaded.is_current("target:v1", "sha256:src", None)
+    assert not loaded.is_current("target:v1", "sha256:new", "sha256:dst")
+    assert not loaded.is_current("target:v1", "sha256:src", "sha256:other")
+    assert not loaded.is_current("target:v2", "sha256:src", "sha256:dst")
+
+
+@patch("replication.state.boto3.client")
+def test_state_s3(mock_client):
+    s3_client = mock_client.return_value
+    s3_client.exceptions.NoSuchKey = KeyError
+    s3_client.get_object.return_value = {
+        "Body": io.BytesIO(json.dumps({"images": {"t:v1": {"sourceDigest": "sha256:a"}}}).encode())
+    }
+
+    state = ReplicationState("s3://bucket/path/state.json").load()
+    s3_client.get_object.assert_called_once_with(Bucket="bucket", Key="path/state.json")
+    assert state.get("t:v1") == {"sourceDigest": "sha256:a"}
+
+    state.save()
+    assert s3_client.put_object.call_args.kwargs["Bucket"] == "bucket"
+    assert json.loads(s3_client.put_object.call_args.kwargs["Body"]) == {
+        "images": {"t:v1": {"sourceDigest": "sha256:a"}},
+        "throughput": None,
+    }
+
+    s3_client.get_object.side_effect = KeyError
+    assert ReplicationState("s3://bucket/missing.json").load().images == {}
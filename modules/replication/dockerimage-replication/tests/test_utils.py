@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import json
+import subprocess
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
@@ -105,3 +106,19 @@ def test_run_command_success(mock_run):
     mock_run.assert_called_once_with(
         ("echo test").split(), input=None, shell=False, check=True, text=True, capture_output=True
     )
+
+
+@patch("subprocess.run")
+def test_run_command_transferred_bytes(mock_run):
+    from replication.metrics import Metrics
+
+    collector = Metrics()
+    mock_run.return_value = MagicMock(returncode=0, stderr="")
+    with patch("replication.utils.metrics", collector):
+        assert run_command(["docker", "push", "image:latest"], transferred_bytes=2048) is True
+        mock_run.side_effect = subprocess.CalledProcessError(1, "docker", stderr="denied")
+        assert run_command(["docker", "push", "other:latest"], transferred_bytes=4096) is False
+    assert [(record["operation"], record["bytes"]) for record in collector.records] == [
+        ("docker push", 2048),
+        ("docker push", 0),
+    ]
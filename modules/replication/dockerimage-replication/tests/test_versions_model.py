@@ -0,0 +1,97 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import ast
+import os
+import shutil
+
+import pytest
+
+from replication.parser import parser, versions
+
+# original of replication/parser/versions.py, in the eks module
+EKS_VERSIONS = os.path.join(
+    os.path.dirname(os.path.abspath(versions.__file__)), "../../../../compute/eks/utils/versions.py"
+)
+
+
+def _versions_code(path):
+    """Code of a versions module without its docstring and logger, the only parts the copies may differ in"""
+    with open(path, encoding="utf-8") as f:
+        module = ast.parse(f.read())
+    logger_lines = {
+        "import logging",
+        "from replication.logging import logger",
+        "_logger: logging.Logger = logging.getLogger(__name__)",
+    }
+    body = [node for node in module.body[1:] if ast.unparse(node) not in logger_lines]
+    return ast.unparse(ast.Module(body=body, type_ignores=[])).replace("_logger.", "logger.")
+
+
+@pytest.fixture
+def versions_dir(tmp_path):
+    shutil.copytree("tests/test_versions", tmp_path / "versions")
+    return str(tmp_path / "versions")
+
+
+def test_load_versions():
+    model = versions.load_versions("tests/test_versions", "1.21")
+    assert model is versions.load_versions(os.path.join("tests", ".", "test_versions"), "1.21")
+
+    assert model.ami["version"] == "1.21.14-20230217"
+    assert model.chart("alb_controller")["version"] == "1.3.3"
+    assert model.chart("alb_controller")["name"] == "aws-load-balancer-controller"
+    assert model.chart("cluster_autoscaler")["replication"] == {"cluster_autoscaler": {"tag": "v1.26.2"}}
+    # skipped charts can still be looked up, they are not workloads
+    assert model.chart("kyverno")["skip"] is True
+    assert "kyverno" not in model.workloads()
+
+    with pytest.raises(TypeError):
+        model.chart("alb_controller")["version"] = "0.0.0"  # type: ignore
+
+
+def test_get_workloads_returns_copies():
+    workloads = parser.get_workloads("tests/test_versions", "1.21")
+    workloads["alb_controller"]["version"] = "0.0.0"
+    workloads.pop("cluster_autoscaler")
+
+    workloads = parser.get_workloads("tests/test_versions", "1.21")
+    assert workloads["alb_controller"]["version"] == "1.3.3"
+    assert "cluster_autoscaler" in workloads
+    assert parser.get_workloads("tests/test_versions", "default")["kyverno"]["version"] == "2.7.0"
+
+
+def test_merge():
+    merged = versions.merge(
+        {"charts": {"a": {"name": "a", "version": "1"}}, "additional_images": {"x": "x:1", "y": "y:1"}},
+        {"ami": {"version": "ami"}, "charts": {"a": {"version": "2"}, "b": {"name": "b", "version": "3"}}},
+    )
+    assert merged == {
+        "ami": {"version": "ami"},
+        "charts": {"a": {"name": "a", "version": "2"}, "b": {"name": "b", "version": "3"}},
+        "additional_images": {"x": "x:1", "y": "y:1"},
+        "docker_mappings": {},
+    }
+
+
+def test_binary_cache(versions_dir, monkeypatch):
+    monkeypatch.setattr(versions, "binary_cache", True)
+    data = versions.merge(versions.read_file(versions_dir, "default"), versions.read_file(versions_dir, "1.21"))
+
+    versions._load(versions_dir, "1.21")
+    assert os.path.isfile(os.path.join(versions_dir, ".1.21.versions.bin"))
+    assert versions._read_cache(versions_dir, "1.21") == data
+
+    # a changed versions file invalidates the cache
+    with open(os.path.join(versions_dir, "1.21.yaml"), "a", encoding="utf-8") as f:
+        f.write("docker_mappings:\n  default: mirror\n")
+    assert versions._read_cache(versions_dir, "1.21") is None
+
+    versions._load.cache_clear()
+    assert versions.load_versions(versions_dir, "1.21").docker_mappings == {"default": "mirror"}
+    assert versions._read_cache(versions_dir, "1.21")["docker_mappings"] == {"default": "mirror"}
+
+
+@pytest.mark.skipif(not os.path.isfile(EKS_VERSIONS), reason="eks module not checked out")
+def test_versions_model_matches_eks_copy():
+    assert _versions_code(versions.__file__) == _versions_code(EKS_VERSIONS)